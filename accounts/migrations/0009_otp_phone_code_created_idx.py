@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-18 21:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_remove_plain_password'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otp',
+            index=models.Index(fields=['phone_number', 'code', 'created_at'], name='otp_phone_code_created_idx'),
+        ),
+    ]
@@ -124,3 +124,48 @@ class OTP(models.Model):
 
     def __str__(self):
         return f"{self.phone_number} - {self.code}"
+
+    class Meta:
+        indexes = [
+            # OTP verification looks up the latest code for a phone number
+            models.Index(fields=['phone_number', 'code', 'created_at'], name='otp_phone_code_created_idx'),
+        ]
+
+
+# -------------------
+# Outbound SMS Model
+# -------------------
+class OutboundSMS(models.Model):
+    """An SMS waiting in (or sent from) the outbox; see accounts.outbox."""
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+
+    to = models.CharField(max_length=20)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    provider_id = models.CharField(max_length=64, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"SMS to {self.to} ({self.status})"
+
+    class Meta:
+        verbose_name = 'outbound SMS'
+        verbose_name_plural = 'outbound SMS'
+        indexes = [
+            # The flush job takes due messages oldest first
+            models.Index(fields=['status', 'next_attempt_at'], name='sms_status_next_attempt_idx'),
+        ]
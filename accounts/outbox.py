@@ -0,0 +1,146 @@
+"""
+SMS outbox.
+
+``queue_sms`` stores the message in the OutboundSMS table and queues one
+``sms.flush`` job (deduplicated, so a burst of OTP requests shares a job).
+The flush job drains the outbox in batches through the process's SMS
+transport. One open connection to the provider serves the whole batch, and
+sends are paced to SMS_RATE_PER_SECOND so bursts stay under the provider's
+rate limit. A failed message is retried with the job queue's backoff. A
+message the provider rejects outright is marked failed straight away.
+
+A message queued just as a flush job finishes is picked up by the periodic
+flush in JOB_SCHEDULE, as are retries.
+
+Settings:
+    SMS_BATCH_SIZE: Messages claimed per batch (default 50)
+    SMS_RATE_PER_SECOND: Sends per second per worker process (default 10)
+    SMS_MAX_ATTEMPTS: Attempts before a message is marked failed (default 5)
+    SMS_SENDING_LEASE: Seconds before a claimed message is presumed lost (default 300)
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from food_ordering.db import write_transaction
+from food_ordering.sms import SMSRejected, get_transport
+from jobs.queue import enqueue
+from jobs.worker import retry_delay
+
+from .models import OutboundSMS
+
+logger = logging.getLogger(__name__)
+
+MAX_ERROR_LENGTH = 1000
+
+
+class Pacer:
+    """Space calls at least 1/rate seconds apart across the threads of a process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self, rate):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + 1 / rate
+        if start > now:
+            time.sleep(start - now)
+
+
+pacer = Pacer()
+
+
+def queue_sms(to, body):
+    """
+    Add a message to the outbox and make sure a flush job is queued.
+
+    Returns:
+        OutboundSMS: The queued message
+    """
+    with write_transaction():
+        message = OutboundSMS.objects.create(to=to, body=body)
+        enqueue('sms.flush', dedup_key='sms:flush')
+    return message
+
+
+async def aqueue_sms(to, body):
+    """Async queue_sms, for async views."""
+    return await sync_to_async(queue_sms)(to, body)
+
+
+def claim_batch(size):
+    """Mark up to ``size`` due messages as sending and return them, oldest first."""
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'SMS_SENDING_LEASE', 300))
+    with write_transaction():
+        OutboundSMS.objects.filter(status=OutboundSMS.SENDING, claimed_at__lt=now - lease).update(
+            status=OutboundSMS.PENDING,
+        )
+        ids = list(
+            OutboundSMS.objects.filter(status=OutboundSMS.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .values_list('id', flat=True)[:size]
+        )
+        OutboundSMS.objects.filter(id__in=ids, status=OutboundSMS.PENDING).update(
+            status=OutboundSMS.SENDING, claimed_at=now,
+        )
+        return list(OutboundSMS.objects.filter(id__in=ids, claimed_at=now).order_by('next_attempt_at', 'id'))
+
+
+def deliver(message, transport):
+    """Send one claimed message and record the outcome."""
+    rate = getattr(settings, 'SMS_RATE_PER_SECOND', 10)
+    max_attempts = getattr(settings, 'SMS_MAX_ATTEMPTS', 5)
+    attempts = message.attempts + 1
+    pacer.wait(rate)
+    try:
+        provider_id = transport.send(message.to, message.body)
+    except SMSRejected as e:
+        fields = {'status': OutboundSMS.FAILED, 'last_error': str(e)[:MAX_ERROR_LENGTH]}
+        logger.error("SMS %s to %s rejected: %s", message.pk, message.to, e)
+    except Exception as e:
+        fields = {'last_error': f'{type(e).__name__}: {e}'[:MAX_ERROR_LENGTH]}
+        if attempts >= max_attempts:
+            fields['status'] = OutboundSMS.FAILED
+            logger.error("SMS %s to %s failed after %s attempts: %s", message.pk, message.to, attempts, e)
+        else:
+            delay = retry_delay(attempts)
+            fields['status'] = OutboundSMS.PENDING
+            fields['next_attempt_at'] = timezone.now() + timedelta(seconds=delay)
+            logger.warning("SMS %s to %s failed, retrying in %.0fs: %s", message.pk, message.to, delay, e)
+    else:
+        fields = {'status': OutboundSMS.SENT, 'provider_id': provider_id, 'sent_at': timezone.now(), 'last_error': ''}
+        logger.info("SMS %s sent to %s. Message SID: %s", message.pk, message.to, provider_id)
+
+    with write_transaction():
+        OutboundSMS.objects.filter(pk=message.pk, claimed_at=message.claimed_at).update(
+            attempts=attempts, claimed_at=None, **fields,
+        )
+    return fields['status'] == OutboundSMS.SENT
+
+
+def flush_outbox():
+    """
+    Send every due message in the outbox.
+
+    Returns:
+        int: Number of messages sent
+    """
+    transport = get_transport()
+    size = getattr(settings, 'SMS_BATCH_SIZE', 50)
+    sent = 0
+    while True:
+        batch = claim_batch(size)
+        if not batch:
+            return sent
+        for message in batch:
+            sent += deliver(message, transport)
@@ -0,0 +1,27 @@
+"""Background tasks for accounts: SMS delivery and OTP housekeeping."""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from jobs.queue import task
+
+from .models import OTP, OutboundSMS
+from .outbox import flush_outbox
+
+# OTPs and the sent messages carrying them are kept this long
+OTP_RETENTION = timedelta(days=1)
+
+
+@task('sms.flush')
+def flush_sms():
+    """Send the due messages in the SMS outbox."""
+    flush_outbox()
+
+
+@task('accounts.purge_expired_otps')
+def purge_expired_otps():
+    """Delete OTPs long past expiry, and sent SMS (which contain them)."""
+    cutoff = timezone.now() - OTP_RETENTION
+    OTP.objects.filter(created_at__lt=cutoff).delete()
+    OutboundSMS.objects.filter(status=OutboundSMS.SENT, sent_at__lt=cutoff).delete()
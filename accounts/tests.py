@@ -1,3 +1,61 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from food_ordering.sms import FakeTransport, SMSRejected, get_transport
+
+from .models import OutboundSMS
+from .outbox import flush_outbox, queue_sms
+
+
+@override_settings(SMS_TRANSPORT='food_ordering.sms.FakeTransport', SMS_RATE_PER_SECOND=1000, SMS_MAX_ATTEMPTS=2)
+class SMSOutboxTests(TestCase):
+
+    def setUp(self):
+        FakeTransport.outbox.clear()
+
+    def test_flush_sends_queued_messages_in_order(self):
+        queue_sms('+2348030000001', 'first')
+        queue_sms('+2348030000002', 'second')
+
+        self.assertEqual(flush_outbox(), 2)
+        self.assertEqual([body for _, body, _ in FakeTransport.outbox], ['first', 'second'])
+        message = OutboundSMS.objects.get(body='first')
+        self.assertEqual(message.status, OutboundSMS.SENT)
+        self.assertTrue(message.provider_id.startswith('FAKE'))
+
+    def test_transport_is_shared(self):
+        self.assertIs(get_transport(), get_transport())
+
+    def test_errors_are_retried_then_failed(self):
+        message = queue_sms('+2348030000001', 'hello')
+        with mock.patch.object(FakeTransport, 'send', side_effect=ConnectionError('reset')):
+            self.assertEqual(flush_outbox(), 0)
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.attempts), (OutboundSMS.PENDING, 1))
+            self.assertGreater(message.next_attempt_at, timezone.now())
+
+            OutboundSMS.objects.filter(pk=message.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+            flush_outbox()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboundSMS.FAILED, 2))
+        self.assertIn('reset', message.last_error)
+
+    def test_rejected_messages_are_not_retried(self):
+        message = queue_sms('+2340000', 'hello')
+        with mock.patch.object(FakeTransport, 'send', side_effect=SMSRejected('invalid number')):
+            flush_outbox()
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts), (OutboundSMS.FAILED, 1))
+
+    @override_settings(SMS_RATE_PER_SECOND=20)
+    def test_sends_are_paced(self):
+        for index in range(5):
+            queue_sms('+2348030000001', f'message {index}')
+
+        start = timezone.now()
+        flush_outbox()
+        # Five sends at 20/s need at least four 50 ms gaps
+        self.assertGreaterEqual((timezone.now() - start).total_seconds(), 0.19)
@@ -1,3 +1,4 @@
+import logging
 import random
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -6,18 +7,22 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
-from twilio.rest import Client
+
+from food_ordering.async_api import AsyncAPIViewMixin
+from food_ordering.outbound import format_phone_number
 
 from .models import OTP
+from .outbox import aqueue_sms
 from .serializers import OTPVerifySerializer, ProfileSerializer
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 # 1️⃣ Request OTP
-class RequestOTPView(APIView):
+class RequestOTPView(AsyncAPIViewMixin, APIView):
     permission_classes = [AllowAny]
     
-    def post(self, request):
+    async def post(self, request):
         phone_number = request.data.get('phone_number')
         if not phone_number:
             return Response({"error": "Phone number required"}, status=status.HTTP_400_BAD_REQUEST)
@@ -26,55 +31,36 @@ class RequestOTPView(APIView):
         email = request.data.get('email', '')
         
         # Check by phone number
-        try:
-            existing_user = User.objects.get(phone_number=phone_number)
+        if await User.objects.filter(phone_number=phone_number).aexists():
             return Response({
                 "error": "Account exists. Please log in.",
                 "user_exists": True
             }, status=status.HTTP_400_BAD_REQUEST)
-        except User.DoesNotExist:
-            pass
         
         # Check by email (if email is provided)
-        if email:
-            try:
-                existing_user = User.objects.get(email=email)
-                return Response({
-                    "error": "Account exists. Please log in.",
-                    "user_exists": True
-                }, status=status.HTTP_400_BAD_REQUEST)
-            except User.DoesNotExist:
-                pass
+        if email and await User.objects.filter(email=email).aexists():
+            return Response({
+                "error": "Account exists. Please log in.",
+                "user_exists": True
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         # Store user data in session for later use during OTP verification
-        request.session['pending_user_data'] = {
+        await request.session.aset('pending_user_data', {
             'first_name': request.data.get('first_name', ''),
             'last_name': request.data.get('last_name', ''),
             'email': request.data.get('email', ''),
             'phone_number': phone_number
-        }
+        })
 
         otp_code = str(random.randint(10000, 99999))
-        OTP.objects.create(phone_number=phone_number, code=otp_code)
+        await OTP.objects.acreate(phone_number=phone_number, code=otp_code)
 
-        # Format phone number for Twilio (add +234 if it starts with 0)
-        formatted_phone = phone_number
-        if phone_number.startswith('0'):
-            formatted_phone = '+234' + phone_number[1:]
-        elif not phone_number.startswith('+'):
-            formatted_phone = '+234' + phone_number
-
-        # Send SMS via Twilio
+        # Queue the SMS (number in +234 form); a worker delivers it via Twilio
         try:
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            client.messages.create(
-                body=f"Your OTP is {otp_code}",
-                from_=settings.TWILIO_PHONE_NUMBER,
-                to=formatted_phone
-            )
+            await aqueue_sms(format_phone_number(phone_number), f"Your OTP is {otp_code}")
         except Exception as e:
             # Log the error but don't fail the request - OTP is still created
-            print(f"Twilio error: {str(e)}")
+            logger.exception("Could not queue OTP SMS: %s", e)
             # For development, you might want to return success even if SMS fails
             # return Response({"error": f"Failed to send OTP: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -90,7 +76,7 @@ class VerifyOTPView(APIView):
     permission_classes = [AllowAny]
     
     def post(self, request):
-        print(f"VerifyOTP request received: {request.data}")
+        logger.debug("VerifyOTP request received: %s", request.data)
         phone_number = request.data.get('phone_number')
         otp_code = request.data.get('otp')
         
@@ -99,13 +85,13 @@ class VerifyOTPView(APIView):
 
         try:
             otp = OTP.objects.filter(phone_number=phone_number, code=otp_code).latest('created_at')
-            print(f"OTP found: {otp}")
+            logger.debug("OTP found: %s", otp)
         except OTP.DoesNotExist:
-            print(f"No OTP found for phone: {phone_number}, code: {otp_code}")
+            logger.debug("No OTP found for phone: %s, code: %s", phone_number, otp_code)
             return Response({"error": "Invalid OTP"}, status=status.HTTP_400_BAD_REQUEST)
 
         if otp.is_expired():
-            print(f"OTP expired: {otp}")
+            logger.debug("OTP expired: %s", otp)
             return Response({"error": "OTP expired"}, status=status.HTTP_400_BAD_REQUEST)
 
         # Get user data from session or request
@@ -122,7 +108,7 @@ class VerifyOTPView(APIView):
         # Check if user already exists
         try:
             existing_user = User.objects.get(phone_number=phone_number)
-            print(f"User already exists: {existing_user}")
+            logger.debug("User already exists: %s", existing_user)
             # User already exists, just log them in
             otp.delete()
             
@@ -131,7 +117,7 @@ class VerifyOTPView(APIView):
                 del request.session['pending_user_data']
             
             refresh = RefreshToken.for_user(existing_user)
-            print(f"Tokens generated for existing user: {existing_user.phone_number}")
+            logger.debug("Tokens generated for existing user: %s", existing_user.phone_number)
             
             return Response({
                 "refresh": str(refresh),
@@ -148,7 +134,7 @@ class VerifyOTPView(APIView):
                 email=user_data.get('email', None),
                 role='customer'
             )
-            print(f"New user created: {user}")
+            logger.debug("New user created: %s", user)
             
             otp.delete()
             
@@ -157,7 +143,7 @@ class VerifyOTPView(APIView):
                 del request.session['pending_user_data']
 
             refresh = RefreshToken.for_user(user)
-            print(f"Tokens generated for new user: {user.phone_number}")
+            logger.debug("Tokens generated for new user: %s", user.phone_number)
             
             return Response({
                 "refresh": str(refresh),
@@ -170,7 +156,7 @@ class LoginView(APIView):
     permission_classes = [AllowAny]
     
     def post(self, request):
-        print(f"Login request received: {request.data}")  # Debug log
+        logger.debug("Login request received: %s", request.data)
         phone_number = request.data.get('phone_number')
         if not phone_number:
             return Response({"error": "Phone number required"}, status=status.HTTP_400_BAD_REQUEST)
@@ -192,10 +178,10 @@ class ProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        print(f"Profile request from user: {request.user}")
-        print(f"User authenticated: {request.user.is_authenticated}")
+        logger.debug("Profile request from user: %s", request.user)
+        logger.debug("User authenticated: %s", request.user.is_authenticated)
         serializer = ProfileSerializer(request.user)
-        print(f"Profile data: {serializer.data}")
+        logger.debug("Profile data: %s", serializer.data)
         return Response(serializer.data)
 
     def put(self, request):
@@ -214,42 +200,29 @@ class SetupSessionView(APIView):
         return Response({"message": "Session setup successful"}, status=status.HTTP_200_OK)
 
 # 6️⃣ Request Password Reset OTP
-class RequestPasswordResetView(APIView):
+class RequestPasswordResetView(AsyncAPIViewMixin, APIView):
     permission_classes = [AllowAny]
     
-    def post(self, request):
+    async def post(self, request):
         phone_number = request.data.get('phone_number')
         if not phone_number:
             return Response({"error": "Phone number required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            user = User.objects.get(phone_number=phone_number, role='customer')
-        except User.DoesNotExist:
+        if not await User.objects.filter(phone_number=phone_number, role='customer').aexists():
             return Response({"error": "No account found with this phone number"}, status=status.HTTP_404_NOT_FOUND)
 
         # Generate and store OTP
         otp_code = str(random.randint(10000, 99999))
-        OTP.objects.create(
+        await OTP.objects.acreate(
             phone_number=phone_number,
             code=otp_code
         )
         
-        # Send OTP via SMS
+        # Queue the OTP SMS
         try:
-            twilio_client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            
-            # Format phone number for Twilio
-            if phone_number.startswith('0'):
-                formatted_phone = '+234' + phone_number[1:]
-            elif not phone_number.startswith('+'):
-                formatted_phone = '+234' + phone_number
-            else:
-                formatted_phone = phone_number
-            
-            message = twilio_client.messages.create(
-                body=f"Your password reset code is: {otp_code}. This code expires in 10 minutes.",
-                from_=settings.TWILIO_PHONE_NUMBER,
-                to=formatted_phone
+            await aqueue_sms(
+                format_phone_number(phone_number),
+                f"Your password reset code is: {otp_code}. This code expires in 10 minutes.",
             )
             
             response_data = {"message": "OTP sent to your phone for password reset"}
@@ -259,7 +232,7 @@ class RequestPasswordResetView(APIView):
                 response_data["otp_code"] = otp_code
                 
         except Exception as e:
-            print(f"Failed to send OTP: {e}")
+            logger.exception("Could not queue OTP SMS: %s", e)
             # Still return success in development
             response_data = {"message": "OTP sent to your phone for password reset"}
             if settings.DEBUG:
@@ -0,0 +1,192 @@
+"""
+Customer authentication middleware.
+
+Customer-site pages use the Django session login first. Pages the browser
+navigates to are authenticated by the session, which ``/api/session/`` opens
+from the customer's JWT, so tokens need not be sent in query strings, which end
+up in access logs. AJAX endpoints send the JWT in the ``Authorization`` header.
+The old ``jwt_token`` query parameter is still accepted, with a deprecation
+warning in the log, until clients have moved to the header or the session.
+
+The user is resolved lazily, at most once per request, and decoded tokens are
+kept in a small in-process LRU cache so repeat requests skip JWT parsing and
+the user lookup. Entries live a few seconds (TOKEN_USER_CACHE_TTL) and a
+user's entries are dropped whenever the user is saved, so deactivation or a
+role change takes effect straight away in this process and within the TTL in
+the others.
+"""
+
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils.functional import SimpleLazyObject
+
+logger = logging.getLogger(__name__)
+
+
+class TokenUserCache:
+    """
+    Thread-safe LRU cache of token -> user with a per-entry TTL.
+    """
+
+    def __init__(self, max_size=1024, ttl=5):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        """Return the cached user for a token, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+        # Hand out a copy so per-request changes never leak between requests
+        return copy.copy(user)
+
+    def set(self, token, user, max_age=None):
+        """Cache a user for a token for at most ``ttl`` (or ``max_age``) seconds."""
+        ttl = self.ttl if max_age is None else min(self.ttl, max_age)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (copy.copy(user), time.monotonic() + ttl)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard_user(self, user_id):
+        """Drop every cached token for a user."""
+        with self._lock:
+            stale = [token for token, (user, _) in self._entries.items() if user.pk == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_user_cache = TokenUserCache(
+    max_size=getattr(settings, 'TOKEN_USER_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'TOKEN_USER_CACHE_TTL', 5),
+)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def discard_cached_user(sender, instance, **kwargs):
+    """A saved user (deactivated, role changed...) is looked up again on the next request."""
+    token_user_cache.discard_user(instance.pk)
+
+
+def get_request_token(request):
+    """Get the raw JWT sent with a request (Authorization header, then the deprecated ``jwt_token`` parameter)."""
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]
+    token = request.GET.get('jwt_token')
+    if token:
+        logger.warning("Deprecated jwt_token query parameter used for %s; send an Authorization header", request.path)
+        return token
+    return None
+
+
+def resolve_token_user(token):
+    """
+    Resolve an access token to an active user.
+
+    Returns:
+        User or None: None if the token is invalid, expired, or the user is missing/inactive
+    """
+    if not token:
+        return None
+
+    user = token_user_cache.get(token)
+    if user is not None:
+        return user
+
+    from rest_framework_simplejwt.tokens import AccessToken
+    User = get_user_model()
+    try:
+        access_token = AccessToken(token)
+        user = User.objects.get(id=access_token['user_id'])
+    except Exception:
+        return None  # JWT authentication failed
+    if not user.is_active:
+        return None
+
+    exp = access_token.get('exp')
+    token_user_cache.set(token, user, max_age=exp - time.time() if exp else None)
+    return user
+
+
+def get_customer_user(request):
+    """
+    Resolve the customer for a request.
+
+    Order: Django session login, the request's JWT (see get_request_token),
+    then the ``user_id`` / ``access_token`` stored in the session.
+
+    Returns:
+        User or AnonymousUser
+    """
+    session_user = getattr(request, 'user', None)
+    if session_user is not None and session_user.is_authenticated:
+        return session_user
+
+    user = resolve_token_user(get_request_token(request))
+    if user is not None:
+        return user
+
+    session = getattr(request, 'session', None)
+    if session is not None:
+        user_id = session.get('user_id')
+        if user_id:
+            User = get_user_model()
+            user = User.objects.filter(id=user_id, is_active=True).first()
+            if user is not None:
+                return user
+        user = resolve_token_user(session.get('access_token'))
+        if user is not None:
+            return user
+
+    return AnonymousUser()
+
+
+class CustomerAuthMiddleware:
+    """
+    Attach ``request.customer_user`` and ``request.token_user``.
+
+    Both are lazy: nothing is decoded or queried unless a view asks, and each is
+    resolved at most once per request. ``token_user`` only considers the JWT sent
+    with the request, for endpoints that must not fall back to the session.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.token_user = SimpleLazyObject(
+            lambda: resolve_token_user(get_request_token(request)) or AnonymousUser()
+        )
+        request.customer_user = SimpleLazyObject(lambda: get_customer_user(request))
+        # Returns a coroutine when the rest of the chain is async
+        return self.get_response(request)
@@ -17,6 +17,7 @@ urlpatterns = [
     path("orders/", views.order_history, name="order_history"),
     path("orders/<int:order_id>/", views.order_tracking, name="order_tracking"),
     path("order-tracking/<int:order_id>/", views.order_tracking, name="order_tracking_alias"),
+    path("orders/<int:order_id>/status/", views.order_status_feed, name="order_status_feed"),
     path("payment/success/", views.payment_success, name="payment_success"),
     path("profile/", views.profile, name="profile"),
     
@@ -39,6 +40,9 @@ urlpatterns = [
     # User orders API
     path("api/user-orders/", views.get_user_orders_api, name="get_user_orders_api"),
     
+    # Session login for page navigations (the JWT stays out of URLs)
+    path("api/session/", views.customer_session, name="customer_session"),
+    
     # Manual cart clearing (for debugging)
     path("clear-cart-now/", views.manual_clear_cart, name="manual_clear_cart"),
     path("debug-session/", views.debug_session, name="debug_session"),
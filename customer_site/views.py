@@ -1,35 +1,48 @@
 """
 Customer-facing website views for Admos Place food ordering.
 """
+import logging
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import login, authenticate
+from django.contrib.auth import login, logout, authenticate
 from django.contrib import messages
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
+from food_ordering.db import write_transaction
+from food_ordering.fast_json import JsonResponse, loads as json_loads
+from food_ordering.outbound import paystack_request
+from django.middleware.csrf import get_token
+from django.views.decorators.csrf import csrf_exempt, csrf_protect, ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
-import json
-import requests
 from datetime import datetime
 from django.conf import settings
-from store.models import FoodItem, Category, Order, SystemSettings
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from store.models import Bag, BagItem, FoodItem, Category, Order, Payment, SystemSettings
+from store.catalog import catalog_condition
+from store.order_status import DEFAULT_WAIT_TIMEOUT, wait_for_order_status
+from store.order_history_service import (
+    DEFAULT_PAGE_SIZE, get_history_etag, get_order_history, normalize_page_size
+)
+from .middleware import get_request_token
+
+logger = logging.getLogger(__name__)
 
 
+@catalog_condition(include_settings=True, per_user=True)
 def homepage(request):
     """Homepage with featured items and restaurant info."""
-    print("=== HOMEPAGE VIEW DEBUG ===")
     
     # Get all available food items from database, ordered alphabetically by name
     food_items = FoodItem.objects.filter(availability=True).select_related('category').order_by('name')
-    print(f"DEBUG: Found {food_items.count()} food items")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Found %s food items", food_items.count())
     
     # Get all categories except 'All' (which is a special category)
     # Order by ID so new categories appear at the end
     categories = list(Category.objects.exclude(name='All').order_by('id'))
-    print(f"DEBUG: Found {len(categories)} categories")
-    for cat in categories:
-        print(f"DEBUG: Category - {cat.name}")
+    logger.debug("Found %s categories: %s", len(categories), categories)
     
     # Convert to list of dictionaries for template
     featured_items = []
@@ -64,8 +77,7 @@ def homepage(request):
         'plate_fee': plate_fee,
     }
     
-    print(f"DEBUG: Context has {len(context['categories'])} categories")
-    print("=== END HOMEPAGE VIEW DEBUG ===")
+    logger.debug("Context has %s categories", len(context['categories']))
     
     return render(request, 'customer_site/homepage.html', context)
 
@@ -119,7 +131,6 @@ def search(request):
 
 def cart(request):
     """Shopping cart page."""
-    print("=== CART VIEW CALLED ===")
     
     # Initialize bags if not exists
     if 'bags' not in request.session:
@@ -141,7 +152,7 @@ def cart(request):
     # Debug: Check for old cart data
     old_cart = request.session.get('cart', [])
     if old_cart:
-        print(f"WARNING: Old cart data found: {old_cart}")
+        logger.warning("Old cart data found: %s", old_cart)
         # Clear old cart data
         if 'cart' in request.session:
             del request.session['cart']
@@ -149,7 +160,7 @@ def cart(request):
     
     # TEMPORARY: Clear all session data to fix duplicates
     if request.GET.get('clear') == 'true':
-        print("CLEARING ALL SESSION DATA")
+        logger.debug("CLEARING ALL SESSION DATA")
         request.session.flush()
         return redirect('customer_site:cart')
     
@@ -162,18 +173,14 @@ def cart(request):
         for item in bag.get('items', []):
             if item.get('is_plates'):
                 item['price'] = plate_fee
-                print(f"Updated plate price to {plate_fee} for item: {item.get('name')}")
+                logger.debug("Updated plate price to %s for item: %s", plate_fee, item.get('name'))
     
     # Save updated bags to session
     request.session['bags'] = bags
     request.session.modified = True
     
-    print("Cart view - loaded cart from current bag:", cart_items)
-    print("Cart view - all bags:", bags)
-    for i, bag in enumerate(bags):
-        print(f"Bag {i+1} ({bag.get('id', 'unknown')}): {len(bag.get('items', []))} items")
-        for item in bag.get('items', []):
-            print(f"  - {item.get('name', 'unknown')} (ID: {item.get('id', 'unknown')})")
+    logger.debug("Cart view - loaded cart from current bag: %s", cart_items)
+    logger.debug("Cart view - all bags: %s", bags)
     
     # Calculate total from ALL bags and individual bag totals
     cart_total = 0
@@ -249,48 +256,12 @@ def validate_cart_plates(cart_items):
 
 def checkout(request):
     """Checkout page for logged-in users."""
-    # Check if user is authenticated via session OR JWT token
-    is_authenticated = request.user.is_authenticated
-    authenticated_user = None
-    
-    # If not authenticated via session, check for JWT token in GET parameter or Authorization header
-    if not is_authenticated:
-        token = None
-        
-        # Check GET parameter first (from form submission)
-        jwt_token = request.GET.get('jwt_token')
-        if jwt_token:
-            token = jwt_token
-        
-        # Check Authorization header (from AJAX requests)
-        if not token:
-            auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-        
-        if token:
-            try:
-                from rest_framework_simplejwt.tokens import AccessToken
-                from accounts.models import User
-                
-                # Decode the JWT token
-                access_token = AccessToken(token)
-                user_id = access_token['user_id']
-                user = User.objects.get(id=user_id)
-                
-                # Set the user in the request
-                request.user = user
-                authenticated_user = user
-                is_authenticated = True
-            except Exception as e:
-                pass  # JWT authentication failed
-    
-    if not is_authenticated:
+    # Session login (see customer_session) or JWT header, resolved once by CustomerAuthMiddleware
+    user = request.customer_user
+    if not user.is_authenticated:
         messages.info(request, 'Please log in to proceed with checkout.')
         return redirect('customer_site:cart')
-    
-    # Use the authenticated user (either from session or JWT)
-    user = authenticated_user or request.user
+    request.user = user
     
     # Get bags from session
     bags = request.session.get('bags', [])
@@ -342,157 +313,30 @@ def checkout(request):
 
 def order_history(request):
     """User's order history."""
-    # Try to authenticate user via JWT token first, then fall back to session
-    user = None
-    
-    # Try JWT authentication first
-    try:
-        from rest_framework_simplejwt.authentication import JWTAuthentication
-        from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-        from rest_framework_simplejwt.tokens import AccessToken
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        
-        # Check for JWT token in URL parameter first (like checkout view)
-        jwt_token = request.GET.get('jwt_token')
-        if jwt_token:
-            try:
-                token = AccessToken(jwt_token)
-                user_id = token['user_id']
-                user = User.objects.get(id=user_id)
-                print(f"JWT Authentication from URL successful for user: {user.id}")
-            except Exception as e:
-                print(f"JWT token from URL validation failed: {e}")
-                user = None
-        
-        # If no user found from URL token, check Authorization header
-        if not user:
-            auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-            if auth_header.startswith('Bearer '):
-                token_string = auth_header.split(' ')[1]
-                try:
-                    token = AccessToken(token_string)
-                    user_id = token['user_id']
-                    user = User.objects.get(id=user_id)
-                    print(f"JWT Authentication from header successful for user: {user.id}")
-                except Exception as e:
-                    print(f"JWT token from header validation failed: {e}")
-                    user = None
-        
-        # If still no user, try the standard JWT authentication
-        if not user:
-            jwt_auth = JWTAuthentication()
-            auth_result = jwt_auth.authenticate(request)
-            if auth_result:
-                user, token = auth_result
-                print(f"JWT Authentication standard successful for user: {user.id}")
-            else:
-                user = None
-    except Exception as e:
-        print(f"JWT Authentication failed: {e}")
+    # Session login, then JWT header, then session user_id / access token
+    user = request.customer_user
+    if not user.is_authenticated:
         user = None
     
-    # Fallback to session authentication
-    if not user and request.user.is_authenticated:
-        user = request.user
-        print(f"Session authentication successful for user: {user.id}")
-    
-    # If still no user, try to get from session data
-    if not user:
-        try:
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            user_id = request.session.get('user_id')
-            if user_id:
-                user = User.objects.get(id=user_id)
-                print(f"Session user_id authentication successful for user: {user.id}")
-        except Exception as e:
-            print(f"Session user_id authentication failed: {e}")
-            user = None
-    
     orders_list = []
+    history = None
     if user:
         try:
-            # Query directly from database - only orders with successful payments
-            orders_qs = Order.objects.filter(
-                user=user,
-                payment__status='success'
-            ).order_by('-created_at').select_related('user').prefetch_related('bags__items')
-            print(f"Found {orders_qs.count()} orders for user {user.id}")
-            for order in orders_qs:
-                # Get the actual payment amount instead of calculated order total
-                actual_payment_amount = None
-                try:
-                    # Try different ways to get the payment
-                    payment = order.payment_set.filter(status='success').first()
-                    if not payment:
-                        # Try getting any payment for this order
-                        payment = order.payment_set.first()
-                    
-                    if payment:
-                        actual_payment_amount = float(payment.amount)
-                        print(f"Order {order.id}: Found payment {payment.id} with amount ₦{actual_payment_amount}")
-                        print(f"Order {order.id}: Payment status: {payment.status}")
-                        print(f"Order {order.id}: Payment reference: {payment.reference}")
-                        print(f"Order {order.id}: Order total: ₦{order.total}")
-                    else:
-                        print(f"Order {order.id}: No payment found")
-                        actual_payment_amount = float(order.total)  # Fallback to order total
-                except Exception as e:
-                    print(f"Error getting payment amount for order {order.id}: {e}")
-                    actual_payment_amount = float(order.total)  # Fallback to order total
-                
-                order_dict = {
-                    'id': order.id,
-                    'status': order.status,
-                    'created_at': order.created_at,
-                    'total': actual_payment_amount if actual_payment_amount is not None else float(order.total),  # Use actual payment amount
-                    'delivery_address': order.delivery_address,
-                    'bags': []
-                }
-                for bag in order.bags.all():
-                    bag_dict = {
-                        'id': bag.id,
-                        'name': getattr(bag, 'name', f'Bag {bag.id}'),
-                        'items': []
-                    }
-                    for item in bag.items.all():
-                        bag_dict['items'].append({
-                            'name': item.item_name or (item.food_item.name if item.food_item else ''),
-                            'price': float(item.item_price) if item.item_price is not None else (float(item.food_item.price) if item.food_item else 0),
-                            'portions': item.portions,
-                            'plates': item.plates,
-                            'category': item.item_category or (item.food_item.category.name if item.food_item and item.food_item.category else ''),
-                        })
-                    order_dict['bags'].append(bag_dict)
-                orders_list.append(order_dict)
-        except Exception as e:
-            print(f"Error building order history from DB: {e}")
-            orders_list = []
-    else:
-        # Not authenticated in session; attempt API (may still be unauthenticated)
-        try:
-            api_url = f"{request.scheme}://{request.get_host()}/api/store/secure/user-orders/"
-            headers = {
-                'Authorization': f'Bearer {request.session.get("access_token", "")}',
-                'Content-Type': 'application/json'
-            }
-            response = requests.get(api_url, headers=headers)
-            if response.status_code == 200:
-                data = response.json() or {}
-                orders_list = data.get('orders', [])
-            else:
-                orders_list = []
+            # Paid orders with bags, items and payments prefetched in a fixed number of queries
+            history = get_order_history(
+                user,
+                page=request.GET.get('page', 1),
+                page_size=request.GET.get('page_size', DEFAULT_PAGE_SIZE),
+            )
+            orders_list = history['orders']
         except Exception as e:
-            print(f"Error fetching order history via API: {e}")
+            logger.exception("Error building order history from DB: %s", e)
             orders_list = []
 
-    print(f"=== ORDER HISTORY DEBUG ===")
-    print(f"User found: {user}")
-    print(f"Orders found: {len(orders_list)}")
-    print(f"Request user: {request.user}")
-    print(f"Request user authenticated: {request.user.is_authenticated}")
-    print(f"=== END ORDER HISTORY DEBUG ===")
+    logger.debug("User found: %s", user)
+    logger.debug("Orders found: %s", len(orders_list))
+    logger.debug("Request user: %s", request.user)
+    logger.debug("Request user authenticated: %s", request.user.is_authenticated)
     
     # Get dynamic plate fee from system settings
     plate_fee = int(float(SystemSettings.get_setting('plate_fee', 50)))
@@ -501,6 +345,7 @@ def order_history(request):
     
     context = {
         'orders': orders_list,
+        'history': history,
         'user': user or request.user,
         'restaurant_name': 'Admos Place',
         'plate_fee': plate_fee,
@@ -509,121 +354,104 @@ def order_history(request):
     return render(request, 'customer_site/order_history.html', context)
 
 
+@csrf_exempt
+@require_http_methods(["POST", "DELETE"])
+def customer_session(request):
+    """
+    Open (POST, JWT in the Authorization header) or close (DELETE) the session login.
+
+    Pages the browser navigates to, such as checkout and order tracking, cannot
+    send an Authorization header; the session authenticates them instead, so
+    the token never has to be put in a URL. Opening needs the JWT, which another
+    site cannot send; closing only needs the session cookie, so it needs the
+    CSRF token that opening returned.
+    """
+    if request.method == 'DELETE':
+        return end_customer_session(request)
+    return start_customer_session(request)
+
+
+@ensure_csrf_cookie
+def start_customer_session(request):
+    user = request.token_user
+    if not user.is_authenticated:
+        return JsonResponse({'success': False, 'error': 'Invalid or expired token'}, status=401)
+    login(request, user, backend='django.contrib.auth.backends.ModelBackend')
+    # login() rotates the CSRF secret, so the token is read afterwards
+    return JsonResponse({'success': True, 'csrf_token': get_token(request)})
+
+
+@csrf_protect
+def end_customer_session(request):
+    logout(request)
+    return JsonResponse({'success': True})
+
+
+def next_page_url(request, history):
+    """URL of the next page of order history (same page size and filters), or None on the last page."""
+    if not history['has_next']:
+        return None
+    params = request.GET.copy()
+    params['page'] = history['page'] + 1
+    params['page_size'] = history['page_size']
+    return f"{request.path}?{params.urlencode()}"
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def get_user_orders_api(request):
     """API endpoint to get user orders for the order history page."""
     try:
-        from rest_framework_simplejwt.authentication import JWTAuthentication
-        from rest_framework_simplejwt.tokens import AccessToken
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
+        # Only an explicit Bearer token is accepted here (no session fallback)
+        if get_request_token(request) is None:
+            return JsonResponse({'error': 'No authorization header'}, status=401)
         
-        # Try to authenticate user
-        user = None
+        user = request.token_user
+        if not user.is_authenticated:
+            return JsonResponse({'error': 'Invalid token'}, status=401)
         
-        # Check for JWT token in Authorization header
-        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-        if auth_header.startswith('Bearer '):
-            token_string = auth_header.split(' ')[1]
-            try:
-                token = AccessToken(token_string)
-                user_id = token['user_id']
-                user = User.objects.get(id=user_id)
-                print(f"JWT Authentication successful for user: {user.id}")
-            except Exception as e:
-                print(f"JWT token validation failed: {e}")
-                return JsonResponse({'error': 'Invalid token'}, status=401)
-        else:
-            return JsonResponse({'error': 'No authorization header'}, status=401)
+        page = request.GET.get('page', 1)
+        page_size = normalize_page_size(request.GET.get('page_size', DEFAULT_PAGE_SIZE))
         
-        if not user:
-            return JsonResponse({'error': 'User not found'}, status=404)
+        # Answer unchanged histories with 304 before loading any orders
+        etag, _ = get_history_etag(user, page, page_size)
+        not_modified = get_conditional_response(request, etag=quote_etag(etag))
+        if not_modified is not None:
+            return not_modified
         
         # Get orders for the user - only orders with successful payments
-        orders_qs = Order.objects.filter(
-            user=user,
-            payment__status='success'
-        ).order_by('-created_at').select_related('user').prefetch_related('bags__items')
-        orders_list = []
-        
-        for order in orders_qs:
-            order_dict = {
-                'id': order.id,
-                'status': order.status,
-                'created_at': order.created_at.isoformat(),
-                'total': float(order.total),
-                'delivery_address': order.delivery_address,
-                'bags': []
-            }
-            for bag in order.bags.all():
-                bag_dict = {
-                    'id': bag.id,
-                    'name': getattr(bag, 'name', f'Bag {bag.id}'),
-                    'items': []
-                }
-                for item in bag.items.all():
-                    bag_dict['items'].append({
-                        'name': item.item_name or (item.food_item.name if item.food_item else ''),
-                        'price': float(item.item_price) if item.item_price is not None else (float(item.food_item.price) if item.food_item else 0),
-                        'portions': item.portions,
-                        'plates': item.plates,
-                        'category': item.item_category or (item.food_item.category.name if item.food_item and item.food_item.category else ''),
-                    })
-                order_dict['bags'].append(bag_dict)
-            orders_list.append(order_dict)
+        history = get_order_history(user, page=page, page_size=page_size)
+        for order_dict in history['orders']:
+            order_dict['created_at'] = order_dict['created_at'].isoformat()
+            if order_dict['delivered_at']:
+                order_dict['delivered_at'] = order_dict['delivered_at'].isoformat()
         
-        return JsonResponse({
+        response = JsonResponse({
             'success': True,
-            'orders': orders_list,
-            'count': len(orders_list)
+            'orders': history['orders'],
+            'count': history['count'],
+            'page': history['page'],
+            'num_pages': history['num_pages'],
+            'has_next': history['has_next'],
+            'next': next_page_url(request, history),
         })
+        response['ETag'] = quote_etag(etag)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
         
     except Exception as e:
-        print(f"Error in get_user_orders_api: {e}")
+        logger.exception("Error in get_user_orders_api: %s", e)
         return JsonResponse({'error': str(e)}, status=500)
 
 
 def order_tracking(request, order_id):
     """Order tracking page."""
-    # Check if user is authenticated via session OR JWT token
-    is_authenticated = request.user.is_authenticated
-    authenticated_user = None
-    
-    # If not authenticated via session, check for JWT token in GET parameter or Authorization header
-    if not is_authenticated:
-        token = None
-        
-        # Check GET parameter first (from form submission)
-        jwt_token = request.GET.get('jwt_token')
-        if jwt_token:
-            token = jwt_token
-        
-        # Check Authorization header (from AJAX requests)
-        if not token:
-            auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-        
-        if token:
-            try:
-                from rest_framework_simplejwt.tokens import AccessToken
-                from accounts.models import User
-                
-                # Decode the JWT token
-                access_token = AccessToken(token)
-                user_id = access_token['user_id']
-                user = User.objects.get(id=user_id)
-                
-                # Set the user in the request
-                request.user = user
-                authenticated_user = user
-                is_authenticated = True
-            except Exception as e:
-                pass  # JWT authentication failed
-    
-    # Use the authenticated user (either from session or JWT)
-    user = authenticated_user or request.user
+    # Session login (see customer_session) or JWT header, resolved once by CustomerAuthMiddleware
+    user = request.customer_user
+    if user.is_authenticated:
+        request.user = user
+    else:
+        user = None
     
     try:
         # Fetch order directly from database
@@ -687,7 +515,7 @@ def order_tracking(request, order_id):
         messages.error(request, 'Order not found!')
         return redirect('customer_site:order_history')
     except Exception as e:
-        print(f"Error fetching order: {e}")
+        logger.exception("Error fetching order: %s", e)
         messages.error(request, 'Error loading order details!')
         return redirect('customer_site:order_history')
     
@@ -706,13 +534,50 @@ def order_tracking(request, order_id):
     return render(request, 'customer_site/order_tracking.html', context)
 
 
+@require_http_methods(["GET"])
+async def order_status_feed(request, order_id):
+    """
+    Long-poll endpoint for order status updates on the tracking page.
+    
+    Holds the request until the order's status or delivered_at differs from the
+    ``since`` version the client already has, or until the timeout passes.
+    Ownership is checked before waiting. The view is async, so under ASGI a
+    waiting customer only uses a thread for each one-second poll of the snapshot.
+    """
+    # Resolving the customer may query the database
+    if not await sync_to_async(lambda: request.customer_user.is_authenticated)():
+        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+    user = request.customer_user
+    
+    try:
+        timeout = float(request.GET.get('timeout', DEFAULT_WAIT_TIMEOUT))
+    except ValueError:
+        timeout = DEFAULT_WAIT_TIMEOUT
+    since = request.GET.get('since')
+    
+    snapshot = await wait_for_order_status(order_id, since=since, timeout=timeout, user_id=user.pk)
+    if snapshot is None:
+        return JsonResponse({'success': False, 'error': 'Order not found'}, status=404)
+    
+    response = JsonResponse({
+        'success': True,
+        'order_id': snapshot['order_id'],
+        'status': snapshot['status'],
+        'delivered_at': snapshot['delivered_at'],
+        'version': snapshot['version'],
+        'changed': snapshot['version'] != since,
+    })
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
 # API Views for AJAX calls
 @csrf_exempt
 @require_http_methods(["POST"])
 def add_to_cart(request):
     """Add item to cart via AJAX."""
     try:
-        data = json.loads(request.body)
+        data = json_loads(request.body)
         item_id = data.get('item_id')
         quantity = int(data.get('quantity', 1))
         plates = int(data.get('plates', 0))
@@ -867,9 +732,8 @@ def add_to_cart(request):
 @require_http_methods(["POST"])
 def update_cart_item(request):
     """Update cart item quantity or plates via AJAX."""
-    print("=== UPDATE CART ITEM CALLED ===")
     try:
-        data = json.loads(request.body)
+        data = json_loads(request.body)
         item_id = data.get('item_id')
         quantity = data.get('quantity')
         plates = data.get('plates')
@@ -878,7 +742,7 @@ def update_cart_item(request):
         # Handle plates parameter - if plates is provided, use it as quantity
         if plates is not None:
             quantity = int(plates)
-            print(f"Using plates as quantity: {quantity}")
+            logger.debug("Using plates as quantity: %s", quantity)
         elif quantity is not None:
             quantity = int(quantity)
         else:
@@ -887,14 +751,14 @@ def update_cart_item(request):
                 'message': 'No quantity or plates provided'
             })
         
-        print(f"Update request - item_id: {item_id}, quantity: {quantity}, plates: {plates}, bag_id: {bag_id}")
+        logger.debug("Update request - item_id: %s, quantity: %s, plates: %s, bag_id: %s", item_id, quantity, plates, bag_id)
         
         # Get current bags
         bags = request.session.get('bags', [])
         
         # Find the item in the specified bag or any bag
         item_found = False
-        print(f"Looking for item_id: {item_id} (type: {type(item_id)})")
+        logger.debug("Looking for item_id: %s (type: %s)", item_id, type(item_id))
         
         # Search for the item, prioritizing the current bag first
         current_bag_id = request.session.get('current_bag')
@@ -907,34 +771,34 @@ def update_cart_item(request):
                 # Put current bag first, then other bags
                 other_bags = [b for b in bags if b.get('id') != current_bag_id]
                 bags_to_search = [current_bag] + other_bags
-                print(f"Searching for item_id: {item_id}, prioritizing current bag: {current_bag_id}")
+                logger.debug("Searching for item_id: %s, prioritizing current bag: %s", item_id, current_bag_id)
             else:
-                print(f"Searching across all bags for item_id: {item_id}")
+                logger.debug("Searching across all bags for item_id: %s", item_id)
         else:
-            print(f"Searching across all bags for item_id: {item_id}")
+            logger.debug("Searching across all bags for item_id: %s", item_id)
         
         for bag in bags_to_search:
             cart = bag.get('items', [])
-            print(f"Checking bag {bag.get('id')} with {len(cart)} items")
+            logger.debug("Checking bag %s with %s items", bag.get('id'), len(cart))
             for cart_item in cart:
-                print(f"  Comparing cart_item['id']: {cart_item['id']} (type: {type(cart_item['id'])}) with item_id: {item_id}")
+                logger.debug("  Comparing cart_item['id']: %s (type: %s) with item_id: %s", cart_item['id'], type(cart_item['id']), item_id)
                 # Compare both as strings to handle type mismatches
                 if str(cart_item['id']) == str(item_id):
-                    print(f"  MATCH FOUND! Updating item: {cart_item.get('name', 'Unknown')}")
+                    logger.debug("  MATCH FOUND! Updating item: %s", cart_item.get('name', 'Unknown'))
                     # Update quantity (now handles both quantity and plates)
                     old_quantity = cart_item['quantity']
-                    print(f"  Updating quantity from {old_quantity} to {quantity}")
+                    logger.debug("  Updating quantity from %s to %s", old_quantity, quantity)
                     
                     if quantity <= 0:
                         cart.remove(cart_item)
-                        print(f"  Removed item (quantity <= 0)")
+                        logger.debug("  Removed item (quantity <= 0)")
                     else:
                         # Check if this is a plate item (has string ID starting with 'plates_')
                         if cart_item.get('is_plates') or str(item_id).startswith('plates_'):
                             # For plate items, just update the quantity without validation
                             cart_item['quantity'] = quantity
-                            print(f"  Updated plate quantity to {cart_item['quantity']}")
-                            print(f"  Plate item after update: {cart_item}")
+                            logger.debug("  Updated plate quantity to %s", cart_item['quantity'])
+                            logger.debug("  Plate item after update: %s", cart_item)
                         else:
                             # Check if the new quantity exceeds available portions (for regular food items)
                             try:
@@ -964,8 +828,8 @@ def update_cart_item(request):
                                 })
                             
                             cart_item['quantity'] = quantity
-                            print(f"  Updated quantity to {cart_item['quantity']}")
-                            print(f"  Item after update: {cart_item}")
+                            logger.debug("  Updated quantity to %s", cart_item['quantity'])
+                            logger.debug("  Item after update: %s", cart_item)
                     
                     item_found = True
                     break
@@ -996,12 +860,11 @@ def update_cart_item(request):
 @require_http_methods(["POST"])
 def remove_from_cart(request):
     """Remove item from cart via AJAX."""
-    print("=== REMOVE FROM CART CALLED ===")
     try:
-        data = json.loads(request.body)
+        data = json_loads(request.body)
         item_id = data.get('item_id')
-        print(f"Request data: {data}")
-        print(f"Item ID to remove: {item_id}")
+        logger.debug("Request data: %s", data)
+        logger.debug("Item ID to remove: %s", item_id)
         
         # Fix type mismatch - convert to int if numeric, keep as string if not
         try:
@@ -1009,11 +872,11 @@ def remove_from_cart(request):
         except (TypeError, ValueError):
             pass  # leave it as string if not numeric (like 'plates')
         
-        print(f"Item ID after type conversion: {item_id} (type: {type(item_id)})")
+        logger.debug("Item ID after type conversion: %s (type: %s)", item_id, type(item_id))
         
         # Get current bags
         bags = request.session.get('bags', [])
-        print(f"Initial bags: {bags}")
+        logger.debug("Initial bags: %s", bags)
         
         # Find the item being removed in any bag
         item_to_remove = None
@@ -1021,11 +884,11 @@ def remove_from_cart(request):
         for bag in bags:
             cart = bag.get('items', [])
             for item in cart:
-                print(f"Comparing item['id'] ({item['id']}, type: {type(item['id'])}) with item_id ({item_id}, type: {type(item_id)})")
+                logger.debug("Comparing item['id'] (%s, type: %s) with item_id (%s, type: %s)", item['id'], type(item['id']), item_id, type(item_id))
                 if item['id'] == item_id:
                     item_to_remove = item
                     bag_with_item = bag
-                    print(f"Found item to remove: {item}")
+                    logger.debug("Found item to remove: %s", item)
                     break
             if item_to_remove:
                 break
@@ -1103,8 +966,7 @@ def remove_from_cart(request):
         request.session.modified = True
         request.session.save()  # Force persist to database
         
-        print("Updated bags:", bags)
-        print("=== REMOVE FROM CART COMPLETED ===")
+        logger.debug("Updated bags: %s", bags)
         
         # Calculate total cart count from all bags
         total_cart_count = sum(len(bag.get('items', [])) for bag in bags)
@@ -1115,9 +977,7 @@ def remove_from_cart(request):
         })
         
     except Exception as e:
-        print(f"ERROR in remove_from_cart: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in remove_from_cart: %s", e)
         return JsonResponse({
             'success': False,
             'message': f'Error: {str(e)}'
@@ -1156,12 +1016,11 @@ def get_cart(request):
         
         # Get all items from all bags and calculate bag totals
         all_items = []
-        print(f"=== GET_CART DEBUG ===")
-        print(f"Total bags: {len(bags)}")
+        logger.debug("Total bags: %s", len(bags))
         for bag in bags:
             bag_items = bag.get('items', [])
             bag_total = 0
-            print(f"Bag {bag.get('id')} has {len(bag_items)} items")
+            logger.debug("Bag %s has %s items", bag.get('id'), len(bag_items))
             
             for item in bag_items:
                 price = float(item.get('price', 0))
@@ -1169,7 +1028,7 @@ def get_cart(request):
                 total_price = price * quantity
                 item['total_price'] = total_price
                 bag_total += total_price
-                print(f"Item: {item.get('name')} (ID: {item.get('id')}), Price: {price}, Quantity: {quantity}, Total: {total_price}")
+                logger.debug("Item: %s (ID: %s), Price: %s, Quantity: %s, Total: %s", item.get('name'), item.get('id'), price, quantity, total_price)
                 all_items.append(item)
             
             # Add bag total to bag data
@@ -1200,27 +1059,20 @@ def get_cart(request):
 def create_order_from_cart(request):
     """Prepare order data for payment - DO NOT create order until payment is successful."""
     try:
-        # Get user from JWT token
-        from rest_framework_simplejwt.authentication import JWTAuthentication
-        from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-        
-        # Authenticate user using JWT token
-        jwt_auth = JWTAuthentication()
-        try:
-            auth_result = jwt_auth.authenticate(request)
-            if auth_result is None:
-                return JsonResponse({
-                    'success': False,
-                    'error': 'Authentication required'
-                }, status=401)
-            user, token = auth_result
-        except (InvalidToken, TokenError):
+        # Get user from JWT token (decoded once per request, cached across requests)
+        if get_request_token(request) is None:
+            return JsonResponse({
+                'success': False,
+                'error': 'Authentication required'
+            }, status=401)
+        user = request.token_user
+        if not user.is_authenticated:
             return JsonResponse({
                 'success': False,
                 'error': 'Invalid or expired token'
             }, status=401)
         
-        data = json.loads(request.body)
+        data = json_loads(request.body)
         cart_items = data.get('cart_items', [])
         delivery_address = data.get('delivery_address', '')
         contact_phone = data.get('contact_phone', '')
@@ -1260,7 +1112,6 @@ def create_order_from_cart(request):
         
         # Calculate order total without creating the order
         from store.models import FoodItem
-        from django.db import transaction
         
         total_amount = Decimal('0')
         valid_items = []
@@ -1302,18 +1153,17 @@ def create_order_from_cart(request):
         total_amount += delivery_fee + service_charge + vat_amount
         
         # Debug logging
-        print(f'=== ORDER TOTAL CALCULATION ===')
-        print(f'Items subtotal: {total_amount - delivery_fee - service_charge - vat_amount}')
-        print(f'Delivery fee: {delivery_fee}')
-        print(f'Service charge: {service_charge}')
-        print(f'VAT amount: {vat_amount}')
-        print(f'Total amount: {total_amount}')
-        print(f'Cart items count: {len(session_bags)}')
-        for bag in session_bags:
-            print(f'  Bag {bag["id"]}: {len(bag["items"])} items')
-            for item in bag["items"]:
-                print(f'    - {item["name"]}: {item["quantity"]} × ₦{item["price"]} = ₦{item["quantity"] * item["price"]}')
-        print(f'=== END ORDER TOTAL CALCULATION ===')
+        logger.debug("Items subtotal: %s", total_amount - delivery_fee - service_charge - vat_amount)
+        logger.debug("Delivery fee: %s", delivery_fee)
+        logger.debug("Service charge: %s", service_charge)
+        logger.debug("VAT amount: %s", vat_amount)
+        logger.debug("Total amount: %s", total_amount)
+        logger.debug("Cart items count: %s", len(session_bags))
+        if logger.isEnabledFor(logging.DEBUG):
+            for bag in session_bags:
+                logger.debug("  Bag %s: %s items", bag['id'], len(bag['items']))
+                for item in bag["items"]:
+                    logger.debug("    - %s: %s × ₦%s = ₦%s", item['name'], item['quantity'], item['price'], item['quantity'] * item['price'])
         
         # Store order data in session for payment success callback
         order_data = {
@@ -1341,12 +1191,10 @@ def create_order_from_cart(request):
         request.session.modified = True
         request.session.save()
         
-        print(f"=== ORDER PREPARATION DEBUG ===")
-        print(f"User: {user.email}")
-        print(f"Total amount: {total_amount}")
-        print(f"Number of items: {len(valid_items)}")
-        print(f"Order data stored in session")
-        print(f"=== END ORDER PREPARATION DEBUG ===")
+        logger.debug("User: %s", user.email)
+        logger.debug("Total amount: %s", total_amount)
+        logger.debug("Number of items: %s", len(valid_items))
+        logger.debug("Order data stored in session")
         
         return JsonResponse({
             'success': True,
@@ -1365,7 +1213,6 @@ def create_order_from_cart(request):
 @require_http_methods(["POST"])
 def clear_cart(request):
     """Clear entire cart via AJAX."""
-    print("=== CLEAR CART CALLED ===")
     try:
         # Clear all bags from session
         request.session['bags'] = []
@@ -1373,7 +1220,7 @@ def clear_cart(request):
         request.session.modified = True
         request.session.save()  # Force persist to database
         
-        print("Cart cleared successfully")
+        logger.debug("Cart cleared successfully")
         
         return JsonResponse({
             'success': True,
@@ -1382,7 +1229,7 @@ def clear_cart(request):
         })
         
     except Exception as e:
-        print(f"Error clearing cart: {str(e)}")
+        logger.exception("Error clearing cart: %s", e)
         return JsonResponse({
             'success': False,
             'message': f'Error: {str(e)}'
@@ -1468,7 +1315,7 @@ def get_bags(request):
 def switch_bag(request):
     """Switch to a different bag via AJAX."""
     try:
-        data = json.loads(request.body)
+        data = json_loads(request.body)
         bag_id = data.get('bag_id')
         
         bags = request.session.get('bags', [])
@@ -1501,17 +1348,17 @@ def switch_bag(request):
 def delete_bag(request):
     """Delete a bag via AJAX."""
     try:
-        data = json.loads(request.body)
+        data = json_loads(request.body)
         bag_id = data.get('bag_id')
         
-        print(f"=== DELETE BAG CALLED ===")
-        print(f"Bag ID to delete: {bag_id}")
+        logger.debug("Bag ID to delete: %s", bag_id)
         
         bags = request.session.get('bags', [])
         current_bag_id = request.session.get('current_bag')
         
-        print(f"Current bags: {[b['id'] for b in bags]}")
-        print(f"Current bag ID: {current_bag_id}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Current bags: %s", [b['id'] for b in bags])
+        logger.debug("Current bag ID: %s", current_bag_id)
         
         # Find the bag to delete
         bag_to_delete = next((b for b in bags if b['id'] == bag_id), None)
@@ -1521,7 +1368,7 @@ def delete_bag(request):
                 'message': 'Bag not found'
             })
         
-        print(f"Deleting bag: {bag_to_delete['name']} ({bag_to_delete['id']})")
+        logger.debug("Deleting bag: %s (%s)", bag_to_delete['name'], bag_to_delete['id'])
         
         # If this is the last bag, clear the entire cart
         if len(bags) <= 1:
@@ -1563,15 +1410,15 @@ def delete_bag(request):
                 new_current_bag = bags[0]['id']
                 request.session['current_bag'] = new_current_bag
                 request.session.modified = True
-                print(f"Switched current bag to: {new_current_bag}")
+                logger.debug("Switched current bag to: %s", new_current_bag)
             else:
                 request.session['current_bag'] = None
                 request.session.modified = True
-                print("No bags remaining, set current_bag to None")
+                logger.debug("No bags remaining, set current_bag to None")
         
-        print(f"Remaining bags: {[b['id'] for b in bags]}")
-        print(f"New current bag: {request.session.get('current_bag')}")
-        print(f"=== DELETE BAG COMPLETED ===")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Remaining bags: %s", [b['id'] for b in bags])
+        logger.debug("New current bag: %s", request.session.get('current_bag'))
         
         return JsonResponse({
             'success': True,
@@ -1581,15 +1428,20 @@ def delete_bag(request):
         })
         
     except Exception as e:
-        print(f"Delete bag error: {str(e)}")
+        logger.exception("Delete bag error: %s", e)
         return JsonResponse({
             'success': False,
             'message': f'Error: {str(e)}'
         })
 
 
-def payment_success(request):
-    """Payment success page - handles Paystack callback and creates order only after successful payment."""
+async def payment_success(request):
+    """
+    Payment success page - handles Paystack callback and creates order only after successful payment.
+
+    Async so the Paystack round trip does not hold a worker thread; the
+    database and session work before and after it runs in a thread.
+    """
     reference = request.GET.get('reference')
     trxref = request.GET.get('trxref')  # Paystack sometimes uses this parameter
     
@@ -1598,45 +1450,50 @@ def payment_success(request):
     
     if not payment_reference:
         # No reference provided, show error
-        # Get dynamic plate fee from system settings
-        plate_fee = float(SystemSettings.get_setting('plate_fee', 50))
-        
-        return render(request, 'customer_site/payment_success.html', {
-            'success': False,
-            'message': 'No payment reference provided',
-            'order': None,
-            'plate_fee': plate_fee,
-        })
+        return await sync_to_async(_payment_failure_page)(request, 'No payment reference provided')
     
     try:
-        print(f"=== PAYMENT SUCCESS DEBUG ===")
-        print(f"Payment reference: {payment_reference}")
+        logger.debug("Payment reference: %s", payment_reference)
         
         # Get the payment record
-        from store.models import Payment, Order, Bag, BagItem, FoodItem
-        from django.contrib.auth import get_user_model
-        from django.db import transaction
-        from decimal import Decimal
-        
-        User = get_user_model()
-        
-        payment = Payment.objects.get(reference=payment_reference)
-        print(f"Payment found: {payment.id}, Status: {payment.status}, Order: {payment.order}")
+        payment = await Payment.objects.select_related('order').aget(reference=payment_reference)
+        logger.debug("Payment found: %s, Status: %s, Order: %s", payment.id, payment.status, payment.order)
         
         # Verify payment with Paystack
-        import requests
-        from django.conf import settings
-        
-        print(f"Verifying payment with Paystack...")
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-        }
-        url = f"https://api.paystack.co/transaction/verify/{payment_reference}"
-        response = requests.get(url, headers=headers)
-        res_data = response.json()
-        
-        print(f"Paystack response: {res_data}")
+        logger.debug("Verifying payment with Paystack...")
+        res_data = await paystack_request("GET", f"/transaction/verify/{payment_reference}")
         
+        logger.debug("Paystack response: %s", res_data)
+    except Payment.DoesNotExist:
+        return await sync_to_async(_payment_failure_page)(request, 'Payment record not found')
+    except Exception as e:
+        logger.exception("Payment verification error: %s", e)
+        return await sync_to_async(_payment_failure_page)(
+            request, 'An error occurred while verifying payment. Please contact support.'
+        )
+
+    return await sync_to_async(_complete_payment)(request, payment, payment_reference, res_data)
+
+
+def _payment_failure_page(request, message):
+    # Get dynamic plate fee from system settings
+    plate_fee = float(SystemSettings.get_setting('plate_fee', 50))
+    
+    return render(request, 'customer_site/payment_success.html', {
+        'success': False,
+        'message': message,
+        'order': None,
+        'plate_fee': plate_fee,
+    })
+
+
+def _complete_payment(request, payment, payment_reference, res_data):
+    """Record Paystack's verdict, create the order on success and render the result page."""
+    from django.contrib.auth import get_user_model
+    from decimal import Decimal
+    
+    User = get_user_model()
+    try:
         if res_data.get("data", {}).get("status") == "success":
             # Payment is successful
             payment.status = "success"
@@ -1647,9 +1504,9 @@ def payment_success(request):
             
             try:
                 payment.save()
-                print(f"Actual payment amount from Paystack: ₦{actual_payment_amount:,.2f}")
+                logger.debug("Actual payment amount from Paystack: ₦%.2f", actual_payment_amount)
             except Exception as e:
-                print(f"Error saving payment: {e}")
+                logger.exception("Error saving payment: %s", e)
                 # Get dynamic plate fee from system settings
                 plate_fee = float(SystemSettings.get_setting('plate_fee', 50))
                 
@@ -1662,14 +1519,14 @@ def payment_success(request):
             
             # Check if order already exists (in case of page refresh)
             if payment.order:
-                print(f"Order already exists: {payment.order.id}")
+                logger.debug("Order already exists: %s", payment.order.id)
                 order = payment.order
             else:
                 # Get order data from session to create new order
                 order_data = request.session.get('pending_order_data')
-                print(f"Order data from session: {order_data}")
+                logger.debug("Order data from session: %s", order_data)
                 if not order_data:
-                    print("No order data found in session")
+                    logger.debug("No order data found in session")
                     # Get dynamic plate fee from system settings
                     plate_fee = float(SystemSettings.get_setting('plate_fee', 50))
                     
@@ -1695,7 +1552,7 @@ def payment_success(request):
                     })
                 
                 # Create order only after successful payment
-                with transaction.atomic():
+                with write_transaction():
                     # Create the order
                     order = Order.objects.create(
                         user=user,
@@ -1757,12 +1614,10 @@ def payment_success(request):
                     payment.order = order
                     payment.save()
                     
-                    print(f"=== ORDER CREATED AFTER PAYMENT SUCCESS ===")
-                    print(f"Order ID: {order.id}")
-                    print(f"Payment Reference: {payment_reference}")
-                    print(f"User: {user.email}")
-                    print(f"Total: {order.total}")
-                    print(f"=== END ORDER CREATION ===")
+                    logger.debug("Order ID: %s", order.id)
+                    logger.debug("Payment Reference: %s", payment_reference)
+                    logger.debug("User: %s", user.email)
+                    logger.debug("Total: %s", order.total)
                 
                 # Reduce quantities for all items in the order
                 _reduce_order_quantities(order)
@@ -1808,51 +1663,29 @@ def payment_success(request):
                 'plate_fee': plate_fee,
             })
             
-    except Payment.DoesNotExist:
-        # Get dynamic plate fee from system settings
-        plate_fee = float(SystemSettings.get_setting('plate_fee', 50))
-        
-        return render(request, 'customer_site/payment_success.html', {
-            'success': False,
-            'message': 'Payment record not found',
-            'order': None,
-            'plate_fee': plate_fee,
-        })
     except Exception as e:
-        import traceback
-        print(f"Payment verification error: {str(e)}")
-        print(f"Traceback: {traceback.format_exc()}")
-        # Get dynamic plate fee from system settings
-        plate_fee = float(SystemSettings.get_setting('plate_fee', 50))
-        
-        return render(request, 'customer_site/payment_success.html', {
-            'success': False,
-            'message': 'An error occurred while verifying payment. Please contact support.',
-            'order': None,
-            'plate_fee': plate_fee,
-        })
+        logger.exception("Payment verification error: %s", e)
+        return _payment_failure_page(request, 'An error occurred while verifying payment. Please contact support.')
 
 
 def _reduce_order_quantities(order):
     """Reduce portions for all food items in the order after successful payment."""
-    from django.db import transaction
-    
     # Check if quantities have already been reduced by looking at the order status
     # We'll use a simple approach: check if the order has been processed
     if hasattr(order, '_quantities_reduced'):
-        print(f"Quantities already reduced for order {order.id}")
+        logger.debug("Quantities already reduced for order %s", order.id)
         return
     
-    with transaction.atomic():
+    with write_transaction():
         for bag in order.bags.all():
             for bag_item in bag.items.all():
                 if bag_item.food_item:  # Only reduce if food_item still exists
                     try:
                         bag_item.food_item.reduce_portions(bag_item.portions)
-                        print(f"Reduced {bag_item.portions} portions of {bag_item.food_item.name}")
+                        logger.debug("Reduced %s portions of %s", bag_item.portions, bag_item.food_item.name)
                     except ValueError as e:
                         # Log the error but don't fail the payment
-                        print(f"Warning: Could not reduce portions for {bag_item.food_item.name}: {e}")
+                        logger.warning("Could not reduce portions for %s: %s", bag_item.food_item.name, e)
         
         # Mark that quantities have been reduced for this order
         order._quantities_reduced = True
@@ -1860,11 +1693,10 @@ def _reduce_order_quantities(order):
 
 def manual_clear_cart(request):
     """Manual cart clearing for debugging purposes."""
-    print("=== MANUAL CART CLEAR CALLED ===")
     try:
         # Clear all session data
         request.session.flush()
-        print("All session data cleared")
+        logger.debug("All session data cleared")
         
         return JsonResponse({
             'success': True,
@@ -1872,7 +1704,7 @@ def manual_clear_cart(request):
         })
         
     except Exception as e:
-        print(f"Error clearing cart: {str(e)}")
+        logger.exception("Error clearing cart: %s", e)
         return JsonResponse({
             'success': False,
             'message': f'Error: {str(e)}'
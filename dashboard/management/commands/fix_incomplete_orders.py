@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.core.exceptions import ValidationError
 from store.models import Order, Bag
-from django.db import transaction
+from food_ordering.db import write_transaction
 
 
 class Command(BaseCommand):
@@ -171,7 +171,7 @@ class Command(BaseCommand):
     def attempt_fix_order(self, order, issues):
         """Attempt to fix an order."""
         try:
-            with transaction.atomic():
+            with write_transaction():
                 fixed = False
                 
                 # Fix delivery address
@@ -1,3 +1,4 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.http import HttpResponseForbidden
@@ -8,20 +9,30 @@ class CashierAccessMiddleware:
     Middleware to restrict cashiers from accessing admin dashboard URLs.
     Cashiers should only access POS dashboard.
     """
+    sync_capable = True
+    async_capable = True
     
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
     
     def __call__(self, request):
-        # Check if user is authenticated and is a cashier
-        if (request.user.is_authenticated and 
-            hasattr(request.user, 'role') and 
-            request.user.role == 'cashier'):
-            
-            # Check if trying to access admin dashboard URLs
-            if request.path.startswith('/dashboard/'):
-                # Redirect cashiers to POS dashboard
-                return redirect('http://localhost:3000/login')  # POS frontend URL
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path.startswith('/dashboard/') and self._is_cashier(request.user):
+            # Redirect cashiers to POS dashboard
+            return redirect('http://localhost:3000/login')  # POS frontend URL
         
         response = self.get_response(request)
         return response
+    
+    async def __acall__(self, request):
+        # Only dashboard paths need the user, so other requests skip the session lookup
+        if request.path.startswith('/dashboard/') and self._is_cashier(await request.auser()):
+            return redirect('http://localhost:3000/login')  # POS frontend URL
+        return await self.get_response(request)
+    
+    @staticmethod
+    def _is_cashier(user):
+        return user.is_authenticated and getattr(user, 'role', None) == 'cashier'
@@ -3,7 +3,7 @@ Order creation utilities to prevent relationship errors.
 This module ensures proper creation of orders with correct bag relationships.
 """
 from django.utils import timezone
-from django.db import transaction
+from food_ordering.db import write_transaction
 from accounts.models import User
 from store.models import Category, FoodItem, Bag, BagItem, Order, Payment
 import random
@@ -23,7 +23,7 @@ def create_order_with_items(customer_phone, items_data, delivery_fee=500, servic
         dict: Order details with success status
     """
     try:
-        with transaction.atomic():
+        with write_transaction():
             # Get or create customer
             customer, created = User.objects.get_or_create(
                 phone_number=customer_phone,
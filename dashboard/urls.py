@@ -48,4 +48,5 @@ urlpatterns = [
     
     # System Settings
     path("settings/", views.system_settings, name="system_settings"),
+    path("diagnostics/sql/", views.sql_reports, name="sql_reports"),
 ]
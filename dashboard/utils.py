@@ -1,36 +1,50 @@
-from django.conf import settings
-from twilio.rest import Client
 import logging
 
+from accounts.outbox import aqueue_sms, queue_sms
+
 logger = logging.getLogger(__name__)
 
 def send_sms(phone_number, message):
     """
-    Send SMS message using Twilio
+    Queue an SMS message in the outbox (sent by the sms.flush job)
     
     Args:
         phone_number (str): Recipient phone number
         message (str): Message to send
         
     Returns:
-        bool: True if successful, False otherwise
+        bool: True if queued, False otherwise
     """
     try:
-        client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-        message_obj = client.messages.create(
-            body=message,
-            from_=settings.TWILIO_PHONE_NUMBER,
-            to=phone_number
-        )
-        logger.info(f"SMS sent successfully to {phone_number}. Message SID: {message_obj.sid}")
+        queue_sms(phone_number, message)
         return True
     except Exception as e:
-        logger.error(f"Failed to send SMS to {phone_number}: {str(e)}")
+        logger.error(f"Failed to queue SMS to {phone_number}: {str(e)}")
         return False
 
+async def asend_sms(phone_number, message):
+    """
+    Async send_sms, for async views
+    
+    Returns:
+        bool: True if queued, False otherwise
+    """
+    try:
+        await aqueue_sms(phone_number, message)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to queue SMS to {phone_number}: {str(e)}")
+        return False
+
+def otp_message(otp_code, purpose="login"):
+    """Text of the OTP SMS for the given purpose."""
+    if purpose == "password_reset":
+        return f"Your Admos Place password reset OTP is: {otp_code}. This code expires in 5 minutes."
+    return f"Your Admos Place login OTP is: {otp_code}. This code expires in 5 minutes."
+
 def send_otp_sms(phone_number, otp_code, purpose="login"):
     """
-    Send OTP SMS message
+    Queue an OTP SMS message
     
     Args:
         phone_number (str): Recipient phone number
@@ -38,11 +52,10 @@ def send_otp_sms(phone_number, otp_code, purpose="login"):
         purpose (str): Purpose of OTP (login, password_reset, etc.)
         
     Returns:
-        bool: True if successful, False otherwise
+        bool: True if queued, False otherwise
     """
-    if purpose == "password_reset":
-        message = f"Your Admos Place password reset OTP is: {otp_code}. This code expires in 5 minutes."
-    else:
-        message = f"Your Admos Place login OTP is: {otp_code}. This code expires in 5 minutes."
-    
-    return send_sms(phone_number, message)
+    return send_sms(phone_number, otp_message(otp_code, purpose))
+
+async def asend_otp_sms(phone_number, otp_code, purpose="login"):
+    """Async send_otp_sms."""
+    return await asend_sms(phone_number, otp_message(otp_code, purpose))
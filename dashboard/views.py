@@ -11,12 +11,16 @@ from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.core.exceptions import ValidationError
+import logging
 import random
 import string
 from store.models import Category, FoodItem, Order, Payment, OrderNotification, InventoryItem, Bag, SystemSettings
 from accounts.models import User, OTP
+from food_ordering.sql_instrumentation import clear_reports, get_recent_reports, is_staff, thresholds
 from .utils import send_otp_sms
 
+logger = logging.getLogger(__name__)
+
 
 # --- Centralized Payment Validation Functions ---
 def is_legitimate_payment(payment):
@@ -117,6 +121,16 @@ def admin_required(view_func):
         return view_func(request, *args, **kwargs)
     return wrapper
 
+def staff_required(view_func):
+    """Decorator to require a staff account (the check that gates SQL timings)."""
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return redirect('dashboard:login')
+        if not is_staff(request.user):
+            return HttpResponseForbidden("Staff access required.")
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
 def admin_or_manager_required(view_func):
     """Decorator to require admin or manager role."""
     def wrapper(request, *args, **kwargs):
@@ -919,7 +933,7 @@ def prepare_chart_data_removed(revenue_filter, products_filter, revenue_start_da
     
     except Exception as e:
         # If anything fails, use fallback data
-        print(f"Chart data generation failed, using fallback: {e}")
+        logger.warning("Chart data generation failed, using fallback: %s", e)
         chart_data = {
             'revenue_chart': {
                 'labels': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
@@ -2063,3 +2077,18 @@ def system_settings(request):
     }
     
     return render(request, "dashboard/system_settings.html", context)
+
+
+@staff_required
+def sql_reports(request):
+    """Recent requests flagged by the SQL instrumentation middleware (staff only)."""
+    if request.method == 'POST' and 'clear_reports' in request.POST:
+        clear_reports()
+        messages.success(request, "SQL reports cleared")
+        return redirect("dashboard:sql_reports")
+    
+    context = {
+        'reports': get_recent_reports(),
+        'thresholds': thresholds(),
+    }
+    return render(request, "dashboard/sql_reports.html", context)
@@ -3,6 +3,13 @@ ASGI config for food_ordering project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve with an ASGI server (e.g. ``uvicorn food_ordering.asgi:application``)
+so the async payment and OTP views await Paystack and Twilio on the event
+loop instead of holding a worker thread while they wait. Middleware built on
+MiddlewareMixin (the security, allauth and cashier middleware) still runs its
+hooks in a thread for each request, and sync views run in a thread per
+request as before; only the outbound wait happens on the loop.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
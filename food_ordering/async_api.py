@@ -0,0 +1,51 @@
+"""
+Async handlers for Django REST framework views.
+
+DRF's dispatch is synchronous. AsyncAPIViewMixin lets a view define
+``async def get/post/...`` handlers. Django then serves the view as a
+coroutine, so the handler can await outbound calls without holding a
+worker thread while they wait. The request still passes through threads:
+authentication, permission and throttle checks run unchanged in one (they
+may query the database), as do database calls made with sync_to_async and
+the hooks of MiddlewareMixin middleware. Exception handling
+and content negotiation work the same as for sync views.
+"""
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+
+class AsyncAPIViewMixin:
+    """
+    Mix in before APIView (or a generic view) to allow async handlers.
+
+    Django's View.view_is_async decides how the view is served: every
+    handler except ``options`` must be async, or none.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.view_is_async:
+            return super().dispatch(request, *args, **kwargs)
+        return self.adispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        """Async counterpart of APIView.dispatch."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if iscoroutinefunction(handler):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,359 @@
+"""
+Two-tier cache backend.
+
+L2 is a SQLite file shared by every worker on the host (WAL mode, like the
+rate limiter's database), so cached values survive restarts and are not
+evicted by another worker's traffic. L1 is a small per-process LRU in front
+of it that keeps recently read entries for at most L1_TIMEOUT seconds.
+
+Every write (set, add, delete, incr, touch, clear) appends the key to an
+invalidation log in L2 under a new, increasing version number. Each process
+reads the log entries newer than the last version it has seen, at most every
+SYNC_INTERVAL seconds, and drops those keys from its L1. A write in one
+worker is therefore visible in every other worker within SYNC_INTERVAL.
+
+Settings (CACHES OPTIONS):
+    MAX_ENTRIES: L2 size before culling (default 300, as Django's backends)
+    L1_MAX_ENTRIES: L1 size per process (default 1000)
+    L1_TIMEOUT: Maximum seconds an entry stays in L1 (default 30)
+    SYNC_INTERVAL: Seconds between invalidation log checks (default 1)
+"""
+
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+# Fraction of writes that also cull expired entries and old log rows
+CLEANUP_PROBABILITY = 0.01
+# Invalidation log rows are kept far longer than any L1 entry lives
+LOG_RETENTION = 3600  # seconds
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache_entries ("
+    " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL) WITHOUT ROWID",
+    # A NULL key means the whole cache was cleared
+    "CREATE TABLE IF NOT EXISTS cache_invalidations ("
+    " version INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT, origin INTEGER NOT NULL, created_at REAL NOT NULL)",
+)
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache shared by all processes on the host through one SQLite file.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = str(location)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            # One connection per thread, reopened after a fork (gunicorn preload)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _write(self, func, keys):
+        """
+        Run ``func(conn, now)`` in one write transaction and log ``keys`` as changed.
+
+        Args:
+            func: Callable doing the write; its result is returned
+            keys: Changed keys (None for the whole cache)
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result = func(conn, now)
+            conn.executemany(
+                'INSERT INTO cache_invalidations (key, origin, created_at) VALUES (?, ?, ?)',
+                [(key, os.getpid(), now) for key in (keys if keys is not None else [None])],
+            )
+            if random.random() < CLEANUP_PROBABILITY:
+                self._cull(conn, now)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self._changed(keys)
+        return result
+
+    def _changed(self, keys):
+        """Hook called after a committed write (used by TwoTierCache to update L1)."""
+
+    def _cull(self, conn, now):
+        conn.execute('DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?', (now,))
+        conn.execute('DELETE FROM cache_invalidations WHERE created_at < ?', (now - LOG_RETENTION,))
+        count = conn.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+        if count > self._max_entries:
+            # Drop the entries closest to expiry (never-expiring ones last)
+            conn.execute(
+                'DELETE FROM cache_entries WHERE key IN ('
+                ' SELECT key FROM cache_entries ORDER BY expires_at IS NULL, expires_at LIMIT ?)',
+                (max(1, count // self._cull_frequency) if self._cull_frequency else count,),
+            )
+
+    def _fetch(self, key):
+        """
+        Read a raw entry.
+
+        Returns:
+            tuple or None: (pickled value, expires_at) if the key is present and unexpired
+        """
+        row = self._connection().execute(
+            'SELECT value, expires_at FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._fetch(key)
+        return default if row is None else pickle.loads(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+        def write(conn, now):
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, pickled, self.get_backend_timeout(timeout)),
+            )
+
+        self._write(write, [key])
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+        def write(conn, now):
+            cursor = conn.execute(
+                'INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at '
+                'WHERE cache_entries.expires_at IS NOT NULL AND cache_entries.expires_at <= ?',
+                (key, pickled, self.get_backend_timeout(timeout), now),
+            )
+            return cursor.rowcount > 0
+
+        return self._write(write, [key])
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+
+        def write(conn, now):
+            cursor = conn.execute(
+                'UPDATE cache_entries SET expires_at = ? '
+                'WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                (self.get_backend_timeout(timeout), key, now),
+            )
+            return cursor.rowcount > 0
+
+        return self._write(write, [key])
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._write(
+            lambda conn, now: conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,)).rowcount > 0,
+            [key],
+        )
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self._write(
+                lambda conn, now: conn.executemany('DELETE FROM cache_entries WHERE key = ?', [(key,) for key in keys]),
+                keys,
+            )
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+
+        def write(conn, now):
+            row = conn.execute(
+                'SELECT value FROM cache_entries WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                (key, now),
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            new_value = pickle.loads(row[0]) + delta
+            conn.execute(
+                'UPDATE cache_entries SET value = ? WHERE key = ?',
+                (pickle.dumps(new_value, pickle.HIGHEST_PROTOCOL), key),
+            )
+            return new_value
+
+        return self._write(write, [key])
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._fetch(key) is not None
+
+    def clear(self):
+        self._write(lambda conn, now: conn.execute('DELETE FROM cache_entries'), None)
+
+
+class L1Store:
+    """
+    Per-process LRU of pickled values with expiry times and hit counters.
+
+    Shared by every thread's backend instance for the same location.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # Bumped on every invalidation so a read that raced a write is not cached
+        self.generation = 0
+        self.last_version = None
+        self.last_sync = 0.0
+        self.syncing = False
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            self.l1_hits += 1
+            return entry[0]
+
+    def put(self, key, pickled, lifetime, generation):
+        with self.lock:
+            if generation != self.generation or lifetime <= 0:
+                return
+            self.entries[key] = (pickled, time.monotonic() + lifetime)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, keys):
+        """Drop keys from L1 (None drops everything)."""
+        with self.lock:
+            self.generation += 1
+            if keys is None:
+                self.entries.clear()
+                return
+            for key in keys:
+                if key is None:
+                    self.entries.clear()
+                    return
+                self.entries.pop(key, None)
+
+
+_l1_stores = {}
+_l1_stores_lock = threading.Lock()
+
+
+class TwoTierCache(SQLiteCache):
+    """
+    SQLiteCache with a per-process L1 kept coherent through the invalidation log.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        options = params.get('OPTIONS', {})
+        self.l1_timeout = float(options.get('L1_TIMEOUT', 30))
+        self.sync_interval = float(options.get('SYNC_INTERVAL', 1))
+        with _l1_stores_lock:
+            if self.path not in _l1_stores:
+                _l1_stores[self.path] = L1Store(int(options.get('L1_MAX_ENTRIES', 1000)))
+            self._l1 = _l1_stores[self.path]
+
+    def _sync(self):
+        """Apply other processes' invalidations to L1 (at most once per SYNC_INTERVAL)."""
+        l1 = self._l1
+        now = time.monotonic()
+        with l1.lock:
+            if l1.syncing or now - l1.last_sync < self.sync_interval:
+                return
+            l1.syncing = True
+        try:
+            conn = self._connection()
+            if l1.last_version is None:
+                # Nothing cached yet, so older invalidations do not matter
+                l1.last_version = conn.execute(
+                    'SELECT COALESCE(MAX(version), 0) FROM cache_invalidations'
+                ).fetchone()[0]
+            else:
+                rows = conn.execute(
+                    'SELECT version, key, origin FROM cache_invalidations WHERE version > ? ORDER BY version',
+                    (l1.last_version,),
+                ).fetchall()
+                if rows:
+                    pid = os.getpid()
+                    # This process's own writes already updated L1
+                    keys = [key for _, key, origin in rows if origin != pid]
+                    if keys:
+                        l1.invalidate(keys)
+                    l1.last_version = rows[-1][0]
+            l1.last_sync = now
+        finally:
+            l1.syncing = False
+
+    def _changed(self, keys):
+        self._l1.invalidate(keys)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._sync()
+        l1 = self._l1
+        pickled = l1.get(key)
+        if pickled is not None:
+            return pickle.loads(pickled)
+
+        generation = l1.generation
+        row = self._fetch(key)
+        if row is None:
+            l1.misses += 1
+            return default
+        l1.l2_hits += 1
+        lifetime = self.l1_timeout if row[1] is None else min(self.l1_timeout, row[1] - time.time())
+        l1.put(key, row[0], lifetime, generation)
+        return pickle.loads(row[0])
+
+    def has_key(self, key, version=None):
+        return self.get(key, self._missing_key, version=version) is not self._missing_key
+
+    def stats(self):
+        """
+        Hit counters for this process.
+
+        Returns:
+            dict: l1_hits, l2_hits, misses, hit_ratio, l1_hit_ratio and l1_entries
+        """
+        l1 = self._l1
+        with l1.lock:
+            l1_hits, l2_hits, misses, entries = l1.l1_hits, l1.l2_hits, l1.misses, len(l1.entries)
+        total = l1_hits + l2_hits + misses
+        return {
+            'l1_hits': l1_hits,
+            'l2_hits': l2_hits,
+            'misses': misses,
+            'hit_ratio': (l1_hits + l2_hits) / total if total else 0.0,
+            'l1_hit_ratio': l1_hits / total if total else 0.0,
+            'l1_entries': entries,
+        }
@@ -0,0 +1,136 @@
+"""
+Response compression middleware.
+
+Compresses HTML, JSON and other text responses with brotli (when the
+``brotli`` package is installed and the client accepts it) or gzip. Small
+responses, disallowed content types, streaming responses and media files
+(already-compressed images served under MEDIA_URL) are left untouched.
+
+BREACH: a compressed response that holds a secret (CSRF token, session or
+JWT) next to attacker-controlled text leaks the secret through its length.
+gzip output goes through Django's ``compress_string`` with random padding in
+the gzip header, the mitigation GZipMiddleware uses. Brotli has no such field,
+so it is only used for responses that cannot hold a secret: GET/HEAD requests
+sent without credentials (no Authorization header or session cookie) whose
+response sets no cookies and did not render a CSRF token. Everything else
+gets padded gzip.
+"""
+
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+
+DEFAULT_MIN_SIZE = 1024  # bytes; below this the headers cost more than they save
+DEFAULT_CONTENT_TYPES = (
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'image/svg+xml',
+)
+BROTLI_QUALITY = 5  # fast enough for per-request compression of dynamic pages
+DEFAULT_MAX_RANDOM_BYTES = 100  # gzip header padding, as django.middleware.gzip.GZipMiddleware
+
+_encoding_re = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def accepted_encodings(header):
+    """
+    Parse an Accept-Encoding header.
+
+    Returns:
+        set: Encodings the client accepts (q=0 entries excluded)
+    """
+    accepted = set()
+    for part in header.split(','):
+        match = _encoding_re.match(part)
+        if not match:
+            continue
+        encoding, quality = match.group(1).lower(), match.group(2)
+        try:
+            if quality is not None and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(encoding)
+    return accepted
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress eligible responses with brotli or gzip.
+
+    Settings:
+        COMPRESSION_MIN_SIZE: Minimum body size in bytes (default 1024)
+        COMPRESSION_CONTENT_TYPES: Allowed content types (default: HTML, JSON, text, JS, CSS, XML, SVG)
+        COMPRESSION_MAX_RANDOM_BYTES: Upper bound of the random gzip padding (default 100)
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)
+        self.content_types = tuple(getattr(settings, 'COMPRESSION_CONTENT_TYPES', DEFAULT_CONTENT_TYPES))
+        self.media_url = settings.MEDIA_URL if settings.MEDIA_URL.startswith('/') else f'/{settings.MEDIA_URL}'
+        self.max_random_bytes = getattr(settings, 'COMPRESSION_MAX_RANDOM_BYTES', DEFAULT_MAX_RANDOM_BYTES)
+
+    @staticmethod
+    def may_hold_secret(request, response):
+        """True if the response could contain a CSRF token, session or JWT (see module docstring)."""
+        return (
+            request.method not in ('GET', 'HEAD')
+            or 'HTTP_AUTHORIZATION' in request.META
+            or settings.SESSION_COOKIE_NAME in request.COOKIES
+            or 'CSRF_COOKIE' in request.META  # get_token() ran, e.g. {% csrf_token %}
+            or bool(response.cookies)
+        )
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if request.path.startswith(self.media_url):
+            return response  # Images etc. are already compressed
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in self.content_types:
+            return response
+        if len(response.content) < self.min_size:
+            return response
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is not None and 'br' in accepted and not self.may_hold_secret(request, response):
+            encoding, compressed = 'br', brotli.compress(response.content, quality=BROTLI_QUALITY)
+        elif 'gzip' in accepted:
+            encoding = 'gzip'
+            compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+        else:
+            return response
+
+        # Return the original if compression did not help
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+
+        # The compressed body differs byte-for-byte, so a strong ETag becomes weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+
+        return response
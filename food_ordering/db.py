@@ -0,0 +1,80 @@
+"""
+SQLite write lane.
+
+SQLite allows one writer at a time. When several threads of the same worker
+start write transactions together, all but one spin in SQLite's busy handler
+until the lock frees or the timeout expires ("database is locked").
+``write_transaction`` queues those transactions on an in-process lock
+instead, so they run back to back and only cross-process contention reaches
+the busy handler.
+
+The lane only works if every write transaction takes it. A thread inside a
+plain ``transaction.atomic`` block already holds SQLite's write lock
+(IMMEDIATE mode); if it then waited for the lane while the lane's holder
+waited for that lock, the two would deadlock until the busy timeout. Write
+code therefore uses ``write_transaction`` for its outer block, and entering
+the lane from inside a plain atomic block raises TransactionManagementError.
+
+The lane is used only for SQLite databases with ``SQLITE_WRITE_LANE`` enabled;
+otherwise ``write_transaction`` is a plain ``transaction.atomic``.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.transaction import TransactionManagementError
+
+
+# Re-entrant so nested write_transaction blocks in one thread do not deadlock
+_write_lane = threading.RLock()
+# How many write_transaction blocks the current thread is inside
+_lane_depth = threading.local()
+
+
+def write_lane_enabled(using=None):
+    """Whether write transactions on this database go through the lane."""
+    return (
+        getattr(settings, 'SQLITE_WRITE_LANE', False)
+        and connections[using or DEFAULT_DB_ALIAS].vendor == 'sqlite'
+    )
+
+
+@contextmanager
+def write_transaction(using=None):
+    """
+    ``transaction.atomic`` that waits its turn on the process's write lane.
+
+    Usable as a context manager or decorator. Keep the block short and free of
+    network calls: every other writer in the process waits for it.
+
+    Raises:
+        OperationalError: If the lane stays busy for longer than SQLITE_BUSY_TIMEOUT
+        TransactionManagementError: If called inside a plain transaction.atomic block
+    """
+    if not write_lane_enabled(using):
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    depth = getattr(_lane_depth, 'value', 0)
+    if depth == 0 and _in_plain_atomic(connections[using or DEFAULT_DB_ALIAS]):
+        raise TransactionManagementError(
+            'write_transaction() inside a plain transaction.atomic block could deadlock on the write lane; '
+            'use write_transaction() for the outer block'
+        )
+    if not _write_lane.acquire(timeout=getattr(settings, 'SQLITE_BUSY_TIMEOUT', 5)):
+        raise OperationalError('database is locked (write lane busy)')
+    _lane_depth.value = depth + 1
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        _lane_depth.value = depth
+        _write_lane.release()
+
+
+def _in_plain_atomic(connection):
+    """Whether the connection is inside an atomic block other than TestCase's own wrappers."""
+    return any(not getattr(block, '_from_testcase', False) for block in connection.atomic_blocks)
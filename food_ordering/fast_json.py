@@ -0,0 +1,103 @@
+"""
+Fast JSON encoding/decoding for API and AJAX responses.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise, so the project runs either way. Types orjson does not handle
+natively (Decimal, lazy strings, querysets) and datetimes are passed to the
+same encoder the stdlib path would use, so output matches DRF's
+``JSONRenderer`` and Django's ``JsonResponse`` value for value.
+"""
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from rest_framework import renderers, parsers
+from rest_framework.exceptions import ParseError
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def _orjson_options():
+    return orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def dumps(data, encoder=DjangoJSONEncoder):
+    """
+    Serialise data to JSON bytes.
+
+    Args:
+        data: The value to serialise
+        encoder: JSONEncoder class whose ``default`` handles non-native types
+            (DjangoJSONEncoder matches JsonResponse, DRF's JSONEncoder matches the API)
+
+    Returns:
+        bytes: UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=encoder().default, option=_orjson_options())
+    return json.dumps(data, cls=encoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """Parse JSON from bytes or str (raises json.JSONDecodeError / ValueError on bad input)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JsonResponse(HttpResponse):
+    """
+    Drop-in replacement for ``django.http.JsonResponse`` using the fast encoder.
+
+    Calls with ``json_dumps_params`` (e.g. indent) use Django's stdlib path.
+    """
+
+    def __init__(self, data, encoder=DjangoJSONEncoder, safe=True, json_dumps_params=None, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the "
+                "safe parameter to False."
+            )
+        kwargs.setdefault('content_type', 'application/json')
+        if json_dumps_params:
+            content = json.dumps(data, cls=encoder, **json_dumps_params)
+        else:
+            content = dumps(data, encoder=encoder)
+        super().__init__(content=content, **kwargs)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    DRF JSON renderer backed by orjson.
+
+    Requests for indented output (browsable clients sending ``indent=``) are
+    handled by the standard renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = dumps(data, encoder=self.encoder_class)
+        # Same JavaScript-safety escaping as the standard renderer
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class FastJSONParser(parsers.JSONParser):
+    """DRF JSON parser backed by orjson (UTF-8 bodies only, others use the standard parser)."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,87 @@
+"""
+Non-blocking log handlers.
+
+QueuedFileHandler takes the same arguments as logging.FileHandler, so a
+LOGGING entry only changes its 'class'. The calling thread resolves the
+message and puts the record on an in-memory queue. A QueueListener thread
+then formats it and writes it to disk, so request threads never wait on
+file I/O. If the queue is full because the disk has stalled, records are
+dropped and counted rather than blocking the request.
+"""
+
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+QUEUE_SIZE = 10000
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room so stop() still drains a full queue
+        self.queue.put(self._sentinel)
+
+
+class QueuedFileHandler(QueueHandler):
+    """
+    FileHandler whose formatting and writes happen on a background thread.
+
+    The writer thread starts with the first record in each process, so
+    workers forked after settings are loaded each get their own.
+    """
+
+    def __init__(self, filename, mode='a', encoding=None, delay=True, maxsize=QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize))
+        self.target = logging.FileHandler(filename, mode, encoding, delay)
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def setFormatter(self, fmt):
+        # dictConfig sets the formatter here; it is applied by the writer thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """Fix the message now (args may change later); leave formatting to the writer."""
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Forked child: the parent's writer thread did not come along
+                self.queue = queue.Queue(self.queue.maxsize)
+            self._listener = _Listener(self.queue, self.target)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def flush(self):
+        """Block until every queued record has been written; the writer thread keeps running."""
+        if self._listener is not None and self._pid == os.getpid():
+            self.queue.join()
+        self.target.flush()
+
+    def close(self):
+        """Write out the queue, stop the writer thread and close the file."""
+        with self._start_lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+            self._pid = None
+        self.target.close()
+        super().close()
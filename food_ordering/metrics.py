@@ -0,0 +1,347 @@
+"""
+Request metrics in Prometheus text format.
+
+Each worker accumulates counters and histogram buckets in memory; a
+background thread adds them to a shared SQLite file (WAL mode, like the rate
+limiter's database) every FLUSH_INTERVAL seconds, so the metrics endpoint
+reports totals across every worker on the host and the request path never
+writes to disk. In-flight gauges are stored per process and summed over the
+processes that are still running.
+
+Exported metrics:
+    http_request_duration_seconds{route,method,status}  histogram
+    http_requests_in_flight                               gauge
+    http_request_db_seconds_total{route}                  counter
+    http_request_db_queries_total{route}                  counter
+    http_request_external_seconds_total{route}            counter
+    external_call_duration_seconds{service}               histogram
+    external_call_errors_total{service}                   counter
+
+``route`` is the resolved URL name (e.g. ``store:order-list``), or
+``unmatched`` for requests that did not resolve; ``status`` is the class
+(``2xx``, ``4xx``...).
+"""
+
+import contextvars
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 1.0  # seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+KNOWN_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Request latency by route, method and status class.'),
+    'http_requests_in_flight': ('gauge', 'Requests currently being handled.'),
+    'http_request_db_seconds_total': ('counter', 'Time spent executing SQL, by route.'),
+    'http_request_db_queries_total': ('counter', 'SQL statements executed, by route.'),
+    'http_request_external_seconds_total': ('counter', 'Time spent calling external services, by route.'),
+    'external_call_duration_seconds': ('histogram', 'External service call latency.'),
+    'external_call_errors_total': ('counter', 'External service calls that raised.'),
+}
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS samples ("
+    " name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL, PRIMARY KEY (name, labels)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS gauges ("
+    " name TEXT NOT NULL, pid INTEGER NOT NULL, value REAL NOT NULL, PRIMARY KEY (name, pid)) WITHOUT ROWID",
+)
+
+# External call time for the request being handled (a one-item list so nested
+# scopes share it; a ContextVar so it also follows async views)
+_external_time = contextvars.ContextVar('external_time', default=None)
+
+
+def render_labels(**labels):
+    """Render labels in exposition format, e.g. route="x",status="2xx"."""
+    return ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for key, value in labels.items()
+    )
+
+
+def _with_label(labels, key, value):
+    extra = f'{key}="{value}"'
+    return f'{labels},{extra}' if labels else extra
+
+
+def _bucket_sort_key(labels):
+    base, _, le = labels.rpartition('le="')
+    return base, float('inf') if le.startswith('+Inf') else float(le.rstrip('"'))
+
+
+class MetricsStore:
+    """
+    Per-process metric buffer flushed into a SQLite file shared by all workers.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = defaultdict(float)
+        self._in_flight = 0
+        self._pid = None
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if (conn is None or getattr(self._local, 'pid', None) != os.getpid()
+                or getattr(self._local, 'path', None) != self.path):
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.path = self.path
+        return conn
+
+    def set_path(self, path):
+        """Move the store to another file; buffered metrics are flushed to the old one first."""
+        if self._pid == os.getpid():
+            self.flush()
+        with self._lock:
+            self.path = str(path)
+            # Stops the flush thread; the next recorded metric starts one for the new file
+            self._pid = None
+
+    def _ensure_flusher(self):
+        """Start the flush thread in this process (again after a fork); call with the lock held."""
+        if self._pid == os.getpid():
+            return
+        if self._pid is not None:
+            # Forked child: the parent flushes what it had buffered
+            self._pending.clear()
+            self._in_flight = 0
+        self._pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Could not flush metrics')
+
+    def inc(self, name, labels='', value=1.0):
+        with self._lock:
+            self._ensure_flusher()
+            self._pending[(name, labels)] += value
+
+    def observe(self, name, labels, value, buckets=DURATION_BUCKETS):
+        """Record one histogram observation (buckets are stored cumulative)."""
+        with self._lock:
+            self._ensure_flusher()
+            pending = self._pending
+            for le in buckets:
+                if value <= le:
+                    pending[(name + '_bucket', _with_label(labels, 'le', le))] += 1
+            pending[(name + '_bucket', _with_label(labels, 'le', '+Inf'))] += 1
+            pending[(name + '_count', labels)] += 1
+            pending[(name + '_sum', labels)] += value
+
+    def add_in_flight(self, delta):
+        with self._lock:
+            self._ensure_flusher()
+            self._in_flight += delta
+
+    def flush(self):
+        """Add buffered deltas to the shared store and publish this process's gauges."""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            in_flight = self._in_flight
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO samples (name, labels, value) VALUES (?, ?, ?) '
+                'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value',
+                [(name, labels, value) for (name, labels), value in pending.items()],
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO gauges (name, pid, value) VALUES (?, ?, ?)',
+                ('http_requests_in_flight', os.getpid(), in_flight),
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending[key] += value
+            raise
+
+    def _live_gauges(self, conn):
+        """Sum gauges over running processes, dropping rows left by dead ones."""
+        totals = defaultdict(float)
+        for name, pid, value in conn.execute('SELECT name, pid, value FROM gauges').fetchall():
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                conn.execute('DELETE FROM gauges WHERE pid = ?', (pid,))
+                continue
+            except PermissionError:
+                pass
+            totals[name] += value
+        return totals
+
+    def collect(self):
+        """
+        Render every worker's metrics.
+
+        Returns:
+            str: Prometheus text exposition format (version 0.0.4)
+        """
+        self.flush()
+        conn = self._connection()
+        families = defaultdict(list)
+        for name, labels, value in conn.execute('SELECT name, labels, value FROM samples').fetchall():
+            family = name
+            for suffix in ('_bucket', '_count', '_sum'):
+                if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+                    family = name[:-len(suffix)]
+            families[family].append((name, labels, value))
+        for name, value in self._live_gauges(conn).items():
+            families[name].append((name, '', value))
+
+        lines = []
+        for family, (kind, help_text) in METRICS.items():
+            samples = families.get(family)
+            if not samples:
+                continue
+            lines.append(f'# HELP {family} {help_text}')
+            lines.append(f'# TYPE {family} {kind}')
+            samples.sort(key=lambda sample: (
+                sample[0], _bucket_sort_key(sample[1]) if sample[0].endswith('_bucket') else (sample[1], 0)
+            ))
+            for name, labels, value in samples:
+                lines.append(f'{name}{{{labels}}} {value!r}' if labels else f'{name} {value!r}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Drop all stored and buffered metrics."""
+        with self._lock:
+            self._pending.clear()
+        conn = self._connection()
+        conn.execute('DELETE FROM samples')
+        conn.execute('DELETE FROM gauges')
+
+
+def metrics_db():
+    return str(getattr(settings, 'METRICS_DB', os.path.join(settings.BASE_DIR, 'metrics.sqlite3')))
+
+
+metrics_store = MetricsStore(metrics_db())
+
+
+@receiver(setting_changed)
+def reset_metrics_db(setting, **kwargs):
+    """Follow METRICS_DB overrides (the test runner moves it to a temporary file)."""
+    if setting == 'METRICS_DB':
+        metrics_store.set_path(metrics_db())
+
+
+@contextmanager
+def external_call(service):
+    """
+    Time a call to an external service (Paystack, Twilio...).
+
+    The time is recorded per service and added to the current request's
+    external time.
+    """
+    start = time.perf_counter()
+    labels = render_labels(service=service)
+    try:
+        yield
+    except Exception:
+        metrics_store.inc('external_call_errors_total', labels)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        metrics_store.observe('external_call_duration_seconds', labels, duration)
+        accumulator = _external_time.get()
+        if accumulator is not None:
+            accumulator[0] += duration
+
+
+class MetricsMiddleware:
+    """
+    Record latency, in-flight requests and DB/external time per route.
+
+    DB time comes from SQLInstrumentationMiddleware (request.sql_time), which
+    must come after this middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.skip_prefixes = tuple(
+            prefix for prefix in (settings.STATIC_URL, settings.MEDIA_URL) if prefix and prefix.startswith('/')
+        )
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path.startswith(self.skip_prefixes):
+            return self.get_response(request)
+
+        accumulator = [0.0]
+        token = _external_time.set(accumulator)
+        metrics_store.add_in_flight(1)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics_store.add_in_flight(-1)
+            _external_time.reset(token)
+        self._record(request, response, time.perf_counter() - start, accumulator[0])
+        return response
+
+    async def __acall__(self, request):
+        if request.path.startswith(self.skip_prefixes):
+            return await self.get_response(request)
+
+        accumulator = [0.0]
+        token = _external_time.set(accumulator)
+        metrics_store.add_in_flight(1)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics_store.add_in_flight(-1)
+            _external_time.reset(token)
+        self._record(request, response, time.perf_counter() - start, accumulator[0])
+        return response
+
+    def _record(self, request, response, duration, external_time):
+        resolver_match = getattr(request, 'resolver_match', None)
+        route = (resolver_match.view_name if resolver_match else None) or 'unmatched'
+        method = request.method if request.method in KNOWN_METHODS else 'other'
+        metrics_store.observe(
+            'http_request_duration_seconds',
+            render_labels(route=route, method=method, status=f'{response.status_code // 100}xx'),
+            duration,
+        )
+        route_labels = render_labels(route=route)
+        if hasattr(request, 'sql_time'):
+            metrics_store.inc('http_request_db_seconds_total', route_labels, request.sql_time)
+            metrics_store.inc('http_request_db_queries_total', route_labels, request.sql_query_count)
+        if external_time:
+            metrics_store.inc('http_request_external_seconds_total', route_labels, external_time)
@@ -4,18 +4,59 @@ Comprehensive security hardening middleware
 """
 
 import logging
-import time
+import re
+from urllib.parse import unquote_plus
 from django.http import HttpResponse, JsonResponse
 from django.utils.deprecation import MiddlewareMixin
-from django.core.cache import cache
 from django.conf import settings
-from django.utils import timezone
 from django.contrib.auth.models import AnonymousUser
 import hashlib
 import ipaddress
 
+from .rate_limit import rate_limiter
+
 logger = logging.getLogger('food_ordering.security')
 
+# SQL injection / XSS markers, matched case-insensitively anywhere in a value
+SUSPICIOUS_PATTERNS = [
+    'union', 'select', 'insert', 'delete', 'update', 'drop',
+    'script', 'javascript:', 'vbscript:', 'onload=', 'onerror='
+]
+SUSPICIOUS_RE = re.compile('|'.join(re.escape(pattern) for pattern in SUSPICIOUS_PATTERNS), re.IGNORECASE)
+FORM_CONTENT_TYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+SECURITY_STATUSES = frozenset({400, 401, 403, 429, 500})
+
+
+def find_suspicious(params):
+    """
+    Scan a QueryDict for suspicious values.
+    
+    All values are joined and searched once with the compiled pattern; the
+    per-parameter pass only runs when something matched.
+    
+    Returns:
+        list: (param, value) pairs containing a suspicious pattern
+    """
+    values = [value for _, value_list in params.lists() for value in value_list]
+    if not values or not SUSPICIOUS_RE.search('\x00'.join(values)):
+        return []
+    return [
+        (param, value)
+        for param, value_list in params.lists()
+        for value in value_list
+        if SUSPICIOUS_RE.search(value)
+    ]
+
+def query_string_is_suspicious(query_string):
+    """
+    Pre-filter a raw query string with one search, without building a QueryDict.
+    
+    Parameter names are searched too, so a hit only means find_suspicious()
+    should look at the parsed values.
+    """
+    return bool(query_string) and SUSPICIOUS_RE.search(unquote_plus(query_string)) is not None
+
+
 class SecurityHeadersMiddleware(MiddlewareMixin):
     """
     Add comprehensive security headers to all responses
@@ -66,37 +107,29 @@ class RequestLoggingMiddleware(MiddlewareMixin):
     def __init__(self, get_response):
         self.get_response = get_response
         super().__init__(get_response)
+        self.skip_prefixes = tuple(
+            prefix for prefix in (settings.STATIC_URL, settings.MEDIA_URL) if prefix and prefix.startswith('/')
+        )
     
     def process_request(self, request):
-        # Start timing
-        request._start_time = time.time()
-        
         # Log suspicious patterns
         self._check_suspicious_patterns(request)
         
         # Rate limiting for sensitive endpoints
-        self._check_rate_limits(request)
-        
-        return None
+        return self._check_rate_limits(request)
     
     def process_response(self, request, response):
-        # Calculate request time
-        if hasattr(request, '_start_time'):
-            duration = time.time() - request._start_time
-            
-            # Log slow requests
-            if duration > 5.0:  # 5 seconds
-                logger.warning(
-                    f"Slow request detected: {request.method} {request.path} "
-                    f"took {duration:.2f}s from {self._get_client_ip(request)}"
-                )
+        # Form data is inspected only now, once the view has run
+        self._check_post_patterns(request)
         
-        # Log security-relevant responses
-        if response.status_code in [400, 401, 403, 404, 429, 500]:
+        # Log security-relevant responses; plain 404s are only worth a debug line
+        if response.status_code in SECURITY_STATUSES:
             logger.warning(
-                f"Security response: {response.status_code} for "
-                f"{request.method} {request.path} from {self._get_client_ip(request)}"
+                "Security response: %s for %s %s from %s",
+                response.status_code, request.method, request.path, self._get_client_ip(request),
             )
+        elif response.status_code == 404:
+            logger.debug("Not found: %s %s", request.method, request.path)
         
         return response
     
@@ -110,35 +143,22 @@ class RequestLoggingMiddleware(MiddlewareMixin):
         return ip
     
     def _check_suspicious_patterns(self, request):
-        """Check for suspicious request patterns"""
+        """Check the path and query string for suspicious patterns (POST data is checked after the view)"""
+        if request.path.startswith(self.skip_prefixes):
+            return
+        
         ip = self._get_client_ip(request)
         path = request.path.lower()
         
-        # SQL Injection patterns
-        sql_patterns = [
-            'union', 'select', 'insert', 'delete', 'update', 'drop',
-            'script', 'javascript:', 'vbscript:', 'onload=', 'onerror='
-        ]
-        
         # Check query parameters
-        for param, value in request.GET.items():
-            if any(pattern in str(value).lower() for pattern in sql_patterns):
+        if query_string_is_suspicious(request.META.get('QUERY_STRING', '')):
+            for param, value in find_suspicious(request.GET):
                 logger.warning(
                     f"Potential SQL injection attempt from {ip}: "
                     f"{param}={value} in {request.path}"
                 )
                 self._block_ip_temporarily(ip, "SQL injection attempt")
         
-        # Check POST data
-        if request.method == 'POST':
-            for param, value in request.POST.items():
-                if any(pattern in str(value).lower() for pattern in sql_patterns):
-                    logger.warning(
-                        f"Potential SQL injection attempt from {ip}: "
-                        f"{param}={value} in {request.path}"
-                    )
-                    self._block_ip_temporarily(ip, "SQL injection attempt")
-        
         # Check for path traversal
         if '../' in path or '..\\' in path:
             logger.warning(f"Path traversal attempt from {ip}: {request.path}")
@@ -148,37 +168,58 @@ class RequestLoggingMiddleware(MiddlewareMixin):
         if '/admin/' in path or '/dashboard/login/' in path:
             self._check_admin_brute_force(ip)
     
+    def _check_post_patterns(self, request):
+        """
+        Check form POST data for suspicious patterns.
+        
+        Runs after the view so the body is never parsed early; JSON and other
+        non-form bodies are not inspected (request.POST is empty for them).
+        """
+        if request.method != 'POST' or request.path.startswith(self.skip_prefixes):
+            return
+        content_type = request.META.get('CONTENT_TYPE', '')
+        if not content_type.startswith(FORM_CONTENT_TYPES):
+            return
+        try:
+            post_data = request.POST
+        except Exception:
+            return  # Body already consumed as a stream by the view
+        
+        ip = self._get_client_ip(request)
+        for param, value in find_suspicious(post_data):
+            logger.warning(
+                f"Potential SQL injection attempt from {ip}: "
+                f"{param}={value} in {request.path}"
+            )
+            self._block_ip_temporarily(ip, "SQL injection attempt")
+    
     def _check_rate_limits(self, request):
         """Check rate limits for sensitive endpoints"""
         ip = self._get_client_ip(request)
         path = request.path
         
-        # Rate limiting for login endpoints
-        if '/login/' in path or '/api/auth/' in path:
-            cache_key = f"rate_limit_login_{ip}"
-            attempts = cache.get(cache_key, 0)
-            if attempts >= 5:  # 5 attempts per minute
+        # Rate limiting for login attempts (shared across worker processes);
+        # only credential POSTs count, not page loads of the login forms
+        if request.method == 'POST' and ('/login/' in path or '/api/auth/' in path):
+            allowed, retry_after = rate_limiter.hit(f"login:{ip}", 5, 60)  # 5 attempts per minute
+            if not allowed:
                 logger.warning(f"Rate limit exceeded for login from {ip}")
                 self._block_ip_temporarily(ip, "Rate limit exceeded")
-                return HttpResponse("Rate limit exceeded", status=429)
-            cache.set(cache_key, attempts + 1, 60)  # 1 minute
+                response = HttpResponse("Rate limit exceeded", status=429)
+                response['Retry-After'] = str(retry_after)
+                return response
+        return None
     
     def _check_admin_brute_force(self, ip):
         """Check for admin brute force attempts"""
-        cache_key = f"admin_attempts_{ip}"
-        attempts = cache.get(cache_key, 0)
-        if attempts >= 10:  # 10 attempts per hour
+        allowed, _ = rate_limiter.hit(f"admin:{ip}", 10, 3600)  # 10 attempts per hour
+        if not allowed:
             logger.warning(f"Admin brute force detected from {ip}")
             self._block_ip_temporarily(ip, "Admin brute force", 3600)  # 1 hour block
-        cache.set(cache_key, attempts + 1, 3600)  # 1 hour
     
     def _block_ip_temporarily(self, ip, reason, duration=300):
-        """Temporarily block an IP address"""
-        cache_key = f"blocked_ip_{ip}"
-        cache.set(cache_key, {
-            'reason': reason,
-            'blocked_at': timezone.now().isoformat()
-        }, duration)
+        """Temporarily block an IP address (visible to every worker process)"""
+        rate_limiter.block(f"ip:{ip}", duration, reason)
         logger.warning(f"IP {ip} blocked for {duration}s: {reason}")
 
 class IPWhitelistMiddleware(MiddlewareMixin):
@@ -194,7 +235,7 @@ class IPWhitelistMiddleware(MiddlewareMixin):
         ip = self._get_client_ip(request)
         
         # Check if IP is blocked
-        if cache.get(f"blocked_ip_{ip}"):
+        if rate_limiter.blocked(f"ip:{ip}"):
             logger.warning(f"Blocked IP {ip} attempted to access {request.path}")
             return HttpResponse("Access denied", status=403)
         
@@ -0,0 +1,69 @@
+"""
+Async client for the payment gateway (Paystack).
+
+Async views await ``paystack_request`` instead of blocking a worker thread on
+the round trip. Under ASGI a slow gateway then only holds an open socket, not
+one of the threads that serve everything else. Calls are timed with
+``external_call``. SMS goes through the accounts outbox and
+``food_ordering.sms`` instead, so no request waits on Twilio.
+
+aiohttp is imported on the first call, not at startup; callers catch the
+PaymentGateway* exceptions below rather than aiohttp's.
+"""
+
+from django.conf import settings
+
+from .metrics import external_call
+
+PAYSTACK_API = 'https://api.paystack.co'
+PAYSTACK_TIMEOUT = 30  # seconds
+
+
+class PaymentGatewayError(Exception):
+    """The request to the payment gateway failed in transport."""
+
+
+class PaymentGatewayUnavailable(PaymentGatewayError):
+    """The payment gateway could not be reached."""
+
+
+async def paystack_request(method, path, payload=None):
+    """
+    Call the Paystack API.
+
+    Args:
+        method (str): HTTP method
+        path (str): API path, e.g. ``/transaction/verify/<reference>``
+        payload (dict): JSON body, if any
+
+    Returns:
+        dict: The decoded response body
+
+    Raises:
+        PaymentGatewayUnavailable: Paystack could not be reached
+        asyncio.TimeoutError: No response within PAYSTACK_TIMEOUT
+        PaymentGatewayError: Any other transport error
+    """
+    import aiohttp
+
+    headers = {"Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"}
+    timeout = aiohttp.ClientTimeout(total=PAYSTACK_TIMEOUT)
+    try:
+        with external_call('paystack'):
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.request(method, PAYSTACK_API + path, json=payload, headers=headers) as response:
+                    return await response.json(content_type=None)
+    except aiohttp.ClientConnectionError as e:
+        raise PaymentGatewayUnavailable(str(e)) from e
+    except aiohttp.ClientError as e:
+        raise PaymentGatewayError(str(e)) from e
+
+
+def format_phone_number(phone_number):
+    """Put a local (0...) or bare number in +234 international form."""
+    if phone_number.startswith('0'):
+        return '+234' + phone_number[1:]
+    if not phone_number.startswith('+'):
+        return '+234' + phone_number
+    return phone_number
+
@@ -0,0 +1,179 @@
+"""
+Shared sliding-window rate limiter.
+
+Counters live in a small SQLite database (WAL mode) next to the project, so
+every gunicorn worker on the host sees the same counts. Each hit is a single
+``BEGIN IMMEDIATE`` transaction that reads the current and previous window
+and increments atomically, so concurrent requests cannot both slip under the
+limit. Nothing is evicted under load the way LocMemCache entries are.
+
+The limit uses the sliding-window-counter approximation: the previous fixed
+window's count is weighted by how much of it still overlaps the sliding window.
+"""
+
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+logger = logging.getLogger('food_ordering.security')
+
+# Fraction of hits that also delete expired rows
+CLEANUP_PROBABILITY = 0.001
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS rate_windows ("
+    " key TEXT NOT NULL, window_start INTEGER NOT NULL, hits INTEGER NOT NULL,"
+    " expires_at REAL NOT NULL, PRIMARY KEY (key, window_start)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS rate_blocks ("
+    " key TEXT PRIMARY KEY, reason TEXT NOT NULL, blocked_until REAL NOT NULL) WITHOUT ROWID",
+)
+
+
+class SlidingWindowRateLimiter:
+    """
+    Atomic, cross-process sliding-window counters and temporary blocks.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if (conn is None or getattr(self._local, 'pid', None) != os.getpid()
+                or getattr(self._local, 'path', None) != self.path):
+            # One connection per thread, reopened after a fork (gunicorn preload)
+            # or when the database moves (RATE_LIMIT_DB overridden in tests)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.path = self.path
+        return conn
+
+    def hit(self, key, limit, window):
+        """
+        Record one request for a key if it is under the limit.
+
+        Args:
+            key: Identity being limited (e.g. 'login:1.2.3.4')
+            limit: Requests allowed per sliding window
+            window: Window length in seconds
+
+        Returns:
+            tuple: (allowed bool, seconds until a retry may succeed or None)
+        """
+        now = time.time()
+        window = int(window)
+        current_start = int(now // window) * window
+        previous_start = current_start - window
+        elapsed = now - current_start
+
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = dict(conn.execute(
+                'SELECT window_start, hits FROM rate_windows WHERE key = ? AND window_start IN (?, ?)',
+                (key, current_start, previous_start),
+            ).fetchall())
+            current = rows.get(current_start, 0)
+            previous = rows.get(previous_start, 0)
+            estimated = previous * (window - elapsed) / window + current
+
+            if estimated >= limit:
+                conn.execute('COMMIT')
+                return False, max(1, int(window - elapsed))
+
+            conn.execute(
+                'INSERT INTO rate_windows (key, window_start, hits, expires_at) VALUES (?, ?, 1, ?) '
+                'ON CONFLICT (key, window_start) DO UPDATE SET hits = hits + 1',
+                (key, current_start, current_start + 2 * window),
+            )
+            if random.random() < CLEANUP_PROBABILITY:
+                conn.execute('DELETE FROM rate_windows WHERE expires_at < ?', (now,))
+                conn.execute('DELETE FROM rate_blocks WHERE blocked_until < ?', (now,))
+            conn.execute('COMMIT')
+            return True, None
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def block(self, key, duration, reason=''):
+        """Block a key for ``duration`` seconds."""
+        self._connection().execute(
+            'INSERT INTO rate_blocks (key, reason, blocked_until) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET reason = excluded.reason, blocked_until = excluded.blocked_until',
+            (key, reason, time.time() + duration),
+        )
+
+    def blocked(self, key):
+        """
+        Check whether a key is blocked.
+
+        Returns:
+            str or None: The block reason if blocked
+        """
+        row = self._connection().execute(
+            'SELECT reason FROM rate_blocks WHERE key = ? AND blocked_until > ?',
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def reset(self, key=None):
+        """Clear counters and blocks (for one key, or everything)."""
+        conn = self._connection()
+        if key is None:
+            conn.execute('DELETE FROM rate_windows')
+            conn.execute('DELETE FROM rate_blocks')
+        else:
+            conn.execute('DELETE FROM rate_windows WHERE key = ?', (key,))
+            conn.execute('DELETE FROM rate_blocks WHERE key = ?', (key,))
+
+
+def rate_limit_db():
+    return str(getattr(settings, 'RATE_LIMIT_DB', os.path.join(settings.BASE_DIR, 'ratelimit.sqlite3')))
+
+
+rate_limiter = SlidingWindowRateLimiter(rate_limit_db())
+
+
+@receiver(setting_changed)
+def reset_rate_limit_db(setting, **kwargs):
+    """Follow RATE_LIMIT_DB overrides (the test runner moves it to a temporary file)."""
+    if setting == 'RATE_LIMIT_DB':
+        rate_limiter.path = rate_limit_db()
+
+
+class SlidingWindowThrottleMixin:
+    """Run a DRF throttle on the shared sliding-window limiter instead of the cache."""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        allowed, self._retry_after = rate_limiter.hit(self.key, self.num_requests, self.duration)
+        return allowed
+
+    def wait(self):
+        return getattr(self, '_retry_after', None)
+
+
+class SlidingWindowAnonRateThrottle(SlidingWindowThrottleMixin, AnonRateThrottle):
+    """Anonymous-user throttle shared across worker processes."""
+
+
+class SlidingWindowUserRateThrottle(SlidingWindowThrottleMixin, UserRateThrottle):
+    """Authenticated-user throttle shared across worker processes."""
@@ -0,0 +1,21 @@
+"""
+Database session engine whose writes go through the SQLite write lane.
+
+Cart updates save the session on almost every customer request, so these
+short writes are queued with the other write transactions instead of racing
+them for the database lock.
+"""
+
+from django.contrib.sessions.backends import db
+
+from .db import write_transaction
+
+
+class SessionStore(db.SessionStore):
+    def save(self, must_create=False):
+        with write_transaction():
+            super().save(must_create=must_create)
+
+    def delete(self, session_key=None):
+        with write_transaction():
+            super().delete(session_key)
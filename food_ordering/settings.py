@@ -61,6 +61,7 @@ INSTALLED_APPS = [
     'store',
     'dashboard',
     'customer_site',
+    'jobs',
 
 ]
 
@@ -70,6 +71,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     # Security middleware (order matters!) - TEMPORARILY DISABLED FOR DEVELOPMENT
     # 'django.middleware.security.SecurityMiddleware',
+    'food_ordering.compression_middleware.CompressionMiddleware',  # brotli/gzip for HTML and JSON (outermost)
+    'food_ordering.metrics.MetricsMiddleware',  # Per-route latency histograms for /metrics
+    'food_ordering.sql_instrumentation.SQLInstrumentationMiddleware',  # Per-request query count/time, slow-request reports
     'corsheaders.middleware.CorsMiddleware',  
     'food_ordering.media_middleware.MediaCORSHeadersMiddleware',  # Custom media CORS headers
     # 'django_ratelimit.middleware.RatelimitMiddleware',  # Rate limiting (disabled for development)
@@ -79,6 +83,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     # 'django.middleware.csrf.CsrfViewMiddleware',  # Temporarily disabled for development
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'customer_site.middleware.CustomerAuthMiddleware',  # Lazy JWT/session customer resolution
     'django.contrib.messages.middleware.MessageMiddleware',
     # 'django.middleware.clickjacking.XFrameOptionsMiddleware',  # Temporarily disabled for development
 
@@ -103,6 +108,7 @@ SECURE_HSTS_INCLUDE_SUBDOMAINS = True
 SECURE_HSTS_PRELOAD = True
 
 # Session Security (relaxed for development)
+SESSION_ENGINE = 'food_ordering.sessions'  # database sessions, written through the SQLite write lane
 SESSION_COOKIE_SECURE = config("SESSION_COOKIE_SECURE", default=False, cast=bool)  # False for development
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Lax'  # Lax for development
@@ -191,28 +197,85 @@ CORS_ALLOW_HEADERS = [
 ]
 
 # Database Security
+# SQLite connection profile: WAL lets readers run alongside the single writer,
+# IMMEDIATE transactions take the write lock at BEGIN (no failing lock
+# upgrades mid-transaction) and the pragmas run on every new connection.
+SQLITE_BUSY_TIMEOUT = config('SQLITE_BUSY_TIMEOUT', default=5, cast=int)  # seconds
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
         'OPTIONS': {
-            'timeout': 20,
+            'timeout': SQLITE_BUSY_TIMEOUT,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT * 1000};'
+                'PRAGMA mmap_size=134217728;'  # 128 MiB
+                'PRAGMA cache_size=-20000;'  # ~20 MiB page cache per connection
+                'PRAGMA temp_store=MEMORY;'
+            ),
         }
     }
 }
 
+# Serialise short write transactions within each process (food_ordering.db.write_transaction)
+SQLITE_WRITE_LANE = config('SQLITE_WRITE_LANE', default=True, cast=bool)
+
 # Cache Configuration for django-ratelimit
+# Per-process L1 in front of a SQLite file shared by all workers (food_ordering.cache)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'food_ordering.cache.TwoTierCache',
+        'LOCATION': config('CACHE_DB', default=str(BASE_DIR / 'cache.sqlite3')),
         'TIMEOUT': 300,
         'OPTIONS': {
-            'MAX_ENTRIES': 1000,
+            'MAX_ENTRIES': 10000,
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 30,
+            'SYNC_INTERVAL': 1,
         }
     }
 }
 
+# Tests use temporary copies of the SQLite stores above and below (food_ordering.test_runner)
+TEST_RUNNER = 'food_ordering.test_runner.TestRunner'
+
+# Shared rate-limit counters (food_ordering.rate_limit), one SQLite file per host
+RATE_LIMIT_DB = config('RATE_LIMIT_DB', default=str(BASE_DIR / 'ratelimit.sqlite3'))
+
+# Request metrics (food_ordering.metrics), aggregated across workers in one SQLite file per host
+METRICS_DB = config('METRICS_DB', default=str(BASE_DIR / 'metrics.sqlite3'))
+# /metrics requires "Authorization: Bearer <METRICS_TOKEN>" (or a logged-in staff user); unset = staff only
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Background jobs (jobs app): SMS and housekeeping run from `manage.py run_workers`
+JOB_WORKER_CONCURRENCY = config('JOB_WORKER_CONCURRENCY', default=4, cast=int)
+JOB_POLL_INTERVAL = config('JOB_POLL_INTERVAL', default=1, cast=float)  # seconds
+JOB_LEASE = config('JOB_LEASE', default=300, cast=int)  # seconds before a running job is reclaimed
+JOB_RETRY_BASE = config('JOB_RETRY_BASE', default=10, cast=int)  # seconds, doubled per failed attempt
+JOB_RETRY_MAX = config('JOB_RETRY_MAX', default=3600, cast=int)
+JOB_RETENTION_DAYS = config('JOB_RETENTION_DAYS', default=7, cast=int)
+# Periodic jobs, queued once per 'every' seconds across all workers. Cleanup
+# commands can be added as {'task': 'jobs.call_command', 'every': ...,
+# 'payload': {'command': '...', 'options': {...}}}.
+JOB_SCHEDULE = {
+    'purge_expired_otps': {'task': 'accounts.purge_expired_otps', 'every': 3600},
+    'prune_tombstones': {'task': 'store.prune_tombstones', 'every': 3600},
+    'prune_jobs': {'task': 'jobs.prune', 'every': 24 * 3600},
+    'flush_sms': {'task': 'sms.flush', 'every': 30},  # retries and stragglers
+}
+
+# SMS outbox (accounts.outbox) and transport (food_ordering.sms). Use
+# food_ordering.sms.FakeTransport to run OTP flows offline, e.g. for load tests.
+SMS_TRANSPORT = config('SMS_TRANSPORT', default='food_ordering.sms.TwilioTransport')
+SMS_FAKE_LATENCY = config('SMS_FAKE_LATENCY', default=0, cast=float)  # seconds per fake send
+SMS_BATCH_SIZE = config('SMS_BATCH_SIZE', default=50, cast=int)
+SMS_RATE_PER_SECOND = config('SMS_RATE_PER_SECOND', default=10, cast=float)  # per worker process
+SMS_MAX_ATTEMPTS = config('SMS_MAX_ATTEMPTS', default=5, cast=int)
+
 # Django Rate Limit Configuration
 DJANGO_RATELIMIT_USE_CACHE = 'default'
 DJANGO_RATELIMIT_ENABLE = True
@@ -221,6 +284,22 @@ DJANGO_RATELIMIT_ENABLE = True
 SILENCED_SYSTEM_CHECKS = ['django_ratelimit.E003', 'django_ratelimit.W001']
 
 # Logging Security Events
+# Per-request SQL instrumentation (food_ordering.sql_instrumentation).
+# Requests over any limit are logged as JSON at WARNING, explained and listed
+# on the dashboard SQL page; set SQL_LOG_LEVEL=INFO to log every request.
+SQL_INSTRUMENTATION = config('SQL_INSTRUMENTATION', default=True, cast=bool)
+SQL_REQUEST_QUERY_LIMIT = config('SQL_REQUEST_QUERY_LIMIT', default=50, cast=int)
+SQL_REQUEST_TIME_MS = config('SQL_REQUEST_TIME_MS', default=300, cast=int)
+SQL_SLOW_QUERY_MS = config('SQL_SLOW_QUERY_MS', default=100, cast=int)
+SQL_LOG_LEVEL = config('SQL_LOG_LEVEL', default='WARNING')
+
+# Application loggers (accounts, customer_site, dashboard, jobs, store). Their debug
+# output costs one level check per call unless APP_LOG_LEVEL=DEBUG.
+APP_LOG_LEVEL = config('APP_LOG_LEVEL', default='INFO')
+
+# File handlers are queued (food_ordering.logging_handlers): request threads
+# enqueue records and a background thread writes them.
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -233,20 +312,36 @@ LOGGING = {
             'format': 'SECURITY {levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'sql': {
+            'format': 'SQL {levelname} {asctime} {process:d} {message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'security_file': {
             'level': 'WARNING',
-            'class': 'logging.FileHandler',
+            'class': 'food_ordering.logging_handlers.QueuedFileHandler',
             'filename': BASE_DIR / 'logs' / 'security.log',
             'formatter': 'security',
         },
         'error_file': {
             'level': 'ERROR',
-            'class': 'logging.FileHandler',
+            'class': 'food_ordering.logging_handlers.QueuedFileHandler',
             'filename': BASE_DIR / 'logs' / 'error.log',
             'formatter': 'verbose',
         },
+        'sql_file': {
+            'level': SQL_LOG_LEVEL,
+            'class': 'food_ordering.logging_handlers.QueuedFileHandler',
+            'filename': BASE_DIR / 'logs' / 'sql.log',
+            'formatter': 'sql',
+        },
+        'app_file': {
+            'level': APP_LOG_LEVEL,
+            'class': 'food_ordering.logging_handlers.QueuedFileHandler',
+            'filename': BASE_DIR / 'logs' / 'app.log',
+            'formatter': 'verbose',
+        },
     },
     'loggers': {
         'django.security': {
@@ -264,6 +359,36 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': True,
         },
+        'food_ordering.sql': {
+            'handlers': ['sql_file'],
+            'level': SQL_LOG_LEVEL,
+            'propagate': False,
+        },
+        'accounts': {
+            'handlers': ['app_file', 'error_file'],
+            'level': APP_LOG_LEVEL,
+            'propagate': False,
+        },
+        'customer_site': {
+            'handlers': ['app_file', 'error_file'],
+            'level': APP_LOG_LEVEL,
+            'propagate': False,
+        },
+        'dashboard': {
+            'handlers': ['app_file', 'error_file'],
+            'level': APP_LOG_LEVEL,
+            'propagate': False,
+        },
+        'store': {
+            'handlers': ['app_file', 'error_file'],
+            'level': APP_LOG_LEVEL,
+            'propagate': False,
+        },
+        'jobs': {
+            'handlers': ['app_file', 'error_file'],
+            'level': APP_LOG_LEVEL,
+            'propagate': False,
+        },
     },
 }
 
@@ -369,16 +494,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'food_ordering.fast_json.FastJSONRenderer',  # orjson when installed, stdlib otherwise
     ),
     'DEFAULT_PARSER_CLASSES': (
-        'rest_framework.parsers.JSONParser',
+        'food_ordering.fast_json.FastJSONParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ),
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'food_ordering.rate_limit.SlidingWindowAnonRateThrottle',
+        'food_ordering.rate_limit.SlidingWindowUserRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/hour',
@@ -418,6 +543,14 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
 }
 
+# Response compression (food_ordering.compression_middleware)
+COMPRESSION_MIN_SIZE = 1024  # bytes
+COMPRESSION_MAX_RANDOM_BYTES = 100  # random gzip header padding against BREACH
+
+# Customer-site token -> user cache (per process; entries are dropped when the user is saved)
+TOKEN_USER_CACHE_SIZE = 1024
+TOKEN_USER_CACHE_TTL = 5  # seconds
+
 # -------------------
 # Twilio (OTP)
 # -------------------
@@ -0,0 +1,123 @@
+"""
+SMS transports.
+
+The SMS_TRANSPORT setting names the class that delivers messages queued in
+the accounts SMS outbox:
+
+    food_ordering.sms.TwilioTransport  Twilio (default)
+    food_ordering.sms.FakeTransport    Keeps messages in memory; for tests and
+                                       offline load tests of the OTP flows
+
+``get_transport()`` returns one instance per process. The Twilio transport
+holds a single Client whose HTTP session keeps connections to the API open,
+so a batch of messages pays for one TLS handshake rather than one each.
+
+Settings:
+    SMS_TRANSPORT: Dotted path of the transport class
+    SMS_FAKE_LATENCY: Seconds FakeTransport waits per message, to mimic the
+        provider round trip (default 0)
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .metrics import external_call
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSPORT = 'food_ordering.sms.TwilioTransport'
+TWILIO_TIMEOUT = 30  # seconds
+
+
+class SMSRejected(Exception):
+    """The provider refused the message; retrying will not help (bad number, blocked...)."""
+
+
+class TwilioTransport:
+    """Send through Twilio's Messages API on a shared, keep-alive HTTP session."""
+
+    def __init__(self):
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client
+
+        self.client = Client(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            http_client=TwilioHttpClient(pool_connections=True, timeout=TWILIO_TIMEOUT),
+        )
+
+    def send(self, to, body):
+        """
+        Send one message.
+
+        Returns:
+            str: The Twilio message SID
+
+        Raises:
+            SMSRejected: Twilio refused the message (4xx)
+            Exception: Any other error, which may succeed on retry
+        """
+        from twilio.base.exceptions import TwilioRestException
+
+        try:
+            with external_call('twilio'):
+                message = self.client.messages.create(body=body, from_=settings.TWILIO_PHONE_NUMBER, to=to)
+        except TwilioRestException as e:
+            if 400 <= e.status < 500 and e.status != 429:
+                raise SMSRejected(str(e)) from e
+            raise
+        return message.sid
+
+
+class FakeTransport:
+    """
+    Record messages instead of sending them.
+
+    Sent messages are appended to ``FakeTransport.outbox`` as (to, body, sid)
+    tuples, like django.core.mail.outbox for email.
+    """
+    outbox = []
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.latency = getattr(settings, 'SMS_FAKE_LATENCY', 0)
+
+    def send(self, to, body):
+        if self.latency:
+            time.sleep(self.latency)
+        sid = f'FAKE{next(self._ids):08d}'
+        self.outbox.append((to, body, sid))
+        logger.debug("Fake SMS %s to %s: %s", sid, to, body)
+        return sid
+
+
+_transport = None
+_transport_pid = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """The process's SMS transport, created on first use (again after a fork)."""
+    global _transport, _transport_pid
+    if _transport is None or _transport_pid != os.getpid():
+        with _transport_lock:
+            if _transport is None or _transport_pid != os.getpid():
+                _transport = import_string(getattr(settings, 'SMS_TRANSPORT', DEFAULT_TRANSPORT))()
+                _transport_pid = os.getpid()
+    return _transport
+
+
+@receiver(setting_changed)
+def reset_transport(setting, **kwargs):
+    """Pick up SMS_* or TWILIO_* overrides (e.g. override_settings in tests)."""
+    global _transport
+    if setting.startswith(('SMS_', 'TWILIO_')):
+        _transport = None
@@ -0,0 +1,287 @@
+"""
+Per-request SQL instrumentation.
+
+SQLInstrumentationMiddleware wraps every database connection with
+``connection.execute_wrapper`` for the duration of a request and records the
+query count, total SQL time, the slowest statements and statements repeated
+many times (the usual N+1 signature). Every request gets an INFO log line,
+and a ``Server-Timing`` header when DEBUG is on or the user is staff (the
+header tells anyone who can read it how much database work a URL costs).
+Requests over the thresholds also get EXPLAIN output for their slowest
+statements, a WARNING log line, and a report in the shared cache for the staff
+SQL page on the dashboard.
+
+Each report is its own cache entry. A counter, bumped with an atomic
+``cache.incr``, numbers them, and report N goes in slot N % MAX_REPORTS, so
+workers flagging requests at the same time never overwrite each other's
+reports; only reports older than the last MAX_REPORTS are replaced.
+
+Settings:
+    SQL_INSTRUMENTATION: Enable the middleware (default True)
+    SQL_REQUEST_QUERY_LIMIT: Flag requests with more queries than this (default 50)
+    SQL_REQUEST_TIME_MS: Flag requests spending longer than this in SQL (default 300)
+    SQL_SLOW_QUERY_MS: Flag requests with any statement slower than this (default 100)
+"""
+
+import heapq
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from .fast_json import dumps
+
+logger = logging.getLogger('food_ordering.sql')
+
+REPORT_SEQ_KEY = 'sql:slow_requests:seq'
+REPORT_KEY = 'sql:slow_requests:{}'
+MAX_REPORTS = 50
+REPORT_TTL = 7 * 24 * 3600
+SLOWEST_KEPT = 5
+EXPLAINED = 3  # slowest statements explained per flagged request
+REPEATED_SHOWN = 3
+REPEAT_THRESHOLD = 10  # same statement this many times looks like N+1
+MAX_SQL_LENGTH = 2000
+
+
+class QueryRecorder:
+    """
+    execute_wrapper that counts and times statements.
+
+    Keeps the SLOWEST_KEPT slowest statements (with params) in a heap and a
+    count per distinct SQL string.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = []
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total += duration
+            self.statements[sql] += 1
+            entry = (duration, self.count, sql, None if many else params, context['connection'].alias)
+            if len(self.slowest) < SLOWEST_KEPT:
+                heapq.heappush(self.slowest, entry)
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def slowest_first(self):
+        return sorted(self.slowest, reverse=True)
+
+    def repeated(self):
+        """Statements run at least REPEAT_THRESHOLD times, most frequent first."""
+        return [
+            (sql, count)
+            for sql, count in self.statements.most_common(REPEATED_SHOWN)
+            if count >= REPEAT_THRESHOLD
+        ]
+
+
+def explain(alias, sql, params):
+    """
+    Get the plan for a SELECT statement.
+
+    Returns:
+        str or None: The plan text, an error note, or None for non-SELECT statements
+    """
+    if params is None or not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            rows = cursor.fetchall()
+    except DatabaseError as e:
+        return f'EXPLAIN failed: {e}'
+    return '\n'.join(' '.join(str(column) for column in row) for row in rows)
+
+
+def thresholds():
+    return {
+        'query_limit': getattr(settings, 'SQL_REQUEST_QUERY_LIMIT', 50),
+        'request_ms': getattr(settings, 'SQL_REQUEST_TIME_MS', 300),
+        'slow_query_ms': getattr(settings, 'SQL_SLOW_QUERY_MS', 100),
+    }
+
+
+def flag_reasons(recorder, limits):
+    """
+    Check a request's SQL against the thresholds.
+
+    Returns:
+        list: Human-readable reasons the request was flagged (empty if it was not)
+    """
+    reasons = []
+    if recorder.count > limits['query_limit']:
+        reasons.append(f"{recorder.count} queries (limit {limits['query_limit']})")
+    if recorder.total * 1000 > limits['request_ms']:
+        reasons.append(f"{recorder.total * 1000:.0f} ms in SQL (limit {limits['request_ms']} ms)")
+    if recorder.slowest and max(recorder.slowest)[0] * 1000 > limits['slow_query_ms']:
+        reasons.append(f"statement slower than {limits['slow_query_ms']} ms")
+    if recorder.repeated():
+        reasons.append(f"statement repeated {recorder.repeated()[0][1]} times")
+    return reasons
+
+
+def is_staff(user):
+    """Whether a user may see SQL timings (the Server-Timing header and the dashboard SQL page)."""
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+def _report_slots(last):
+    """(sequence number, cache key) of the newest MAX_REPORTS reports up to ``last``, newest first."""
+    return [(seq, REPORT_KEY.format(seq % MAX_REPORTS)) for seq in range(last, max(last - MAX_REPORTS, 0), -1)]
+
+
+def get_recent_reports():
+    """Flagged request reports, newest first."""
+    slots = _report_slots(cache.get(REPORT_SEQ_KEY, 0))
+    stored = cache.get_many([key for _, key in slots])
+    # A slot still holding an older report (its replacement not written yet) is skipped
+    return [
+        stored[key]['report']
+        for seq, key in slots
+        if key in stored and stored[key]['seq'] == seq
+    ]
+
+
+def clear_reports():
+    cache.delete_many([REPORT_SEQ_KEY] + [REPORT_KEY.format(slot) for slot in range(MAX_REPORTS)])
+
+
+def save_report(report):
+    """Store a report in the next slot (atomic across workers)."""
+    cache.add(REPORT_SEQ_KEY, 0, None)
+    seq = cache.incr(REPORT_SEQ_KEY)
+    cache.set(REPORT_KEY.format(seq % MAX_REPORTS), {'seq': seq, 'report': report}, REPORT_TTL)
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Record SQL per request; report and explain requests over the thresholds.
+
+    Database connections are per thread. For async requests the wrappers are
+    installed in the thread that runs the request's sync_to_async calls
+    (Django keeps one per request), which is where its queries execute.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'SQL_INSTRUMENTATION', True)
+        self.skip_prefixes = tuple(
+            prefix for prefix in (settings.STATIC_URL, settings.MEDIA_URL) if prefix and prefix.startswith('/')
+        )
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled or request.path.startswith(self.skip_prefixes):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with self._wrap_connections(recorder):
+            response = self.get_response(request)
+        show_timing = settings.DEBUG or is_staff(getattr(request, 'user', None))
+        flagged = self._summarize(request, response, recorder, show_timing)
+        if flagged:
+            self._report(recorder, flagged)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled or request.path.startswith(self.skip_prefixes):
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        stack = await sync_to_async(self._wrap_connections)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        show_timing = settings.DEBUG
+        if not show_timing and hasattr(request, 'auser'):
+            show_timing = is_staff(await request.auser())
+        flagged = self._summarize(request, response, recorder, show_timing)
+        if flagged:
+            await sync_to_async(self._report)(recorder, flagged)
+        return response
+
+    @staticmethod
+    def _wrap_connections(recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def _summarize(self, request, response, recorder, show_timing):
+        """
+        Expose the totals on the request (and, if ``show_timing``, the response) and check the thresholds.
+
+        Returns:
+            tuple: (summary, reasons) for a flagged request, or None
+        """
+        # Read by MetricsMiddleware for the per-route DB time breakdown
+        request.sql_time = recorder.total
+        request.sql_query_count = recorder.count
+
+        sql_ms = recorder.total * 1000
+        if show_timing and not response.has_header('Server-Timing'):
+            response['Server-Timing'] = f'db;dur={sql_ms:.1f};desc="{recorder.count} queries"'
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        summary = {
+            'method': request.method,
+            'path': request.path,
+            'view': resolver_match.view_name if resolver_match else None,
+            'status': response.status_code,
+            'query_count': recorder.count,
+            'sql_ms': round(sql_ms, 2),
+        }
+
+        reasons = flag_reasons(recorder, thresholds())
+        if not reasons:
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(dumps(summary).decode())
+            return None
+        return summary, reasons
+
+    def _report(self, recorder, flagged):
+        """Log and store a flagged request with EXPLAIN output (runs queries)."""
+        summary, reasons = flagged
+        slowest = recorder.slowest_first()
+        report = {
+            **summary,
+            'time': timezone.now().isoformat(),
+            'reasons': reasons,
+            'slowest': [
+                {
+                    'sql': sql[:MAX_SQL_LENGTH],
+                    'ms': round(duration * 1000, 2),
+                    'explain': explain(alias, sql, params) if index < EXPLAINED else None,
+                }
+                for index, (duration, _, sql, params, alias) in enumerate(slowest)
+            ],
+            'repeated': [{'sql': sql[:MAX_SQL_LENGTH], 'count': count} for sql, count in recorder.repeated()],
+        }
+        logger.warning(dumps(report).decode())
+        try:
+            save_report(report)
+        except Exception:
+            logger.exception('Could not store SQL report')
@@ -0,0 +1,44 @@
+"""
+Test runner that keeps the suite away from the host's shared stores.
+
+The two-tier cache (L2), the rate limiter and the request metrics keep their
+data in SQLite files next to the project, shared with the running site. For
+a test run the runner points them at a temporary directory. Tests can then
+clear them freely without wiping live cache entries, lifting live IP blocks
+and login throttles, or adding test traffic to the production metrics.
+"""
+
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.store_dir = tempfile.mkdtemp(prefix='food_ordering-tests-')
+        self.store_settings = override_settings(**self.store_overrides(self.store_dir))
+        self.store_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.store_settings.disable()
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
+
+    @staticmethod
+    def store_overrides(directory):
+        """Settings that move each shared store into ``directory``."""
+        caches = {
+            alias: {**config, 'LOCATION': os.path.join(directory, f'cache-{alias}.sqlite3')}
+            for alias, config in settings.CACHES.items()
+        }
+        return {
+            'CACHES': caches,
+            'RATE_LIMIT_DB': os.path.join(directory, 'ratelimit.sqlite3'),
+            'METRICS_DB': os.path.join(directory, 'metrics.sqlite3'),
+        }
@@ -0,0 +1,400 @@
+import datetime
+import io
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import time
+import uuid
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse as DjangoJsonResponse, QueryDict
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import User
+from .cache import TwoTierCache
+from .fast_json import FastJSONParser, FastJSONRenderer, JsonResponse
+from .logging_handlers import QueuedFileHandler
+from .middleware import (
+    SUSPICIOUS_PATTERNS, SUSPICIOUS_RE, RequestLoggingMiddleware, find_suspicious, query_string_is_suspicious,
+)
+from .rate_limit import rate_limiter
+
+
+class SlidingWindowRateLimiterTests(TestCase):
+    """Sliding-window counts, the previous window's weighting and the login 429."""
+
+    def setUp(self):
+        rate_limiter.reset()
+
+    def hit_at(self, moment, limit=4, window=60):
+        with mock.patch('food_ordering.rate_limit.time.time', return_value=moment):
+            return rate_limiter.hit('test:key', limit, window)
+
+    def test_limit_enforced_within_window(self):
+        for _ in range(4):
+            self.assertEqual(self.hit_at(950), (True, None))
+        # 10 s left in the 900-960 window
+        self.assertEqual(self.hit_at(950), (False, 10))
+
+    def test_previous_window_weighted_by_overlap(self):
+        for _ in range(4):
+            self.hit_at(950)
+        # 15 s into the next window, 45/60 of the previous 4 hits still count: 3
+        self.assertEqual(self.hit_at(975), (True, None))
+        self.assertEqual(self.hit_at(975), (False, 45))
+        # 45 s in, only 1 of them counts, plus the 1 hit already in this window
+        self.assertTrue(self.hit_at(1005)[0])
+        self.assertTrue(self.hit_at(1005)[0])
+        self.assertFalse(self.hit_at(1005)[0])
+
+    def test_old_windows_forgotten(self):
+        for _ in range(4):
+            self.hit_at(950)
+        self.assertTrue(self.hit_at(1030)[0])
+
+    def test_denied_hits_not_counted(self):
+        for _ in range(10):
+            self.hit_at(950)
+        # Only the 4 allowed hits carry over: 4 * 15/60 = 1 at 45 s in
+        for _ in range(3):
+            self.assertTrue(self.hit_at(1005)[0])
+        self.assertFalse(self.hit_at(1005)[0])
+
+    def test_login_posts_limited_with_429(self):
+        for _ in range(5):
+            self.assertEqual(self.client.post('/api/accounts/login/', REMOTE_ADDR='203.0.113.7').status_code, 400)
+        response = self.client.post('/api/accounts/login/', REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        # Other clients keep their own budget
+        self.assertEqual(self.client.post('/api/accounts/login/', REMOTE_ADDR='203.0.113.8').status_code, 400)
+
+    def test_login_page_loads_not_counted(self):
+        for _ in range(8):
+            self.client.get('/api/accounts/login/', REMOTE_ADDR='203.0.113.9')
+        self.assertEqual(self.client.post('/api/accounts/login/', REMOTE_ADDR='203.0.113.9').status_code, 400)
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    """L1 stays coherent with writes from other processes; counters and key semantics match Django's."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = TwoTierCache(self.path, {'OPTIONS': {'SYNC_INTERVAL': 0}})
+
+    def write_from_other_process(self, key, value):
+        """Change an entry the way another worker would, logging it under a different pid."""
+        key = self.cache.make_key(key)
+        conn = sqlite3.connect(self.path, isolation_level=None)
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, NULL)',
+            (key, pickle.dumps(value)),
+        )
+        conn.execute(
+            'INSERT INTO cache_invalidations (key, origin, created_at) VALUES (?, ?, ?)',
+            (key, os.getpid() + 1, time.time()),
+        )
+        conn.execute('COMMIT')
+        conn.close()
+
+    def test_other_writers_invalidate_l1(self):
+        self.cache.set('menu', 'v1')
+        self.assertEqual(self.cache.get('menu'), 'v1')
+        self.assertEqual(self.cache.get('menu'), 'v1')
+        self.assertEqual(self.cache.stats()['l1_hits'], 1)
+
+        self.write_from_other_process('menu', 'v2')
+        self.assertEqual(self.cache.get('menu'), 'v2')
+
+    def test_l1_kept_until_sync_interval(self):
+        cache = TwoTierCache(self.path, {'OPTIONS': {'SYNC_INTERVAL': 3600}})
+        cache.set('menu', 'v1')
+        self.assertEqual(cache.get('menu'), 'v1')
+        self.write_from_other_process('menu', 'v2')
+        self.assertEqual(cache.get('menu'), 'v1')
+
+    def test_stale_read_not_cached_after_concurrent_write(self):
+        self.cache.set('menu', 'v1')
+        fetch = self.cache._fetch
+
+        def fetch_then_write(key):
+            row = fetch(key)
+            # Another thread writes between our L2 read and the L1 fill
+            self.cache.set('menu', 'v2')
+            return row
+
+        with mock.patch.object(self.cache, '_fetch', side_effect=fetch_then_write):
+            self.assertEqual(self.cache.get('menu'), 'v1')
+        self.assertNotIn(self.cache.make_key('menu'), self.cache._l1.entries)
+        self.assertEqual(self.cache.get('menu'), 'v2')
+
+    def test_incr(self):
+        self.cache.set('count', 1)
+        self.assertEqual(self.cache.get('count'), 1)
+        self.assertEqual(self.cache.incr('count'), 2)
+        self.assertEqual(self.cache.incr('count', 5), 7)
+        self.assertEqual(self.cache.get('count'), 7)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_has_key(self):
+        self.cache.set('none', None)
+        self.cache.set('expired', 'x', 0)
+        self.assertTrue(self.cache.has_key('none'))
+        self.assertFalse(self.cache.has_key('expired'))
+        self.assertFalse(self.cache.has_key('missing'))
+
+    def test_stats(self):
+        self.cache.set('menu', 'v1')
+        self.cache.get('missing')
+        self.cache.get('menu')
+        self.cache.get('menu')
+        self.cache.get('menu')
+        self.assertEqual(self.cache.stats(), {
+            'l1_hits': 2,
+            'l2_hits': 1,
+            'misses': 1,
+            'hit_ratio': 0.75,
+            'l1_hit_ratio': 0.5,
+            'l1_entries': 1,
+        })
+
+
+class SuspiciousPatternTests(TestCase):
+    """The compiled scanner flags what the per-pattern substring checks flagged, and skips static files."""
+
+    SAMPLES = [
+        '1 UNION SELECT password FROM users', "x'; DROP TABLE store_order;--", '<ScRiPt>alert(1)</script>',
+        'JavaScript:alert(1)', 'vbscript:msgbox', '<img onerror=alert(1)>', '<body onload=x()>',
+        'Please update my address', 'jollof rice', '12 Allen Avenue', '', 'onerror', 'java script:',
+    ]
+
+    def setUp(self):
+        rate_limiter.reset()
+        self.factory = RequestFactory()
+        self.middleware = RequestLoggingMiddleware(lambda request: HttpResponse())
+
+    def test_regex_matches_old_substring_checks(self):
+        for value in self.SAMPLES:
+            with self.subTest(value=value):
+                # The lower-cased substring test the middleware ran on every value before
+                expected = any(pattern in value.lower() for pattern in SUSPICIOUS_PATTERNS)
+                self.assertEqual(SUSPICIOUS_RE.search(value) is not None, expected)
+
+    def test_find_suspicious_reports_each_value(self):
+        params = QueryDict('q=rice&q=1+union+select+1&page=2&sort=<script>')
+        self.assertEqual(find_suspicious(params), [('q', '1 union select 1'), ('sort', '<script>')])
+        self.assertEqual(find_suspicious(QueryDict('q=rice&page=2')), [])
+
+    def test_query_string_prefilter(self):
+        self.assertTrue(query_string_is_suspicious('q=1%20UNION%20SELECT%201'))
+        self.assertTrue(query_string_is_suspicious('q=java%73cript%3Aalert(1)'))
+        self.assertTrue(query_string_is_suspicious('q=x+onload%3Dy'))
+        self.assertFalse(query_string_is_suspicious('q=jollof+rice&page=2'))
+        self.assertFalse(query_string_is_suspicious(''))
+
+    def blocked(self, request):
+        self.middleware(request)
+        return rate_limiter.blocked('ip:127.0.0.1') is not None
+
+    def test_get_parameters_flagged(self):
+        self.assertFalse(self.blocked(self.factory.get('/api/store/items/', {'search': 'rice'})))
+        self.assertTrue(self.blocked(self.factory.get('/api/store/items/', {'search': "' UNION SELECT 1"})))
+
+    def test_form_post_flagged(self):
+        self.assertFalse(self.blocked(self.factory.post('/checkout/', {'address': '12 Allen Avenue'})))
+        self.assertTrue(self.blocked(self.factory.post('/checkout/', {'address': '<script>x</script>'})))
+
+    def test_urlencoded_post_flagged(self):
+        request = self.factory.post(
+            '/checkout/', 'note=1%3B+DROP+TABLE+x', content_type='application/x-www-form-urlencoded'
+        )
+        self.assertTrue(self.blocked(request))
+
+    def test_json_body_not_parsed(self):
+        request = self.factory.post('/checkout/', {'note': 'drop table'}, content_type='application/json')
+        self.assertFalse(self.blocked(request))
+
+    def test_static_and_media_skipped(self):
+        for prefix in (settings.STATIC_URL, settings.MEDIA_URL):
+            with self.subTest(prefix=prefix):
+                self.assertFalse(self.blocked(self.factory.get(f'{prefix}app.js', {'v': 'select'})))
+                self.assertFalse(self.blocked(self.factory.post(f'{prefix}upload', {'name': 'drop'})))
+
+
+class QueuedFileHandlerTests(SimpleTestCase):
+    """Records are written by a per-process writer thread; a full queue drops instead of blocking."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'app.log')
+
+    def make_handler(self, **kwargs):
+        handler = QueuedFileHandler(self.path, **kwargs)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self.addCleanup(handler.close)
+        return handler
+
+    def record(self, message, *args):
+        return logging.LogRecord('test', logging.WARNING, __file__, 1, message, args, None)
+
+    def lines(self):
+        with open(self.path) as f:
+            return f.read().splitlines()
+
+    def test_full_queue_drops_and_counts(self):
+        handler = self.make_handler(maxsize=2)
+        # No writer thread, so nothing leaves the queue
+        with mock.patch.object(handler, '_start'):
+            for i in range(5):
+                handler.handle(self.record('message %d', i))
+        self.assertEqual(handler.dropped, 3)
+        self.assertEqual(handler.queue.qsize(), 2)
+
+    def test_flush_drains_without_stopping_writer(self):
+        handler = self.make_handler()
+        for i in range(100):
+            handler.handle(self.record('message %d', i))
+        handler.flush()
+        self.assertEqual(self.lines(), [f'message {i}' for i in range(100)])
+
+        listener = handler._listener
+        self.assertTrue(listener._thread.is_alive())
+        handler.handle(self.record('after flush'))
+        handler.flush()
+        self.assertIs(handler._listener, listener)
+        self.assertEqual(self.lines()[-1], 'after flush')
+
+    def test_message_fixed_when_logged(self):
+        handler = self.make_handler()
+        values = ['before']
+        handler.handle(self.record('value %s', values))
+        values[0] = 'after'
+        handler.flush()
+        self.assertEqual(self.lines(), ["value ['before']"])
+
+    def test_forked_child_starts_own_writer(self):
+        handler = self.make_handler()
+        handler.handle(self.record('parent'))
+        handler.flush()
+        parent_thread = handler._listener._thread
+
+        pid = os.fork()
+        if pid == 0:
+            # The parent's writer thread does not exist in the child
+            code = 2
+            try:
+                handler.handle(self.record('child'))
+                handler.flush()
+                thread = handler._listener._thread
+                code = 0 if thread is not parent_thread and thread.is_alive() else 1
+            finally:
+                os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertEqual(self.lines(), ['parent', 'child'])
+        self.assertTrue(parent_thread.is_alive())
+
+
+class FastJSONTests(SimpleTestCase):
+    """The orjson renderer, parser and JsonResponse produce what DRF and Django's own would."""
+
+    VALUES = {
+        'decimal': Decimal('1500.50'),
+        'aware_datetime': timezone.now(),
+        'naive_datetime': datetime.datetime(2026, 1, 2, 3, 4, 5, 123456),
+        'date': datetime.date(2026, 1, 2),
+        'time': datetime.time(10, 30, 15, 500),
+        'uuid': uuid.UUID('5685a767-e86f-4f0a-a803-ca5af5b73fa9'),
+        'lazy_string': gettext_lazy('Home'),
+        'unicode': 'Caf\u00e9 \u20a6 \u2028 \u2029',
+        'nested': {1: [Decimal('0.10'), None, True, 2.5]},
+    }
+
+    def test_renderer_matches_drf(self):
+        for name, value in self.VALUES.items():
+            with self.subTest(name):
+                data = {name: value}
+                self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_renderer_indent_and_empty(self):
+        context = {'indent': 2}
+        self.assertEqual(
+            FastJSONRenderer().render(self.VALUES, renderer_context=context),
+            JSONRenderer().render(self.VALUES, renderer_context=context),
+        )
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_parser_matches_drf(self):
+        body = JSONRenderer().render({'items': [{'id': 1, 'price': '1500.50'}], 'name': 'Caf\u00e9', 'ok': False})
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body)),
+        )
+        for bad in (b'{"a": ', b'NaN', b'{"a": NaN}'):
+            with self.subTest(bad):
+                with self.assertRaises(ParseError):
+                    FastJSONParser().parse(io.BytesIO(bad))
+                with self.assertRaises(ParseError):
+                    JSONParser().parse(io.BytesIO(bad))
+
+    def test_json_response_matches_django(self):
+        for name, value in self.VALUES.items():
+            with self.subTest(name):
+                data = {name: value}
+                self.assertEqual(
+                    json.loads(JsonResponse(data).content),
+                    json.loads(DjangoJsonResponse(data).content),
+                )
+
+
+@override_settings(METRICS_TOKEN='scrape-secret')
+class MetricsEndpointTests(TestCase):
+    """/metrics needs the scrape token or a staff login, wherever the request comes from."""
+
+    def test_anonymous_refused(self):
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.content, b'Forbidden')
+
+    def test_local_address_alone_is_refused(self):
+        response = self.client.get('/metrics/', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+    def test_bearer_token(self):
+        response = self.client.get('/metrics/', headers={'Authorization': 'Bearer scrape-secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+    def test_wrong_token_refused(self):
+        for header in ('Bearer wrong', 'Bearer ', 'Bearer scrape-secret-and-more', 'scrape-secret'):
+            with self.subTest(header):
+                response = self.client.get('/metrics/', headers={'Authorization': header})
+                self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_no_token_configured(self):
+        response = self.client.get('/metrics/', headers={'Authorization': 'Bearer '})
+        self.assertEqual(response.status_code, 403)
+
+    def test_staff_session(self):
+        user = User.objects.create_user(phone_number='08010000001', first_name='Ada', last_name='Obi')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        user.is_staff = True
+        user.save()
+        self.assertEqual(self.client.get('/metrics/').status_code, 200)
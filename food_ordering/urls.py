@@ -4,7 +4,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
 from store.admin import admin_site
-from food_ordering.views import security_status, SecurityHealthCheck, custom_404, custom_500, custom_403
+from food_ordering.views import security_status, SecurityHealthCheck, custom_404, custom_500, custom_403, metrics
 
 urlpatterns = [
     path("admin/", admin.site.urls),  # Use default Django admin
@@ -19,6 +19,7 @@ urlpatterns = [
     # Security endpoints
     path('security/status/', security_status, name='security_status'),
     path('security/health/', SecurityHealthCheck.as_view(), name='security_health'),
+    path('metrics/', metrics, name='metrics'),
 ]
 
 # Custom error handlers
@@ -7,8 +7,13 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
+import hmac
 import logging
 
+from django.conf import settings
+
+from .metrics import metrics_store
+
 logger = logging.getLogger('food_ordering.security')
 
 def rate_limit_exceeded(request, exception=None):
@@ -40,6 +45,29 @@ def security_status(request):
         }
     })
 
+def metrics_authorized(request):
+    """
+    Scrapers send ``Authorization: Bearer <METRICS_TOKEN>``; staff can also view metrics when logged in.
+
+    The client address is not trusted: behind the reverse proxy every request
+    arrives from 127.0.0.1.
+    """
+    token = settings.METRICS_TOKEN
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and auth_header.startswith('Bearer '):
+        return hmac.compare_digest(auth_header[len('Bearer '):].encode(), token.encode())
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """
+    Prometheus metrics for every worker on this host (bearer token or staff only)
+    """
+    if not metrics_authorized(request):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(metrics_store.collect(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 class SecurityHealthCheck(View):
     """
     Security health check endpoint
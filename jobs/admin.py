@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'dedup_key')
+    readonly_fields = ('created_at', 'locked_by', 'locked_at', 'finished_at', 'last_error')
@@ -0,0 +1,46 @@
+"""
+Management command to run background jobs.
+Claims due jobs from the jobs table and runs them on a thread pool until
+interrupted (SIGINT/SIGTERM finish the running jobs first). Also queues the
+periodic jobs in JOB_SCHEDULE. Start one per host, or more for throughput.
+"""
+import signal
+
+from django.core.management.base import BaseCommand
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (SMS, cleanups, scheduled tasks)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            help='Jobs to run at once (default JOB_WORKER_CONCURRENCY)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            help='Seconds between polls when the queue is idle (default JOB_POLL_INTERVAL)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the jobs that are due, then exit',
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(concurrency=options['concurrency'], poll_interval=options['poll_interval'])
+
+        def shutdown(signum, frame):
+            self.stdout.write(self.style.WARNING('Stopping after running jobs finish...'))
+            worker.stop()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        self.stdout.write(f'Worker {worker.name} running with concurrency {worker.concurrency}')
+        processed = worker.run(once=options['once'])
+        self.stdout.write(self.style.SUCCESS(f'Worker stopped after {processed} jobs'))
@@ -0,0 +1,47 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """A unit of background work, run by ``manage.py run_workers``."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    dedup_key = models.CharField(max_length=200, null=True, blank=True)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+    class Meta:
+        indexes = [
+            # Workers poll for due jobs in run_at order
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+        constraints = [
+            # At most one queued or running job per dedup key
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='job_active_dedup_key',
+            ),
+        ]
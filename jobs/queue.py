@@ -0,0 +1,85 @@
+"""
+Task registry and enqueueing.
+
+A task is a function registered under a name with ``@task``. Jobs are rows in
+the jobs table naming a task and its keyword arguments (a JSON payload), so
+enqueueing is one INSERT in our own database: it commits or rolls back with
+the caller's transaction and needs no broker. ``manage.py run_workers`` picks
+the rows up.
+
+    @task('store.prune_tombstones')
+    def prune_tombstones():
+        ...
+
+    enqueue('store.prune_tombstones')
+"""
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+
+from food_ordering.db import write_transaction
+
+from .models import Job
+
+DEFAULT_MAX_ATTEMPTS = 5
+
+# name -> (function, max_attempts)
+registry = {}
+
+
+def task(name, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Register a function as a background task.
+
+    The function is called with the job payload as keyword arguments. If it
+    raises, the job is retried with backoff until max_attempts runs have
+    failed.
+    """
+    def decorator(func):
+        registry[name] = (func, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, *, dedup_key=None, run_at=None, max_attempts=None):
+    """
+    Queue a job.
+
+    Args:
+        name (str): Registered task name
+        payload (dict): Keyword arguments for the task (JSON-serialisable)
+        dedup_key (str): While a job with this key is queued or running,
+            return it instead of adding another
+        run_at (datetime): Earliest time to run the job (default now)
+        max_attempts (int): Override the task's max_attempts
+
+    Returns:
+        Job: The new job, or the active job with the same dedup_key
+
+    Raises:
+        LookupError: If no task is registered under name
+    """
+    if name not in registry:
+        raise LookupError(f"No task registered as {name!r}")
+    fields = {
+        'name': name,
+        'payload': payload or {},
+        'dedup_key': dedup_key,
+        'max_attempts': max_attempts or registry[name][1],
+    }
+    if run_at is not None:
+        fields['run_at'] = run_at
+
+    with write_transaction():
+        try:
+            with transaction.atomic():
+                return Job.objects.create(**fields)
+        except IntegrityError:
+            if dedup_key is None:
+                raise
+            return Job.objects.get(dedup_key=dedup_key, status__in=Job.ACTIVE_STATUSES)
+
+
+async def aenqueue(name, payload=None, **kwargs):
+    """Async enqueue, for async views."""
+    return await sync_to_async(enqueue)(name, payload, **kwargs)
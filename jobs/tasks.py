@@ -0,0 +1,23 @@
+"""Housekeeping tasks for the job queue itself."""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.utils import timezone
+
+from .models import Job
+from .queue import task
+
+
+@task('jobs.prune')
+def prune_jobs():
+    """Delete finished jobs older than JOB_RETENTION_DAYS (failed jobs are kept)."""
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'JOB_RETENTION_DAYS', 7))
+    Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()
+
+
+@task('jobs.call_command', max_attempts=1)
+def run_command(command, args=(), options=None):
+    """Run a management command, e.g. a cleanup scheduled in JOB_SCHEDULE."""
+    call_command(command, *args, **(options or {}))
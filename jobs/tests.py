@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from food_ordering.sms import FakeTransport
+
+from .models import Job
+from .queue import enqueue, task
+from .worker import Worker
+
+calls = []
+
+
+@task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task('tests.flaky', max_attempts=3)
+def flaky():
+    raise RuntimeError('gateway down')
+
+
+class JobQueueTests(TransactionTestCase):
+    # Workers run jobs on their own threads and connections, so data must be committed
+
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(concurrency=2, poll_interval=0, schedule={})
+
+    def test_worker_runs_due_jobs(self):
+        enqueue('tests.record', {'value': 1})
+        enqueue('tests.record', {'value': 2})
+
+        self.assertEqual(self.worker.run(once=True), 2)
+        self.assertEqual(sorted(calls), [1, 2])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 2)
+
+    def test_dedup_key_returns_active_job(self):
+        first = enqueue('tests.record', {'value': 1}, dedup_key='order:1')
+        second = enqueue('tests.record', {'value': 2}, dedup_key='order:1')
+        self.assertEqual(first.pk, second.pk)
+
+        self.worker.run(once=True)
+        # Once the job has finished the key is free again
+        third = enqueue('tests.record', {'value': 3}, dedup_key='order:1')
+        self.assertNotEqual(third.pk, first.pk)
+        self.assertEqual(calls, [1])
+
+    def test_future_jobs_wait_for_run_at(self):
+        job = enqueue('tests.record', {'value': 1}, run_at=timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual(self.worker.run(once=True), 0)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertEqual(self.worker.run(once=True), 1)
+        self.assertEqual(calls, [1])
+
+    @override_settings(JOB_RETRY_BASE=10, JOB_RETRY_MAX=3600)
+    def test_failures_back_off_then_fail(self):
+        job = enqueue('tests.flaky')
+
+        self.worker.run(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('gateway down', job.last_error)
+        delay = (job.run_at - timezone.now()).total_seconds()
+        self.assertTrue(3 < delay <= 10, delay)
+
+        for _ in range(2):
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            self.worker.run(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_expired_lease_is_requeued(self):
+        job = enqueue('tests.record', {'value': 1})
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, attempts=1, locked_by='dead:1', locked_at=timezone.now() - timedelta(hours=1),
+        )
+
+        self.worker.run(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 2))
+
+    def test_schedule_queues_once_per_period(self):
+        schedule = {'record': {'task': 'tests.record', 'every': 3600, 'payload': {'value': 'tick'}}}
+        Worker(poll_interval=0, schedule=schedule).run(once=True)
+        # A second worker in the same period finds this period's job
+        Worker(poll_interval=0, schedule=schedule).run(once=True)
+
+        self.assertEqual(calls, ['tick'])
+        self.assertEqual(Job.objects.filter(dedup_key='schedule:record').count(), 1)
+
+    @override_settings(SMS_TRANSPORT='food_ordering.sms.FakeTransport')
+    def test_otp_request_queues_sms(self):
+        FakeTransport.outbox.clear()
+        response = self.client.post('/api/accounts/request-otp/', {'phone_number': '08030000001'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(FakeTransport.outbox, [])
+        self.assertTrue(Job.objects.filter(name='sms.flush', status=Job.QUEUED).exists())
+
+        self.worker.run(once=True)
+        self.assertEqual([to for to, _, _ in FakeTransport.outbox], ['+2348030000001'])
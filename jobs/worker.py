@@ -0,0 +1,205 @@
+"""
+Job worker.
+
+A Worker claims due jobs from the jobs table and runs them on a thread pool.
+Claiming happens in a write transaction (IMMEDIATE on SQLite, so one process
+claims at a time; SKIP LOCKED on databases that have it), so several worker
+processes can share the queue without running a job twice. A job whose
+worker died is handed out again once its lease expires.
+
+Failed jobs are retried with exponential backoff and jitter:
+``min(JOB_RETRY_BASE * 2 ** (attempts - 1), JOB_RETRY_MAX)`` seconds, scaled
+by a random factor between 0.5 and 1.
+
+Periodic jobs come from the JOB_SCHEDULE setting::
+
+    JOB_SCHEDULE = {
+        'purge_expired_otps': {'task': 'accounts.purge_expired_otps', 'every': 3600},
+    }
+
+Each entry is queued at most once per ``every`` seconds across all workers.
+
+Settings:
+    JOB_WORKER_CONCURRENCY: Jobs run at once per worker process (default 4)
+    JOB_POLL_INTERVAL: Seconds between polls when the queue is idle (default 1)
+    JOB_LEASE: Seconds before a running job is presumed lost (default 300)
+    JOB_RETRY_BASE: First retry delay in seconds (default 10)
+    JOB_RETRY_MAX: Longest retry delay in seconds (default 3600)
+    JOB_SCHEDULE: Periodic jobs (default none)
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from food_ordering.db import write_transaction
+
+from .models import Job
+from .queue import enqueue, registry
+
+logger = logging.getLogger(__name__)
+
+MAX_ERROR_LENGTH = 4000
+
+
+def retry_delay(attempts):
+    """Seconds to wait before retrying a job that has failed ``attempts`` times."""
+    base = getattr(settings, 'JOB_RETRY_BASE', 10)
+    delay = min(base * 2 ** (attempts - 1), getattr(settings, 'JOB_RETRY_MAX', 3600))
+    return delay * random.uniform(0.5, 1)
+
+
+class Worker:
+    """
+    Claim and run jobs.
+
+    Args:
+        concurrency (int): Jobs run at once (thread pool size)
+        poll_interval (float): Seconds between polls when idle
+        lease (int): Seconds before another worker may reclaim a running job
+        schedule (dict): Periodic jobs, as JOB_SCHEDULE
+    """
+
+    def __init__(self, concurrency=None, poll_interval=None, lease=None, schedule=None):
+        self.concurrency = concurrency or getattr(settings, 'JOB_WORKER_CONCURRENCY', 4)
+        self.poll_interval = poll_interval if poll_interval is not None else getattr(settings, 'JOB_POLL_INTERVAL', 1)
+        self.lease = lease or getattr(settings, 'JOB_LEASE', 300)
+        self.schedule = schedule if schedule is not None else getattr(settings, 'JOB_SCHEDULE', {})
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+        self._next_run = {}
+
+    def stop(self):
+        """Stop claiming jobs; run() returns once the running ones finish."""
+        self.stopping.set()
+
+    def run(self, once=False):
+        """
+        Work the queue until stop() is called.
+
+        Args:
+            once (bool): Return as soon as no job is due instead of polling
+
+        Returns:
+            int: Number of jobs run
+        """
+        processed = 0
+        running = set()
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix='job') as pool:
+            while not self.stopping.is_set():
+                self.queue_scheduled()
+                self.requeue_expired()
+                free = self.concurrency - len(running)
+                claimed = self.claim(free) if free else []
+                running.update(pool.submit(self.execute, job) for job in claimed)
+                if not running:
+                    if once:
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                done, running = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                processed += len(done)
+            done, _ = wait(running)
+            processed += len(done)
+        close_old_connections()
+        return processed
+
+    def claim(self, limit):
+        """Mark up to ``limit`` due jobs as running by this worker and return them."""
+        now = timezone.now()
+        with write_transaction():
+            ids = list(
+                Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+                .order_by('run_at', 'id')
+                .select_for_update(skip_locked=True)
+                .values_list('id', flat=True)[:limit]
+            )
+            if not ids:
+                return []
+            Job.objects.filter(id__in=ids, status=Job.QUEUED).update(
+                status=Job.RUNNING, locked_by=self.name, locked_at=now, attempts=F('attempts') + 1,
+            )
+            return list(Job.objects.filter(id__in=ids, locked_by=self.name, locked_at=now).order_by('run_at', 'id'))
+
+    def execute(self, job):
+        """Run one claimed job and record the outcome."""
+        try:
+            entry = registry.get(job.name)
+            if entry is None:
+                self._finish(job, Job.FAILED, f"No task registered as {job.name!r}")
+                logger.error("Job %s: no task registered as %r", job.pk, job.name)
+                return
+            start = time.perf_counter()
+            try:
+                entry[0](**job.payload)
+            except Exception:
+                self._retry_or_fail(job, traceback.format_exc())
+            else:
+                self._finish(job, Job.DONE)
+                logger.info("Job %s (%s) done in %.3fs", job.pk, job.name, time.perf_counter() - start)
+        except Exception:
+            logger.exception("Job %s (%s): could not record result", job.pk, job.name)
+        finally:
+            close_old_connections()
+
+    def _finish(self, job, status, error=''):
+        with write_transaction():
+            Job.objects.filter(pk=job.pk, locked_by=self.name).update(
+                status=status, finished_at=timezone.now(), last_error=error[-MAX_ERROR_LENGTH:],
+            )
+
+    def _retry_or_fail(self, job, error):
+        if job.attempts >= job.max_attempts:
+            self._finish(job, Job.FAILED, error)
+            logger.error("Job %s (%s) failed after %s attempts:\n%s", job.pk, job.name, job.attempts, error)
+            return
+        delay = retry_delay(job.attempts)
+        with write_transaction():
+            Job.objects.filter(pk=job.pk, locked_by=self.name).update(
+                status=Job.QUEUED, run_at=timezone.now() + timedelta(seconds=delay),
+                locked_by=None, locked_at=None, last_error=error[-MAX_ERROR_LENGTH:],
+            )
+        logger.warning(
+            "Job %s (%s) attempt %s/%s failed, retrying in %.0fs: %s",
+            job.pk, job.name, job.attempts, job.max_attempts, delay, error.strip().splitlines()[-1],
+        )
+
+    def requeue_expired(self):
+        """Hand out again the running jobs whose worker has not finished them within the lease."""
+        cutoff = timezone.now() - timedelta(seconds=self.lease)
+        expired = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+        if not expired.exists():
+            return
+        with write_transaction():
+            expired.filter(attempts__gte=F('max_attempts')).update(
+                status=Job.FAILED, finished_at=timezone.now(), last_error='Lease expired',
+            )
+            count = expired.update(status=Job.QUEUED, locked_by=None, locked_at=None, last_error='Lease expired')
+        if count:
+            logger.warning("Requeued %s jobs whose lease expired", count)
+
+    def queue_scheduled(self):
+        """Queue each JOB_SCHEDULE entry once per period (across all workers)."""
+        now = time.time()
+        for entry, spec in self.schedule.items():
+            if self._next_run.get(entry, 0) > now:
+                continue
+            every = spec['every']
+            slot_start = now - now % every
+            dedup_key = f'schedule:{entry}'
+            run_at = datetime.fromtimestamp(slot_start, tz=dt_timezone.utc)
+            with write_transaction():
+                if not Job.objects.filter(dedup_key=dedup_key, run_at__gte=run_at).exists():
+                    enqueue(spec['task'], spec.get('payload'), dedup_key=dedup_key, run_at=run_at)
+            self._next_run[entry] = slot_start + every
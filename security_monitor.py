@@ -1,27 +1,20 @@
 """
 Security Monitoring Script for Food Ordering System
 Real-time security monitoring and alerting
+
+Importing this module has no side effects: Django is set up in main(), and
+psutil is only loaded for the system resource checks.
 """
 
 import os
 import sys
-import django
 import time
 import logging
 from datetime import datetime, timedelta
-from django.core.management import execute_from_command_line
-
-# Setup Django
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'food_ordering.settings')
-django.setup()
 
-from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.db import connection
-from django.conf import settings
-import psutil
 
-User = get_user_model()
 logger = logging.getLogger('food_ordering.security')
 
 class SecurityMonitor:
@@ -74,6 +67,8 @@ class SecurityMonitor:
     def check_system_resources(self):
         """Check system resource usage"""
         try:
+            import psutil
+
             # Memory usage
             memory = psutil.virtual_memory()
             if memory.percent > self.alert_thresholds['memory_usage']:
@@ -234,6 +229,8 @@ class SecurityMonitor:
     
     def get_security_status(self):
         """Get current security status"""
+        import psutil
+
         status = {
             'monitoring_active': self.monitoring_active,
             'alerts': cache.get('security_alerts', []),
@@ -253,6 +250,11 @@ class SecurityMonitor:
 
 def main():
     """Main function to run security monitoring"""
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'food_ordering.settings')
+    django.setup()
+
     monitor = SecurityMonitor()
     
     try:
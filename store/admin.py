@@ -1,12 +1,11 @@
 from django.contrib import admin
-from django.db import transaction
-from django.db.models import Count, Sum
-from django.utils import timezone
+from food_ordering.db import write_transaction
 from django.contrib.auth import get_user_model
 from .models import (
     Order, OrderNotification,
     Category, FoodItem, Bag, BagItem, Plate, PizzaOption, InventoryItem, SystemSettings
 )
+from .stats_service import get_admin_index_stats
 
 
 # --- ORDERS ADMIN ---
@@ -41,7 +40,7 @@ class CategoryAdmin(admin.ModelAdmin):
     
     def delete_model(self, request, obj):
         """Override delete to handle category and food item deletion intelligently."""
-        with transaction.atomic():
+        with write_transaction():
             # Get all food items in this category
             food_items = FoodItem.objects.filter(category=obj)
             
@@ -56,7 +55,7 @@ class CategoryAdmin(admin.ModelAdmin):
     
     def delete_queryset(self, request, queryset):
         """Override bulk delete to handle category and food item deletion intelligently."""
-        with transaction.atomic():
+        with write_transaction():
             # Get all food items in these categories
             food_items = FoodItem.objects.filter(category__in=queryset)
             
@@ -139,7 +138,7 @@ class FoodItemAdmin(admin.ModelAdmin):
     
     def delete_model(self, request, obj):
         """Override delete to clear cart items for deleted food item."""
-        with transaction.atomic():
+        with write_transaction():
             # Ensure all bag items have historical data before deletion
             self._populate_historical_data_for_food_item(obj)
             
@@ -151,7 +150,7 @@ class FoodItemAdmin(admin.ModelAdmin):
     
     def delete_queryset(self, request, queryset):
         """Override bulk delete to clear cart items for deleted food items."""
-        with transaction.atomic():
+        with write_transaction():
             # Ensure all bag items have historical data before deletion
             for food_item in queryset:
                 self._populate_historical_data_for_food_item(food_item)
@@ -287,72 +286,9 @@ class CustomAdminSite(admin.AdminSite):
 
     def index(self, request, extra_context=None):
         """Custom admin index with customer statistics."""
-        User = get_user_model()
-        
-        # Get customer statistics
-        total_customers = User.objects.filter(
-            role='customer',
-            payments__isnull=False
-        ).distinct().count()
-        
-        # Get new customers this month
-        this_month = timezone.now().replace(day=1)
-        new_customers_this_month = User.objects.filter(
-            role='customer',
-            payments__isnull=False,
-            payments__created_at__gte=this_month
-        ).distinct().count()
-        
-        # Get active customers (last 30 days)
-        thirty_days_ago = timezone.now() - timezone.timedelta(days=30)
-        active_customers = User.objects.filter(
-            role='customer',
-            payments__isnull=False,
-            payments__created_at__gte=thirty_days_ago
-        ).distinct().count()
-        
-        # Get top customer
-        top_customer = User.objects.filter(
-            role='customer',
-            payments__isnull=False,
-            payments__status='success'  # Only count successful payments
-        ).annotate(
-            total_orders=Count('payments'),
-            total_spent=Sum('payments__amount')
-        ).order_by('-total_orders').first()
-        
-        # Get today's orders
-        today = timezone.now().date()
-        today_orders = Order.objects.filter(
-            payment__isnull=False,
-            payment__status='success',
-            status__in=['Pending', 'On the Way']  # Only count active orders
-        ).count()
-        
-        # Get today's revenue
-        from store.models import Payment
-        today_revenue = Payment.objects.filter(
-            status='success',
-            created_at__date=today
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Get inventory stats
-        total_items = FoodItem.objects.count()
-        available_items = FoodItem.objects.filter(portions__gt=0).count()
-        out_of_stock_items = FoodItem.objects.filter(portions=0).count()
-        
         extra_context = extra_context or {}
-        extra_context.update({
-            'total_customers': total_customers,
-            'new_customers_this_month': new_customers_this_month,
-            'active_customers': active_customers,
-            'top_customer': top_customer,
-            'today_orders': today_orders,
-            'today_revenue': today_revenue,
-            'total_items': total_items,
-            'available_items': available_items,
-            'out_of_stock_items': out_of_stock_items,
-        })
+        # Cached for a short TTL and refreshed when a payment succeeds
+        extra_context.update(get_admin_index_stats())
         
         return super().index(request, extra_context)
 
@@ -0,0 +1,139 @@
+"""
+Bag Service
+Bulk bag-item creation for POS and reorder flows.
+
+All lines are validated against a single ``in_bulk`` fetch of the requested
+food items and written with one ``bulk_create``, instead of one request,
+stock check, ``BagItem.save`` and post_save signal per line.
+"""
+
+from food_ordering.db import write_transaction
+
+from .models import FoodItem, BagItem, Plate
+from .querysets import bag_items_queryset
+
+
+MAX_BULK_LINES = 100
+MAX_PORTIONS = 100
+MAX_PLATES = 50
+# Categories that get a bag Plate record (mirrors the handle_fooditem_in_bag signal)
+PLATE_CATEGORIES = ["food", "main courses"]
+
+
+def _is_int(value):
+    """True for ints, but not bools (True would otherwise pass as 1)."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _validate_line(line, food_items, reserved):
+    """
+    Validate one bulk line.
+
+    Returns:
+        tuple: (BagItem or None, error message or None)
+    """
+    if not isinstance(line, dict):
+        return None, 'Each line must be an object'
+
+    food_item_id = line.get('food_item_id')
+    portions = line.get('portions', 1)
+    plates = line.get('plates', 0)
+
+    if not food_item_id or not _is_int(food_item_id):
+        return None, 'Valid food_item_id is required'
+    if not _is_int(portions) or portions < 1 or portions > MAX_PORTIONS:
+        return None, f'Portions must be between 1 and {MAX_PORTIONS}'
+    if not _is_int(plates) or plates < 0 or plates > MAX_PLATES:
+        return None, f'Plates must be between 0 and {MAX_PLATES}'
+
+    food_item = food_items.get(food_item_id)
+    if food_item is None:
+        return None, 'Food item not found'
+
+    # Stock is checked against everything already accepted in this request
+    requested = reserved.get(food_item_id, 0) + portions
+    if not food_item.can_order_portions(requested):
+        if food_item.portions == 0:
+            return None, f"Sorry, {food_item.name} is currently out of stock."
+        return None, f"Not enough {food_item.name} in stock. Available: {food_item.portions}"
+
+    category_name = food_item.category.name if food_item.category else ""
+    if food_item.is_food_category:
+        if plates == 0:
+            return None, 'At least one plate is required for food category items'
+    elif category_name.lower() in PLATE_CATEGORIES:
+        plates = plates or 1
+    else:
+        plates = 0  # Non-food items never carry plates
+
+    reserved[food_item_id] = requested
+    return BagItem(
+        food_item=food_item,
+        portions=portions,
+        plates=plates,
+        item_name=food_item.name,
+        item_price=food_item.price,
+        item_category=category_name,
+    ), None
+
+
+def add_items_to_bag(bag, lines, partial=False):
+    """
+    Add many items to a bag in one write.
+
+    Args:
+        bag: The bag to add to (ownership must already be checked)
+        lines: List of {food_item_id, portions, plates} dicts
+        partial: Create the valid lines even if others fail (default: all or nothing)
+
+    Returns:
+        tuple: (list of created BagItems, list of {index, food_item_id, error} dicts)
+    """
+    if not isinstance(lines, list) or not lines:
+        return [], [{'index': None, 'food_item_id': None, 'error': 'items must be a non-empty list'}]
+    if len(lines) > MAX_BULK_LINES:
+        return [], [{'index': None, 'food_item_id': None, 'error': f'At most {MAX_BULK_LINES} items per request'}]
+
+    ids = [line.get('food_item_id') for line in lines if isinstance(line, dict)]
+    food_items = FoodItem.objects.select_related('category').in_bulk(
+        [food_item_id for food_item_id in ids if _is_int(food_item_id)]
+    )
+
+    to_create = []
+    errors = []
+    reserved = {}
+    for index, line in enumerate(lines):
+        bag_item, error = _validate_line(line, food_items, reserved)
+        if error:
+            errors.append({
+                'index': index,
+                'food_item_id': line.get('food_item_id') if isinstance(line, dict) else None,
+                'error': error,
+            })
+        else:
+            bag_item.bag = bag
+            to_create.append(bag_item)
+
+    if errors and not partial:
+        return [], errors
+    if not to_create:
+        return [], errors
+
+    with write_transaction():
+        created = BagItem.objects.bulk_create(to_create)
+        # bulk_create skips post_save, so add the bag's Plate record here
+        plated = next(
+            (item for item in created if item.item_category.lower() in PLATE_CATEGORIES),
+            None
+        )
+        if plated is not None:
+            Plate.objects.get_or_create(
+                bag=bag,
+                defaults={"count": plated.plates, "fee_per_plate": 50.00},
+            )
+    return created, errors
+
+
+def get_bag_total(bag):
+    """Bag total computed in a fixed number of queries."""
+    return sum(item.subtotal for item in bag_items_queryset().filter(bag=bag))
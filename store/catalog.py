@@ -0,0 +1,148 @@
+"""
+Catalog versioning for conditional GET responses and incremental sync.
+
+POS and mobile clients poll the menu endpoints frequently. The catalog version
+is derived from row counts and the latest ``updated_at`` of food items,
+categories and pizza options, so an unchanged catalog can be answered with ``304 Not Modified``
+before any serialisation happens. The change feed goes further and returns
+only the food items created, updated or deleted since a client's sync token.
+"""
+
+import hashlib
+from datetime import timedelta
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.views.decorators.http import condition
+
+from .models import Category, FoodItem, FoodItemTombstone, PizzaOption, SystemSettings
+
+
+# Tombstones older than this are pruned; older tokens get a full resync
+TOMBSTONE_RETENTION = timedelta(days=30)
+# Re-send rows from slightly before the token so writes that committed late are not missed
+CHANGE_FEED_OVERLAP = timedelta(seconds=5)
+
+
+def get_catalog_version(include_settings=False):
+    """
+    Get the current catalog version.
+
+    Args:
+        include_settings: Also track system settings (e.g. plate fee shown on menu pages)
+
+    Returns:
+        tuple: (version string, last_modified datetime or None)
+    """
+    # Catalog models bump updated_at on save() and on queryset update() (CatalogQuerySet)
+    stats = [
+        model.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+        for model in (FoodItem, Category, PizzaOption)
+    ]
+    if include_settings:
+        stats.append(SystemSettings.objects.aggregate(count=Count('id'), updated=Max('updated_at')))
+
+    stamps = [entry['updated'] for entry in stats if entry['updated']]
+    last_modified = max(stamps) if stamps else None
+    version = ':'.join(
+        f"{entry['count']}-{entry['updated'].isoformat() if entry['updated'] else ''}"
+        for entry in stats
+    )
+    return version, last_modified
+
+
+def catalog_condition(include_settings=False, per_user=False):
+    """
+    Decorator adding ETag / Last-Modified handling to a catalog view.
+
+    The ETag covers the catalog version, the full request path (filters, search,
+    page) and the host (absolute image URLs). Pages that render per-user markup
+    pass ``per_user=True``: the user is folded into the ETag, Last-Modified is
+    not used, and requests with pending flash messages are always rendered.
+    """
+    def _version(request):
+        if not hasattr(request, '_catalog_version'):
+            request._catalog_version = get_catalog_version(include_settings)
+        return request._catalog_version
+
+    def etag_func(request, *args, **kwargs):
+        if per_user and len(get_messages(request)):
+            return None
+        version, _ = _version(request)
+        parts = [version, request.get_host(), request.get_full_path()]
+        if per_user:
+            user = getattr(request, 'user', None)
+            parts.append(str(user.pk) if user is not None and user.is_authenticated else 'anonymous')
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    def last_modified_func(request, *args, **kwargs):
+        if per_user:
+            return None
+        _, last_modified = _version(request)
+        return last_modified
+
+    return condition(etag_func=etag_func, last_modified_func=last_modified_func)
+
+
+def encode_change_token(moment):
+    """Encode a sync position as an opaque, URL-safe token."""
+    return urlsafe_base64_encode(moment.isoformat().encode())
+
+
+def decode_change_token(token):
+    """
+    Decode a sync token.
+
+    Returns:
+        datetime or None: None if the token is malformed
+    """
+    try:
+        return parse_datetime(force_str(urlsafe_base64_decode(token)))
+    except (ValueError, TypeError):
+        return None
+
+
+def get_catalog_changes(since=None):
+    """
+    Get food items changed since a sync position.
+
+    Args:
+        since: Decoded sync position, or None for a full snapshot
+
+    Returns:
+        dict: items (FoodItem queryset), deleted (list of ids), token (str)
+        and reset (True when the client must replace its whole catalog)
+    """
+    now = timezone.now()
+    reset = since is None or since < now - TOMBSTONE_RETENTION
+    items = FoodItem.objects.select_related('category').order_by('updated_at', 'id')
+    deleted = []
+
+    if not reset:
+        window_start = since - CHANGE_FEED_OVERLAP
+        items = items.filter(updated_at__gte=window_start)
+        deleted = list(
+            FoodItemTombstone.objects.filter(deleted_at__gte=window_start)
+            .values_list('food_item_id', flat=True)
+            .distinct()
+        )
+
+    # The next token is the newest change we can see, never in the future
+    latest = [
+        FoodItem.objects.aggregate(updated=Max('updated_at'))['updated'],
+        FoodItemTombstone.objects.aggregate(deleted=Max('deleted_at'))['deleted'],
+        since,
+    ]
+    latest = [moment for moment in latest if moment is not None]
+    token_moment = min(max(latest), now) if latest else now
+
+    return {
+        'items': items,
+        'deleted': deleted,
+        'token': encode_change_token(token_moment),
+        'reset': reset,
+    }
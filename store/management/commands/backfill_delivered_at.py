@@ -3,7 +3,7 @@ Management command to backfill delivered_at field for existing delivered orders.
 This ensures accurate delivery tracking for historical data.
 """
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from food_ordering.db import write_transaction
 from django.utils import timezone
 from store.models import Order
 
@@ -59,7 +59,7 @@ class Command(BaseCommand):
                     )
                 
                 if not dry_run:
-                    with transaction.atomic():
+                    with write_transaction():
                         order.delivered_at = delivery_time
                         order.save(update_fields=['delivered_at'])
                 
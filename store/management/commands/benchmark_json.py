@@ -0,0 +1,74 @@
+"""
+Management command to compare JSON rendering/parsing speed on order lists.
+Times DRF's standard JSON renderer/parser against the fast (orjson) ones.
+"""
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework import renderers, parsers
+
+from food_ordering import fast_json
+from store.models import Order
+from store.querysets import order_graph_queryset
+from store.serializers import OrderSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON rendering and parsing of large order lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--orders',
+            type=int,
+            default=1000,
+            help='Number of orders in the payload (real orders are repeated to reach it)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per measurement (best time is reported)',
+        )
+
+    def handle(self, *args, **options):
+        count = options['orders']
+        repeat = options['repeat']
+
+        orders = list(order_graph_queryset(Order.objects.order_by('-created_at'))[:count])
+        if not orders:
+            self.stdout.write(self.style.WARNING('No orders in the database - nothing to benchmark'))
+            return
+
+        serialized = OrderSerializer(orders, many=True).data
+        payload = {'count': count, 'results': [serialized[i % len(serialized)] for i in range(count)]}
+
+        if fast_json.orjson is None:
+            self.stdout.write(self.style.WARNING('orjson is not installed - the fast classes fall back to the standard library'))
+
+        standard_renderer = renderers.JSONRenderer()
+        fast_renderer = fast_json.FastJSONRenderer()
+        body = standard_renderer.render(payload)
+
+        results = [
+            ('render', self.best_of(repeat, lambda: standard_renderer.render(payload)),
+             self.best_of(repeat, lambda: fast_renderer.render(payload))),
+            ('parse', self.best_of(repeat, lambda: parsers.JSONParser().parse(io.BytesIO(body))),
+             self.best_of(repeat, lambda: fast_json.FastJSONParser().parse(io.BytesIO(body)))),
+        ]
+
+        self.stdout.write(f'Payload: {count} orders ({len(orders)} distinct), {len(body) / 1024:.0f} KiB')
+        for name, standard, fast in results:
+            self.stdout.write(
+                f'{name:>6}: standard {standard * 1000:8.2f} ms | fast {fast * 1000:8.2f} ms | '
+                f'{standard / fast if fast else 0:5.1f}x'
+            )
+
+    def best_of(self, repeat, func):
+        best = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
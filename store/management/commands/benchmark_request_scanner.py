@@ -0,0 +1,79 @@
+"""
+Management command to compare the request scanner against the old per-pattern loop.
+Times both on typical raw query strings (including parsing) and reports the per-request cost.
+"""
+import time
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand
+from django.http import QueryDict
+
+from food_ordering.middleware import SUSPICIOUS_PATTERNS, find_suspicious, query_string_is_suspicious
+
+
+SAMPLE_QUERIES = {
+    'clean': {'search': 'jollof rice', 'category': 'food', 'page': '2', 'ordering': '-price', 'available': 'true'},
+    'suspicious': {'search': "rice' UNION SELECT password FROM accounts_user--", 'page': '1'},
+    'empty': {},
+}
+
+
+def loop_scan(query_string):
+    """The previous scanner: parse the query, lowercase every value and test each pattern in turn."""
+    return [
+        (param, value)
+        for param, value in QueryDict(query_string).items()
+        if any(pattern in str(value).lower() for pattern in SUSPICIOUS_PATTERNS)
+    ]
+
+
+def compiled_scan(query_string):
+    """The middleware's scanner: one search over the raw query, parsing only on a hit."""
+    if not query_string_is_suspicious(query_string):
+        return []
+    return find_suspicious(QueryDict(query_string))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the suspicious-pattern request scanner'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20000,
+            help='Scans per measurement',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per measurement (best time is reported)',
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        repeat = options['repeat']
+
+        for name, query in SAMPLE_QUERIES.items():
+            query_string = urlencode(query)
+            if loop_scan(query_string) != compiled_scan(query_string):
+                self.stdout.write(self.style.ERROR(f'{name}: scanners disagree'))
+                return
+
+            loop = self.best_of(repeat, iterations, lambda: loop_scan(query_string))
+            compiled = self.best_of(repeat, iterations, lambda: compiled_scan(query_string))
+            self.stdout.write(
+                f'{name:>10}: loop {loop * 1e6 / iterations:6.2f} us | compiled {compiled * 1e6 / iterations:6.2f} us | '
+                f'{loop / compiled if compiled else 0:5.1f}x'
+            )
+
+    def best_of(self, repeat, iterations, func):
+        best = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,110 @@
+"""
+Management command to measure cold-start time.
+Starts fresh interpreters under ``python -X importtime`` for Django setup
+alone (every management command pays this) and for a full worker boot (WSGI
+application plus the URLconf, which imports every view). Reports the best
+wall time and the packages that cost the most import time, and fails if a
+dependency that should load lazily was imported at startup.
+"""
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+SCENARIOS = {
+    'setup': 'import django; django.setup()',
+    'worker': (
+        'from food_ordering.wsgi import application; '
+        'from django.urls import get_resolver; get_resolver().url_patterns'
+    ),
+}
+
+# Only needed when a payment, SMS or resource check actually happens
+LAZY_MODULES = 'aiohttp,twilio,psutil'
+
+
+def parse_importtime(stderr):
+    """
+    Sum ``-X importtime`` self times by top-level package.
+
+    Returns:
+        Counter: package -> microseconds
+    """
+    totals = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        totals[name.strip().split('.')[0]] += int(self_us)
+    return totals
+
+
+class Command(BaseCommand):
+    help = 'Benchmark interpreter + Django startup and report the slowest imports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            choices=sorted(SCENARIOS),
+            action='append',
+            help='Scenario to run (default: all)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per scenario (best time is reported)',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Number of packages to list by import time',
+        )
+        parser.add_argument(
+            '--forbid',
+            default=LAZY_MODULES,
+            help='Comma-separated packages that must not be imported at startup ("" to skip the check)',
+        )
+
+    def handle(self, *args, **options):
+        forbidden = {name.strip() for name in options['forbid'].split(',') if name.strip()}
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'food_ordering.settings')}
+        problems = []
+
+        for scenario in options['scenario'] or sorted(SCENARIOS):
+            best, imports = None, Counter()
+            for _ in range(max(1, options['repeat'])):
+                elapsed, totals = self.run_once(SCENARIOS[scenario], env)
+                if best is None or elapsed < best:
+                    best, imports = elapsed, totals
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{scenario}: {best * 1000:.0f} ms wall, {sum(imports.values()) / 1000:.0f} ms importing'
+            ))
+            for package, micros in imports.most_common(options['top']):
+                self.stdout.write(f'  {micros / 1000:8.1f} ms  {package}')
+
+            loaded = sorted(forbidden & set(imports))
+            if loaded:
+                problems.append(f"{scenario} imports {', '.join(loaded)}")
+
+        if problems:
+            raise CommandError('Lazy dependencies loaded at startup: ' + '; '.join(problems))
+        self.stdout.write(self.style.SUCCESS('No lazy dependency was imported at startup'))
+
+    def run_once(self, code, env):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        elapsed = time.perf_counter() - start
+        if result.returncode:
+            raise CommandError(f'Startup failed:\n{result.stderr[-2000:]}')
+        return elapsed, parse_importtime(result.stderr)
@@ -3,7 +3,7 @@ Management command to fix delivered_at field for existing delivered orders.
 This uses created_at + estimated delivery time as a better approximation.
 """
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from food_ordering.db import write_transaction
 from django.utils import timezone
 from datetime import timedelta
 from store.models import Order
@@ -60,7 +60,7 @@ class Command(BaseCommand):
                     )
                 
                 if not dry_run:
-                    with transaction.atomic():
+                    with write_transaction():
                         order.delivered_at = estimated_delivery_time
                         order.save(update_fields=['delivered_at'])
                 
@@ -3,7 +3,7 @@ Management command to fix service charges for all existing orders.
 This ensures all orders have proper service charges applied.
 """
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from food_ordering.db import write_transaction
 from decimal import Decimal
 from store.models import Order, Payment
 
@@ -47,7 +47,7 @@ class Command(BaseCommand):
         updated_payments = 0
         errors = []
         
-        with transaction.atomic():
+        with write_transaction():
             for order in orders:
                 try:
                     # Check if order needs service charge update
@@ -3,7 +3,7 @@ Management command to verify inventory consistency and fix any issues.
 This ensures the inventory is always accurate and bulletproof.
 """
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from food_ordering.db import write_transaction
 from store.models import FoodItem, Order, BagItem
 
 
@@ -59,7 +59,7 @@ class Command(BaseCommand):
                 
                 if fix_mode:
                     try:
-                        with transaction.atomic():
+                        with write_transaction():
                             food_item.portions = expected_portions
                             if expected_portions == 0:
                                 food_item.availability = False
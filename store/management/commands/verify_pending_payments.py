@@ -142,9 +142,9 @@ class Command(BaseCommand):
 
     def reduce_order_quantities(self, order):
         """Reduce portions for all food items in the order after successful payment."""
-        from django.db import transaction
+        from food_ordering.db import write_transaction
         
-        with transaction.atomic():
+        with write_transaction():
             for bag in order.bags.all():
                 for bag_item in bag.items.all():
                     if bag_item.food_item:  # Only reduce if food_item still exists
@@ -0,0 +1,86 @@
+"""
+Management command to check that hot queries use indexes.
+Runs EXPLAIN QUERY PLAN on the dashboard, order history, OTP and bag item
+queries and fails if any of them falls back to a full table scan.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from accounts.models import OTP
+from store.models import BagItem, Order, OrderNotification, Payment
+from store.order_history_service import paid_orders_queryset
+
+
+ACTIVE_STATUSES = ['Pending', 'On the Way']
+PAID_STATUSES = ['Pending', 'On the Way', 'Delivered']
+
+# A plan line that reads a whole table without any index, e.g. "2 0 0 SCAN store_order"
+FULL_SCAN_RE = re.compile(r'\bSCAN (\w+)\s*$')
+
+
+def hot_queries():
+    """
+    The queries to check, mirroring the dashboard, history and OTP code paths.
+
+    Returns:
+        list: (name, queryset) pairs
+    """
+    today = timezone.now().date()
+    customer = get_user_model()(pk=1)
+    return [
+        ('dashboard: active orders', Order.objects.filter(
+            payment__status='success', status__in=ACTIVE_STATUSES)),
+        ('dashboard: delivered today', Order.objects.filter(
+            payment__status='success', status='Delivered', delivered_at__date=today)),
+        ('dashboard: period orders', Order.objects.filter(
+            payment__status='success', payment__created_at__date__range=[today, today],
+            status__in=PAID_STATUSES)),
+        ('dashboard: today revenue', Payment.objects.filter(status='success', created_at__date=today)),
+        ('dashboard: unseen notifications', OrderNotification.objects.filter(seen=False)),
+        ('history: paid orders', paid_orders_queryset(customer)),
+        ('otp: verify', OTP.objects.filter(phone_number='08000000000', code='00000').order_by('-created_at')[:1]),
+        ('otp: clear', OTP.objects.filter(phone_number='08000000000')),
+        ('bag items: by food item', BagItem.objects.filter(food_item_id=1)),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Fail if hot dashboard/history/OTP queries regress to full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Database alias to explain against',
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full plan for every query',
+        )
+
+    def handle(self, *args, **options):
+        database = options['database']
+        if connections[database].vendor != 'sqlite':
+            raise CommandError('Plan checks use EXPLAIN QUERY PLAN and require SQLite')
+
+        failures = []
+        for name, queryset in hot_queries():
+            plan = queryset.using(database).explain()
+            scans = [match.group(1) for match in map(FULL_SCAN_RE.search, plan.splitlines()) if match]
+            if scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'FULL SCAN {name}: {", ".join(scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'ok        {name}'))
+            if scans or options['verbose_plans']:
+                for line in plan.splitlines():
+                    self.stdout.write(f'            {line}')
+
+        if failures:
+            raise CommandError(f'{len(failures)} query plan(s) use full table scans: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('All query plans use indexes'))
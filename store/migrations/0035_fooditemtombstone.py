@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-18 21:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0034_category_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoodItemTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('food_item_id', models.PositiveIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['deleted_at'],
+            },
+        ),
+    ]
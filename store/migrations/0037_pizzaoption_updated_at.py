@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 23:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0036_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pizzaoption',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, blank=True, null=True),
+        ),
+    ]
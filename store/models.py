@@ -1,9 +1,23 @@
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from decimal import Decimal
 
 
+class CatalogQuerySet(models.QuerySet):
+    """
+    QuerySet for catalog models: update() also bumps updated_at.
+
+    auto_now only applies on save(), and the catalog version (store.catalog)
+    is derived from updated_at, so a bulk stock or price change must move it too.
+    """
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+
 # ============================================================
 # CATEGORY MODEL
 # ============================================================
@@ -11,6 +25,9 @@ from decimal import Decimal
 class Category(models.Model):
     """Food categories like Pizza, Drinks, etc."""
     name = models.CharField(max_length=100, unique=True)
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+
+    objects = CatalogQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -49,6 +66,8 @@ class FoodItem(models.Model):
         related_name='updated_food_items'
     )
 
+    objects = CatalogQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -229,6 +248,18 @@ class FoodItem(models.Model):
         ordering = ['name']
 
 
+class FoodItemTombstone(models.Model):
+    """Record of a deleted food item, so the catalog change feed can report deletions."""
+    food_item_id = models.PositiveIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Deleted food item {self.food_item_id} at {self.deleted_at}"
+
+    class Meta:
+        ordering = ['deleted_at']
+
+
 # ============================================================
 # BAG MODEL
 # ============================================================
@@ -280,7 +311,8 @@ class Bag(models.Model):
 class BagItem(models.Model):
     """Food item added to a bag with optional plates."""
     bag = models.ForeignKey(Bag, on_delete=models.CASCADE, related_name="items")
-    food_item = models.ForeignKey(FoodItem, on_delete=models.SET_NULL, null=True, blank=True)
+    # Indexed by the (food_item, bag) composite below instead of its own index
+    food_item = models.ForeignKey(FoodItem, on_delete=models.SET_NULL, null=True, blank=True, db_index=False)
     portions = models.PositiveIntegerField(default=1, help_text="Number of portions ordered")
     plates = models.PositiveIntegerField(default=0, help_text="Number of plates (only for food category items)")
     
@@ -344,9 +376,13 @@ class BagItem(models.Model):
     def plate_cost(self):
         """Calculate plate cost (plates * dynamic plate fee for food category items only, excluding Plate items)."""
         if self.is_food_category and self.food_item and self.food_item.name.lower() != 'plate':
-            # Get dynamic plate fee from system settings
+            # Get dynamic plate fee from system settings (annotated by store.querysets when prefetched)
             from decimal import Decimal
-            plate_fee = Decimal(str(SystemSettings.get_setting('plate_fee', 50)))
+            if hasattr(self, 'plate_fee_setting'):
+                plate_fee = self.plate_fee_setting if self.plate_fee_setting is not None else 50
+            else:
+                plate_fee = SystemSettings.get_setting('plate_fee', 50)
+            plate_fee = Decimal(str(plate_fee))
             return self.plates * plate_fee
         return 0
 
@@ -386,6 +422,10 @@ class BagItem(models.Model):
 
     class Meta:
         ordering = ['id']
+        indexes = [
+            # Sales/stock lookups by food item, covering the join to the bag
+            models.Index(fields=['food_item', 'bag'], name='bagitem_food_item_bag_idx'),
+        ]
 
 
 # ============================================================
@@ -500,6 +540,14 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Dashboard status counts and listings
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            # Today's deliveries
+            models.Index(fields=['status', 'delivered_at'], name='order_status_delivered_idx'),
+            # Customer order history, newest first
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+        ]
 
 
 # ============================================================
@@ -516,6 +564,13 @@ class OrderNotification(models.Model):
     def __str__(self):
         return f"Notification for Order {self.order.id} - {self.message}"
 
+    class Meta:
+        indexes = [
+            # Unseen-notification counts; partial because filter(seen=False)
+            # compiles to NOT seen, which a (seen, created_at) index cannot serve
+            models.Index(fields=['created_at'], condition=models.Q(seen=False), name='notification_unseen_idx'),
+        ]
+
 
 # ============================================================
 # PAYMENT MODEL
@@ -593,6 +648,10 @@ class Payment(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Revenue and payment reports filter on status and date
+            models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+        ]
 
 
 # ============================================================
@@ -691,6 +750,9 @@ class PizzaOption(models.Model):
     food_item = models.ForeignKey(FoodItem, on_delete=models.CASCADE, related_name='pizza_options')
     size = models.CharField(max_length=1, choices=SIZE_CHOICES)
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
+
+    objects = CatalogQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.food_item.name} - {self.get_size_display()}"
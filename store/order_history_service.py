@@ -0,0 +1,153 @@
+"""
+Order History Service
+Read model for a customer's paid order history.
+
+Orders, payments, bags, bag items, food items and categories are fetched in a
+fixed number of queries regardless of how many orders a customer has.
+"""
+
+import hashlib
+
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db.models import Count, Max, Prefetch
+
+from .models import Order, Bag
+from .querysets import bag_items_queryset
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def paid_orders_queryset(user):
+    """
+    Get the user's paid orders with the full history graph prefetched.
+
+    Args:
+        user: The customer whose orders should be returned
+
+    Returns:
+        QuerySet: Orders with successful payments, newest first
+    """
+    bags = Bag.objects.prefetch_related(Prefetch('items', queryset=bag_items_queryset()))
+    return (
+        Order.objects.filter(user=user, payment__status='success')
+        .select_related('payment')
+        .prefetch_related(Prefetch('bags', queryset=bags))
+        .order_by('-created_at', '-id')
+    )
+
+
+def get_history_version(user):
+    """
+    Get a cheap version marker for the user's order history.
+
+    A single aggregate query; it changes whenever an order is added or an
+    order/payment row is updated (e.g. a status change).
+
+    Returns:
+        tuple: (order_count, last_modified datetime or None)
+    """
+    stats = Order.objects.filter(user=user, payment__status='success').aggregate(
+        order_count=Count('id'),
+        order_updated=Max('updated_at'),
+        payment_updated=Max('payment__updated_at'),
+    )
+    stamps = [stamp for stamp in (stats['order_updated'], stats['payment_updated']) if stamp]
+    return stats['order_count'], max(stamps) if stamps else None
+
+
+def get_history_etag(user, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Build an ETag for one page of the user's order history.
+
+    Returns:
+        tuple: (etag string, last_modified datetime or None)
+    """
+    order_count, last_modified = get_history_version(user)
+    raw = f"{user.pk}:{page}:{page_size}:{order_count}:{last_modified.isoformat() if last_modified else ''}"
+    return hashlib.md5(raw.encode()).hexdigest(), last_modified
+
+
+def normalize_page_size(page_size):
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE, falling back to the default."""
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def serialize_order(order):
+    """
+    Convert a prefetched order into the dictionary used by the history page and API.
+
+    The amount actually paid takes priority over the calculated order total.
+    Order.total is recomputed from the bags' current contents, so it can drift
+    from what the customer was charged; the history page has always shown the
+    payment amount, and the JSON API now reports the same figure.
+    """
+    payment = getattr(order, 'payment', None)
+    if payment is not None and payment.amount is not None:
+        total = float(payment.amount)
+    else:
+        total = float(order.total)  # Fallback to order total
+
+    order_dict = {
+        'id': order.id,
+        'status': order.status,
+        'created_at': order.created_at,
+        'delivered_at': order.delivered_at,
+        'total': total,
+        'delivery_address': order.delivery_address,
+        'bags': []
+    }
+    for bag in order.bags.all():
+        bag_dict = {
+            'id': bag.id,
+            'name': bag.name or f'Bag {bag.id}',
+            'items': []
+        }
+        for item in bag.items.all():
+            food_item = item.food_item
+            bag_dict['items'].append({
+                'name': item.item_name or (food_item.name if food_item else ''),
+                'price': float(item.item_price) if item.item_price is not None else (float(food_item.price) if food_item else 0),
+                'portions': item.portions,
+                'plates': item.plates,
+                'category': item.item_category or (food_item.category.name if food_item and food_item.category else ''),
+            })
+        order_dict['bags'].append(bag_dict)
+    return order_dict
+
+
+def get_order_history(user, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Get one page of the user's paid order history.
+
+    Args:
+        user: The customer whose orders should be returned
+        page: 1-based page number (out-of-range values are clamped)
+        page_size: Orders per page (capped at MAX_PAGE_SIZE)
+
+    Returns:
+        dict: orders (list of dicts), count, page, page_size, num_pages, has_next, has_previous
+    """
+    page_size = normalize_page_size(page_size)
+    paginator = Paginator(paid_orders_queryset(user), page_size)
+    try:
+        page_obj = paginator.page(page)
+    except PageNotAnInteger:
+        page_obj = paginator.page(1)
+    except EmptyPage:
+        page_obj = paginator.page(paginator.num_pages)
+
+    return {
+        'orders': [serialize_order(order) for order in page_obj.object_list],
+        'count': paginator.count,
+        'page': page_obj.number,
+        'page_size': page_size,
+        'num_pages': paginator.num_pages,
+        'has_next': page_obj.has_next(),
+        'has_previous': page_obj.has_previous(),
+    }
@@ -0,0 +1,117 @@
+"""
+Order Status Feed
+Lightweight status snapshots for customers waiting on an order.
+
+Order status transitions publish a small snapshot (status and delivered_at) to
+the cache. The tracking page long-polls for changes against that snapshot
+instead of reloading the order, payment, bags and items on every refresh.
+The wait is async: between polls a waiting customer holds an open connection
+and a timer, not a worker thread. Each poll (every POLL_INTERVAL) still reads
+the snapshot in a thread, since the SQLite cache backend has no native async
+API (its ``aget`` is BaseCache's sync_to_async wrapper).
+"""
+
+import asyncio
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .models import Order
+
+
+CACHE_KEY = 'order_status:{order_id}'
+# The cache is shared by all workers, so snapshots only expire to pick up
+# status changes that bypass post_save (queryset.update()).
+SNAPSHOT_TTL = 30
+DEFAULT_WAIT_TIMEOUT = 25
+MAX_WAIT_TIMEOUT = 55
+POLL_INTERVAL = 1
+
+
+def build_snapshot(order_id, user_id, status, delivered_at):
+    """
+    Build a status snapshot.
+
+    Returns:
+        dict: order_id, user_id, status, delivered_at (ISO string or None) and version
+    """
+    delivered = delivered_at.isoformat() if delivered_at else None
+    version = hashlib.md5(f"{status}|{delivered or ''}".encode()).hexdigest()[:12]
+    return {
+        'order_id': order_id,
+        'user_id': user_id,
+        'status': status,
+        'delivered_at': delivered,
+        'version': version,
+    }
+
+
+def publish_order_status(order):
+    """
+    Publish an order's current status to waiting customers.
+
+    Called from the Order post_save signal; a no-op when neither status nor
+    delivered_at changed.
+    """
+    snapshot = build_snapshot(order.pk, order.user_id, order.status, order.delivered_at)
+    key = CACHE_KEY.format(order_id=order.pk)
+    current = cache.get(key)
+    if current is not None and current['version'] == snapshot['version']:
+        return
+    cache.set(key, snapshot, SNAPSHOT_TTL)
+
+
+def get_order_status(order_id):
+    """
+    Get the status snapshot for an order.
+
+    Returns:
+        dict or None: The snapshot, or None if the order does not exist
+    """
+    key = CACHE_KEY.format(order_id=order_id)
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        return snapshot
+
+    row = Order.objects.filter(pk=order_id).values('user_id', 'status', 'delivered_at').first()
+    if row is None:
+        return None
+    snapshot = build_snapshot(order_id, row['user_id'], row['status'], row['delivered_at'])
+    cache.set(key, snapshot, SNAPSHOT_TTL)
+    return snapshot
+
+
+async def aget_order_status(order_id):
+    """Async get_order_status (cache read and database fallback in one thread hop)."""
+    return await sync_to_async(get_order_status)(order_id)
+
+
+async def wait_for_order_status(order_id, since=None, timeout=DEFAULT_WAIT_TIMEOUT, user_id=None):
+    """
+    Wait until an order's status differs from the version the client has.
+
+    Args:
+        order_id: The order to watch
+        since: Version the client already has (None returns immediately)
+        timeout: Maximum seconds to wait (capped at MAX_WAIT_TIMEOUT)
+        user_id: Owner the order must belong to; checked before any waiting
+
+    Returns:
+        dict or None: The latest snapshot (unchanged if the wait timed out),
+        or None if the order does not exist or belongs to another user
+    """
+    snapshot = await aget_order_status(order_id)
+    if snapshot is None or (user_id is not None and snapshot['user_id'] != user_id):
+        return None
+    if not since:
+        return snapshot
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max(0, min(timeout, MAX_WAIT_TIMEOUT))
+    while snapshot['version'] == since and loop.time() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        snapshot = await aget_order_status(order_id)
+        if snapshot is None:
+            return None
+    return snapshot
@@ -1,7 +1,7 @@
 """
 Order creation utilities to ensure proper bag linking and prevent orphaned orders.
 """
-from django.db import transaction
+from food_ordering.db import write_transaction
 from django.contrib.auth import get_user_model
 from rest_framework.exceptions import ValidationError
 from .models import Order, Bag, Payment, FoodItem
@@ -70,7 +70,7 @@ def create_order_with_bags(user, bag_ids, delivery_address='', contact_phone='',
                     raise ValidationError(f"Bag '{bag.name}': Sorry, only {item.food_item.portions} {item.food_item.quantity_display.split(' ', 1)[1]} of {item.food_item.name} available. You have {item.portions} in your bag.")
     
     # Create order and link bags in a transaction with bulletproof inventory management
-    with transaction.atomic():
+    with write_transaction():
         # Step 1: Pre-validate inventory reduction (double-check before creating order)
         inventory_reductions = []
         for bag in bags:
@@ -228,7 +228,7 @@ def create_complete_order(user, bag_ids, delivery_address='', contact_phone='',
     Returns:
         tuple: (order, payment) - The created order and payment
     """
-    with transaction.atomic():
+    with write_transaction():
         # Create order with proper bag linking
         order = create_order_with_bags(
             user=user,
@@ -0,0 +1,31 @@
+"""
+Pagination classes for store API listings.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Newest-first cursor pagination on (created_at, id).
+
+    Pages are fetched with a keyset filter on the cursor position, so there is
+    no COUNT(*) over the joined queryset and no OFFSET scan as history grows.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class AdminCursorPaginationMixin:
+    """
+    Use cursor pagination when an admin lists every row.
+
+    Customers keep the default page-number pagination (and its ``count``).
+    """
+    admin_pagination_class = CreatedAtCursorPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and getattr(self.request.user, 'role', None) == 'admin':
+            self._paginator = self.admin_pagination_class()
+        return super().paginator
@@ -3,7 +3,7 @@ Bulletproof Payment Service
 Ensures payment amounts always match order totals with multiple layers of validation.
 """
 
-from django.db import transaction
+from food_ordering.db import write_transaction
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 from .models import Payment, Order
@@ -17,7 +17,7 @@ class PaymentService:
     """
     
     @staticmethod
-    @transaction.atomic
+    @write_transaction()
     def create_payment(order, user, payment_method, payment_type=None, **kwargs):
         """
         Create a payment with guaranteed amount consistency.
@@ -103,7 +103,7 @@ class PaymentService:
         return f"PAY_{uuid.uuid4().hex[:12].upper()}"
     
     @staticmethod
-    @transaction.atomic
+    @write_transaction()
     def update_payment_status(payment, status, **kwargs):
         """
         Update payment status while maintaining amount consistency.
@@ -149,7 +149,7 @@ class PaymentService:
         return inconsistent_payments
     
     @staticmethod
-    @transaction.atomic
+    @write_transaction()
     def fix_inconsistent_payments():
         """
         Fix all inconsistent payments by setting amount to order total.
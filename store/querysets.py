@@ -0,0 +1,74 @@
+"""
+Shared querysets for order reads.
+
+The builders mirror the serializer tree (OrderSerializer -> BagSerializer ->
+BagItemSerializer -> FoodItemSerializer) so listing N orders costs a fixed
+number of queries instead of several per order, bag and item.
+"""
+
+from django.db.models import Prefetch, Subquery
+
+from .models import Order, Bag, BagItem, SystemSettings
+
+
+def bag_items_queryset():
+    """
+    Bag items with food item and category joined in.
+
+    The active plate fee is annotated onto each row (``plate_fee_setting``) so
+    ``BagItem.plate_cost`` does not query SystemSettings once per item.
+    """
+    plate_fee = SystemSettings.objects.filter(
+        setting_type='plate_fee', is_active=True
+    ).values('value')[:1]
+    return BagItem.objects.select_related('food_item__category').annotate(
+        plate_fee_setting=Subquery(plate_fee)
+    )
+
+
+def bags_queryset():
+    """Bags with owner, items (see bag_items_queryset) and plates loaded."""
+    return Bag.objects.select_related('owner').prefetch_related(
+        Prefetch('items', queryset=bag_items_queryset()),
+        'plates',
+    )
+
+
+def order_graph_queryset(queryset=None, fields=None, expand=None):
+    """
+    Prefetch everything OrderSerializer touches.
+
+    Args:
+        queryset: Base Order queryset to extend (defaults to all orders)
+        fields: Requested ``?fields=`` names (None renders every field)
+        expand: Requested ``?expand=`` names; with sparse output, bags stay
+            primary keys unless expanded
+
+    Returns:
+        QuerySet: Orders with user, payment, bags, items, food items,
+        categories and plates loaded as far as the response needs them
+    """
+    if queryset is None:
+        queryset = Order.objects.all()
+    if fields is None and expand is None:
+        return queryset.select_related('user', 'payment').prefetch_related(
+            Prefetch('bags', queryset=bags_queryset())
+        )
+
+    top_level = {name.split('.')[0] for name in fields} if fields is not None else None
+
+    def wanted(name):
+        return top_level is None or name in top_level
+
+    related = [name for name in ('user', 'payment') if wanted(name)]
+    if related:
+        queryset = queryset.select_related(*related)
+
+    expanded = {name.split('.')[0] for name in (expand or [])}
+    expanded.update(name.split('.')[0] for name in (fields or []) if '.' in name)
+    if ('bags' in expanded and wanted('bags')) or wanted('subtotal') or wanted('total'):
+        # Totals are computed from bag items, so they need the full graph
+        queryset = queryset.prefetch_related(Prefetch('bags', queryset=bags_queryset()))
+    elif wanted('bags'):
+        queryset = queryset.prefetch_related(Prefetch('bags', queryset=Bag.objects.only('id')))
+    return queryset
@@ -6,35 +6,37 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
+from food_ordering.rate_limit import SlidingWindowUserRateThrottle, SlidingWindowAnonRateThrottle
 from django_ratelimit.decorators import ratelimit
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from food_ordering.db import write_transaction
 import logging
 import time
 
 from .models import FoodItem, Bag, BagItem, Order, Payment
 from .serializers import FoodItemSerializer, BagSerializer, OrderSerializer
 from .permissions import IsAdminOrOwnerOrReadOnly
+from .catalog import catalog_condition
+from .querysets import order_graph_queryset
 
 User = get_user_model()
 logger = logging.getLogger('food_ordering.security')
 
-class SecureUserRateThrottle(UserRateThrottle):
+class SecureUserRateThrottle(SlidingWindowUserRateThrottle):
     """Custom rate throttle for authenticated users"""
     scope = 'user'
 
-class SecureAnonRateThrottle(AnonRateThrottle):
+class SecureAnonRateThrottle(SlidingWindowAnonRateThrottle):
     """Custom rate throttle for anonymous users"""
     scope = 'anon'
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 @throttle_classes([SecureUserRateThrottle])
-@never_cache
+@catalog_condition()
 def secure_food_items(request):
     """
     Secure endpoint for food items with enhanced validation
@@ -72,10 +74,13 @@ def secure_food_items(request):
         # Log access
         logger.info(f"Food items accessed by user {request.user.id}")
         
-        return Response({
+        response = Response({
             'items': serializer.data,
             'count': len(serializer.data)
         })
+        # Clients must revalidate, but may keep a copy for conditional requests
+        response['Cache-Control'] = 'private, no-cache'
+        return response
         
     except Exception as e:
         logger.error(f"Error in secure_food_items: {str(e)}")
@@ -86,7 +91,7 @@ def secure_food_items(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @throttle_classes([SecureUserRateThrottle])
-@transaction.atomic
+@write_transaction()
 def secure_create_bag_item(request):
     """
     Secure endpoint for creating bag items with validation
@@ -167,7 +172,7 @@ def secure_create_bag_item(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @throttle_classes([SecureUserRateThrottle])
-@transaction.atomic
+@write_transaction()
 def secure_create_order(request):
     """
     Secure endpoint for creating orders with comprehensive validation
@@ -260,7 +265,7 @@ def secure_user_orders(request):
     """
     try:
         # Get user's orders with security checks
-        orders = Order.objects.filter(user=request.user).order_by('-created_at')[:50]
+        orders = order_graph_queryset(Order.objects.filter(user=request.user)).order_by('-created_at')[:50]
         
         serializer = OrderSerializer(orders, many=True)
         
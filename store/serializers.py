@@ -4,10 +4,93 @@ from .models import (
     Order, OrderNotification, InventoryItem, Payment
 )
 
+
+# ------------------------------
+# Sparse fieldsets / expansion
+# ------------------------------
+def _split_param(value):
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+def get_sparse_params(request):
+    """
+    Read ``?fields=`` and ``?expand=`` from a GET request.
+
+    Both take comma-separated names; nested names use dots
+    (``fields=id,status,bags.name&expand=bags``).
+
+    Returns:
+        tuple: (fields list or None, expand list or None)
+    """
+    if request is None or request.method != 'GET':
+        return None, None
+    fields = request.query_params.get('fields')
+    expand = request.query_params.get('expand')
+    return (
+        _split_param(fields) if fields is not None else None,
+        _split_param(expand) if expand is not None else None,
+    )
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets and on-demand expansion driven by the request.
+
+    Without ``?fields=`` / ``?expand=`` the output is unchanged. When either is
+    given, only the requested fields are rendered and nested serializers are
+    collapsed to primary keys unless listed in ``expand``. Applies at every
+    level of nesting using dotted paths.
+    """
+
+    def _field_path(self):
+        parts = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                parts.insert(0, node.field_name)
+            node = node.parent
+        return '.'.join(parts)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, expand = get_sparse_params(self.context.get('request'))
+        if requested is None and expand is None:
+            return fields
+
+        path = self._field_path()
+        prefix = f'{path}.' if path else ''
+
+        if requested is not None:
+            allowed = {
+                name[len(prefix):].split('.')[0]
+                for name in requested if name.startswith(prefix)
+            }
+            # Nothing requested at this level (e.g. fields=bags&expand=bags): keep
+            # every field. Unexpanded nested serializers are collapsed to PKs below.
+            if allowed:
+                for name in list(fields):
+                    if name not in allowed:
+                        fields.pop(name)
+
+        expanded = set()
+        # Naming a nested path (bags.items.name) implies expanding its parents
+        for name in (expand or []) + (requested or []):
+            parts = name.split('.')
+            expanded.update('.'.join(parts[:i]) for i in range(1, len(parts)))
+        expanded.update(expand or [])
+        for name, field in list(fields.items()):
+            if f'{prefix}{name}' in expanded:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                fields[name] = serializers.PrimaryKeyRelatedField(many=True, read_only=True, source=field.source)
+            elif isinstance(field, serializers.BaseSerializer):
+                fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, source=field.source)
+        return fields
+
 # ------------------------------
 # Category
 # ------------------------------
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name']
@@ -16,7 +99,7 @@ class CategorySerializer(serializers.ModelSerializer):
 # ------------------------------
 # PizzaOption
 # ------------------------------
-class PizzaOptionSerializer(serializers.ModelSerializer):
+class PizzaOptionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = PizzaOption
         fields = ['id', 'size', 'price']
@@ -25,7 +108,7 @@ class PizzaOptionSerializer(serializers.ModelSerializer):
 # ------------------------------
 # FoodItem
 # ------------------------------
-class FoodItemSerializer(serializers.ModelSerializer):
+class FoodItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     category = serializers.SlugRelatedField(
         slug_field="name",
         queryset=Category.objects.all()
@@ -72,7 +155,7 @@ class FoodItemSerializer(serializers.ModelSerializer):
 # ------------------------------
 # Plate
 # ------------------------------
-class PlateSerializer(serializers.ModelSerializer):
+class PlateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     total_fee = serializers.DecimalField(
         max_digits=10, decimal_places=2, read_only=True
     )
@@ -85,7 +168,7 @@ class PlateSerializer(serializers.ModelSerializer):
 # ------------------------------
 # BagItem
 # ------------------------------
-class BagItemSerializer(serializers.ModelSerializer):
+class BagItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     food_item = FoodItemSerializer(read_only=True)
     food_item_id = serializers.PrimaryKeyRelatedField(
         queryset=FoodItem.objects.all(), source='food_item', write_only=True
@@ -131,7 +214,7 @@ class BagItemSerializer(serializers.ModelSerializer):
 # ------------------------------
 # Bag
 # ------------------------------
-class BagSerializer(serializers.ModelSerializer):
+class BagSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     items = BagItemSerializer(many=True, read_only=True)
     plates = PlateSerializer(many=True, read_only=True)
     owner = serializers.SerializerMethodField()
@@ -175,7 +258,7 @@ class BagSerializer(serializers.ModelSerializer):
 # ------------------------------
 # Order
 # ------------------------------
-class OrderCreateSerializer(serializers.ModelSerializer):
+class OrderCreateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for creating orders with proper bag linking."""
     bag_ids = serializers.ListField(
         child=serializers.IntegerField(),
@@ -246,7 +329,7 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         return order
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Read-only serializer for displaying orders."""
     bags = BagSerializer(many=True, read_only=True)
     subtotal = serializers.ReadOnlyField()
@@ -296,7 +379,7 @@ class OrderSerializer(serializers.ModelSerializer):
 # ------------------------------
 # Order Status Update
 # ------------------------------
-class OrderStatusUpdateSerializer(serializers.ModelSerializer):
+class OrderStatusUpdateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ['status']
@@ -305,7 +388,7 @@ class OrderStatusUpdateSerializer(serializers.ModelSerializer):
 # ------------------------------
 # Inventory Item
 # ------------------------------
-class InventoryItemSerializer(serializers.ModelSerializer):
+class InventoryItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     updated_by_name = serializers.CharField(source='updated_by.get_full_name', read_only=True)
 
@@ -322,7 +405,7 @@ class InventoryItemSerializer(serializers.ModelSerializer):
 # ------------------------------
 # Payment
 # ------------------------------
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_name = serializers.SerializerMethodField()
     order_id = serializers.IntegerField(source='order.id', read_only=True)
 
@@ -342,7 +425,7 @@ class PaymentSerializer(serializers.ModelSerializer):
 # ------------------------------
 # Notifications
 # ------------------------------
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_first_name = serializers.CharField(source='order.user.first_name', read_only=True)
     user_last_name = serializers.CharField(source='order.user.last_name', read_only=True)
     user_phone = serializers.CharField(source='order.user.phone_number', read_only=True)
@@ -1,6 +1,6 @@
 from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from .models import FoodItem, Category, Bag, BagItem, Plate, Payment, Order
+from .models import FoodItem, FoodItemTombstone, Category, Bag, BagItem, Plate, Payment, Order, PizzaOption
 import logging
 
 logger = logging.getLogger(__name__)
@@ -111,3 +111,64 @@ def track_delivery_time(sender, instance, **kwargs):
                 logger.info(f"Order #{instance.id} marked as delivered at {instance.delivered_at}")
         except Order.DoesNotExist:
             pass  # New order, no old data to compare
+
+
+# -------------------------------
+# Catalog Versioning
+# -------------------------------
+@receiver(post_delete, sender=FoodItem)
+def touch_category_on_fooditem_delete(sender, instance, **kwargs):
+    """Bump the category timestamp so catalog Last-Modified moves on deletions."""
+    from django.utils import timezone
+    Category.objects.filter(pk=instance.category_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=FoodItem)
+def record_fooditem_tombstone(sender, instance, **kwargs):
+    """Log the deletion for the catalog change feed (store.prune_tombstones expires them)."""
+    FoodItemTombstone.objects.create(food_item_id=instance.pk)
+
+
+@receiver(post_delete, sender=Category)
+def touch_categories_on_category_delete(sender, instance, **kwargs):
+    """Bump the remaining categories so catalog Last-Modified moves on deletions."""
+    from django.utils import timezone
+    Category.objects.update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=PizzaOption)
+def touch_fooditem_on_pizzaoption_delete(sender, instance, **kwargs):
+    """Bump the pizza's timestamp so catalog Last-Modified and the change feed pick up the removal."""
+    from django.utils import timezone
+    FoodItem.objects.filter(pk=instance.food_item_id).update(updated_at=timezone.now())
+
+
+# -------------------------------
+# Order Status Feed
+# -------------------------------
+@receiver(post_save, sender=Order)
+def publish_order_status_change(sender, instance, **kwargs):
+    """Push status / delivered_at changes to customers waiting on the tracking page."""
+    from django.db import transaction
+    from .order_status import publish_order_status
+    transaction.on_commit(lambda: publish_order_status(instance))
+
+
+# -------------------------------
+# Stats Cache Invalidation
+# -------------------------------
+@receiver(post_save, sender=Payment)
+def invalidate_stats_on_payment_success(sender, instance, **kwargs):
+    """Customer and revenue figures only change when a payment succeeds."""
+    if instance.status == 'success':
+        from .stats_service import invalidate_stats
+        invalidate_stats()
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=FoodItem)
+@receiver(post_delete, sender=FoodItem)
+def invalidate_admin_stats(sender, instance, **kwargs):
+    """Active order and stock counts on the admin index."""
+    from .stats_service import invalidate_stats
+    invalidate_stats(include_customers=False)
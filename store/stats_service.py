@@ -0,0 +1,120 @@
+"""
+Stats Service
+Cached customer and inventory statistics for the stats API and admin index.
+
+Customer metrics come from one conditional aggregate over payments plus one
+grouped query for the top customer. Results are cached briefly and dropped
+when a payment succeeds (see store.signals).
+"""
+
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import FoodItem, Order, Payment
+
+
+STATS_CACHE_TTL = 60  # seconds
+CUSTOMER_STATS_KEY = 'store:customer_stats'
+ADMIN_STATS_KEY = 'store:admin_index_stats'
+
+
+def compute_customer_stats():
+    """
+    Compute customer metrics (two queries).
+
+    Customers are users with the customer role who have made at least one
+    payment. Active means a payment in the last 30 days; the top customer has
+    the most successful payments.
+
+    Returns:
+        dict: total_customers, new_customers_this_month, active_customers and
+        top_customer (dict or None)
+    """
+    now = timezone.now()
+    this_month = now.replace(day=1)
+    thirty_days_ago = now - timezone.timedelta(days=30)
+
+    customer_payments = Payment.objects.filter(user__role='customer')
+    counts = customer_payments.aggregate(
+        total_customers=Count('user', distinct=True),
+        new_customers_this_month=Count('user', distinct=True, filter=Q(created_at__gte=this_month)),
+        active_customers=Count('user', distinct=True, filter=Q(created_at__gte=thirty_days_ago)),
+    )
+
+    top = (
+        customer_payments.filter(status='success')
+        .values('user', 'user__first_name', 'user__last_name', 'user__phone_number')
+        .annotate(total_orders=Count('id'), total_spent=Sum('amount'))
+        .order_by('-total_orders')
+        .first()
+    )
+    top_customer = None
+    if top:
+        top_customer = {
+            'first_name': top['user__first_name'],
+            'last_name': top['user__last_name'],
+            'phone_number': top['user__phone_number'],
+            'total_orders': top['total_orders'],
+            'total_spent': top['total_spent'],
+        }
+
+    return {**counts, 'top_customer': top_customer}
+
+
+def get_customer_stats():
+    """Customer metrics, cached for STATS_CACHE_TTL seconds."""
+    stats = cache.get(CUSTOMER_STATS_KEY)
+    if stats is None:
+        stats = compute_customer_stats()
+        cache.set(CUSTOMER_STATS_KEY, stats, STATS_CACHE_TTL)
+    return stats
+
+
+def get_admin_index_stats():
+    """
+    Customer, order, revenue and inventory metrics for the admin index.
+
+    Returns:
+        dict: get_customer_stats() plus today_orders, today_revenue,
+        total_items, available_items and out_of_stock_items
+    """
+    stats = cache.get(ADMIN_STATS_KEY)
+    if stats is not None:
+        return stats
+
+    today = timezone.now().date()
+    inventory = FoodItem.objects.aggregate(
+        total_items=Count('id'),
+        available_items=Count('id', filter=Q(portions__gt=0)),
+        out_of_stock_items=Count('id', filter=Q(portions=0)),
+    )
+    stats = {
+        **get_customer_stats(),
+        **inventory,
+        # Active paid orders (not only today's, matching the previous behaviour)
+        'today_orders': Order.objects.filter(
+            payment__status='success',
+            status__in=['Pending', 'On the Way'],
+        ).count(),
+        'today_revenue': Payment.objects.filter(
+            status='success',
+            created_at__date=today,
+        ).aggregate(total=Sum('amount'))['total'] or 0,
+    }
+    cache.set(ADMIN_STATS_KEY, stats, STATS_CACHE_TTL)
+    return stats
+
+
+def invalidate_stats(include_customers=True):
+    """
+    Drop cached stats.
+
+    Args:
+        include_customers: Also drop customer metrics (only payments change them;
+            order and stock changes only affect the admin index figures)
+    """
+    keys = [ADMIN_STATS_KEY]
+    if include_customers:
+        keys.append(CUSTOMER_STATS_KEY)
+    cache.delete_many(keys)
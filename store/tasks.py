@@ -0,0 +1,14 @@
+"""Background tasks for the store."""
+
+from django.utils import timezone
+
+from jobs.queue import task
+
+from .catalog import TOMBSTONE_RETENTION
+from .models import FoodItemTombstone
+
+
+@task('store.prune_tombstones')
+def prune_tombstones():
+    """Drop food item tombstones older than the catalog change feed reports."""
+    FoodItemTombstone.objects.filter(deleted_at__lt=timezone.now() - TOMBSTONE_RETENTION).delete()
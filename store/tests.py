@@ -1,3 +1,681 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.transaction import TransactionManagementError
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from food_ordering.compression_middleware import CompressionMiddleware
+from food_ordering.db import write_transaction
+from food_ordering.metrics import metrics_store
+from food_ordering.outbound import PaymentGatewayError, PaymentGatewayUnavailable
+from food_ordering.rate_limit import rate_limiter
+from food_ordering.sql_instrumentation import MAX_REPORTS, clear_reports, get_recent_reports, save_report
+from .catalog import (
+    CHANGE_FEED_OVERLAP, TOMBSTONE_RETENTION, decode_change_token, encode_change_token, get_catalog_changes,
+)
+from .models import Category, FoodItem, Bag, BagItem, Order, OrderNotification, Payment, PizzaOption, Plate, SystemSettings
+from .order_status import publish_order_status
+from .stats_service import ADMIN_STATS_KEY, CUSTOMER_STATS_KEY, compute_customer_stats, get_admin_index_stats
+
+
+class StoreAPITestCase(TestCase):
+    """Shared customer/admin users, menu and order factory for store API tests."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user(phone_number='08010000001', first_name='Ada', last_name='Obi')
+        cls.admin = User.objects.create_user(phone_number='08010000002', first_name='Admin', last_name='User')
+        cls.admin.role = 'admin'
+        cls.admin.save()
+
+        food = Category.objects.create(name='Food')
+        drinks = Category.objects.create(name='Drinks')
+        cls.rice = FoodItem.objects.create(name='Jollof Rice', price=Decimal('1500'), category=food, portions=1000)
+        cls.coke = FoodItem.objects.create(name='Coke', price=Decimal('300'), category=drinks, portions=1000)
+        SystemSettings.objects.create(setting_type='plate_fee', value=Decimal('70'))
+
+    def setUp(self):
+        # Throttle counters and the cache live outside the test database (in
+        # temporary files for the test run; see food_ordering.test_runner)
+        rate_limiter.reset()
+        cache.clear()
+
+    def create_orders(self, count):
+        orders = []
+        for i in range(count):
+            bag = Bag.objects.create(owner=self.customer, name=f'Bag {i}')
+            BagItem.objects.create(bag=bag, food_item=self.rice, portions=2, plates=1)
+            BagItem.objects.create(bag=bag, food_item=self.coke, portions=1)
+            Plate.objects.create(bag=bag, count=1)
+            order = Order(user=self.customer, delivery_address='12 Allen Avenue, Ikeja', contact_phone='08010000001')
+            order.save()
+            order.bags.set([bag])
+            Payment.objects.create(
+                user=self.customer, order=order, reference=f'REF-{order.id}',
+                amount=Decimal('4000'), status='success'
+            )
+            orders.append(order)
+        return orders
+
+    def count_queries(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+
+class OrderQueryBudgetTests(StoreAPITestCase):
+    """Order endpoints must issue a constant number of queries, however many orders exist."""
+
+    def assertConstantQueries(self, user, url):
+        self.create_orders(1)
+        baseline, _ = self.count_queries(user, url)
+        self.create_orders(5)
+        queries, response = self.count_queries(user, url)
+        self.assertEqual(queries, baseline)
+        return response
+
+    def test_admin_order_list(self):
+        response = self.assertConstantQueries(self.admin, '/api/store/orders/')
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_customer_order_list(self):
+        self.assertConstantQueries(self.customer, '/api/store/orders/')
+
+    def test_order_detail(self):
+        order = self.create_orders(3)[0]
+        queries, response = self.count_queries(self.customer, f'/api/store/orders/{order.id}/')
+        self.assertLessEqual(queries, 8)
+        self.assertEqual(response.data['payment']['reference'], f'REF-{order.id}')
+
+    def test_order_list_expand_only(self):
+        response = self.assertConstantQueries(self.customer, '/api/store/orders/?expand=bags')
+        bag = response.data['results'][0]['bags'][0]
+        self.assertTrue(all(isinstance(item, int) for item in bag['items']))
+
+    def test_secure_user_orders(self):
+        response = self.assertConstantQueries(self.customer, '/api/store/secure/user-orders/')
+        self.assertEqual(response.data['count'], 6)
+
+    def test_prefetched_plate_fee_matches_setting(self):
+        self.create_orders(1)
+        response = self.count_queries(self.customer, '/api/store/orders/')[1]
+        rice_item = response.data['results'][0]['bags'][0]['items'][0]
+        self.assertEqual(Decimal(str(rice_item['plate_cost'])), Decimal('70'))
+
+
+class OrderHistoryAPITests(StoreAPITestCase):
+    """The order-history API pages through every order, keeping the page size."""
+
+    def test_next_links_cover_all_orders(self):
+        self.create_orders(5)
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.customer).access_token}'}
+        url, seen = '/api/user-orders/?page_size=2', []
+        while url:
+            data = self.client.get(url, headers=headers).json()
+            self.assertLessEqual(len(data['orders']), 2)
+            seen += [order['id'] for order in data['orders']]
+            url = data['next']
+            if url:
+                self.assertIn('page_size=2', url)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_total_is_amount_paid(self):
+        self.create_orders(1)
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.customer).access_token}'}
+        data = self.client.get('/api/user-orders/', headers=headers).json()
+        self.assertEqual(data['orders'][0]['total'], 4000.0)
+        self.assertIsNone(data['next'])
+
+
+class BagItemBulkCreateTests(StoreAPITestCase):
+    """Bulk add is all or nothing unless partial is set, and reports errors per line."""
+
+    def setUp(self):
+        super().setUp()
+        self.bag = Bag.objects.create(owner=self.customer, name='Bulk')
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.customer)
+
+    def post(self, items, **extra):
+        return self.api.post(
+            '/api/store/bag-items/bulk/', {'bag_id': self.bag.id, 'items': items, **extra}, format='json'
+        )
+
+    def mixed_lines(self):
+        return [
+            {'food_item_id': self.rice.id, 'portions': 2, 'plates': 1},
+            {'food_item_id': self.coke.id, 'portions': 0},
+            {'food_item_id': 999999, 'portions': 1},
+        ]
+
+    def test_all_or_nothing(self):
+        response = self.post(self.mixed_lines())
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(BagItem.objects.filter(bag=self.bag).exists())
+        self.assertEqual(
+            [(error['index'], error['food_item_id']) for error in response.data['errors']],
+            [(1, self.coke.id), (2, 999999)],
+        )
+
+    def test_partial(self):
+        response = self.post(self.mixed_lines(), partial=True)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['created']), 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertEqual(BagItem.objects.get(bag=self.bag).food_item, self.rice)
+
+    def test_partial_false_string(self):
+        response = self.post(self.mixed_lines(), partial='false')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(BagItem.objects.filter(bag=self.bag).exists())
+
+    def test_bools_are_not_ints(self):
+        response = self.post([
+            {'food_item_id': self.rice.id, 'portions': True, 'plates': 1},
+            {'food_item_id': self.rice.id, 'portions': 1, 'plates': True},
+            {'food_item_id': True, 'portions': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['errors']), 3)
+
+
+class CustomerAuthTests(StoreAPITestCase):
+    """Customer pages: session login first, then the JWT (header, or the deprecated jwt_token parameter)."""
+
+    def setUp(self):
+        super().setUp()
+        self.create_orders(1)
+
+    def bearer(self, user):
+        return {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+    def history_user(self, url='/orders/', **kwargs):
+        return self.client.get(url, **kwargs).context['user']
+
+    def test_session_user_first(self):
+        self.client.force_login(self.customer)
+        self.assertEqual(self.history_user(headers=self.bearer(self.admin)), self.customer)
+
+    def test_query_string_token_deprecated(self):
+        token = RefreshToken.for_user(self.customer).access_token
+        with self.assertLogs('customer_site.middleware', 'WARNING'):
+            self.assertEqual(self.history_user(f'/orders/?jwt_token={token}'), self.customer)
+
+    def test_session_opened_from_token(self):
+        client = Client(enforce_csrf_checks=True)
+        response = client.post('/api/session/', headers=self.bearer(self.customer))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get('/orders/').context['user'], self.customer)
+
+        # Logging out needs the CSRF token, so another site cannot end the session
+        self.assertEqual(client.delete('/api/session/').status_code, 403)
+        self.assertEqual(client.get('/orders/').context['user'], self.customer)
+        csrf_token = response.json()['csrf_token']
+        self.assertEqual(client.delete('/api/session/', headers={'X-CSRFToken': csrf_token}).status_code, 200)
+        self.assertFalse(client.get('/orders/').context['user'].is_authenticated)
+
+    def test_deactivated_user_loses_cached_token(self):
+        headers = self.bearer(self.customer)
+        self.assertEqual(self.client.get('/api/user-orders/', headers=headers).status_code, 200)
+        self.customer.is_active = False
+        self.customer.save()
+        self.assertEqual(self.client.get('/api/user-orders/', headers=headers).status_code, 401)
+
+
+class SparseFieldsetTests(StoreAPITestCase):
+    """?fields= and ?expand= on the order list."""
+
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_orders(1)[0]
+        self.bag = self.order.bags.get()
+
+    def first_order(self, query):
+        _, response = self.count_queries(self.customer, f'/api/store/orders/?{query}')
+        return response.data['results'][0]
+
+    def test_nested_collapses_to_pks(self):
+        order = self.first_order('fields=id,status,bags')
+        self.assertEqual(set(order), {'id', 'status', 'bags'})
+        self.assertEqual(order['bags'], [self.bag.id])
+
+    def test_expanded_nested_keeps_all_fields(self):
+        order = self.first_order('fields=id,bags&expand=bags')
+        self.assertEqual(set(order), {'id', 'bags'})
+        self.assertEqual(order['bags'][0]['name'], self.bag.name)
+        self.assertIn('subtotal', order['bags'][0])
+
+    def test_dotted_field_expands_parent(self):
+        order = self.first_order('fields=id,bags.name')
+        self.assertEqual(order['bags'], [{'name': self.bag.name}])
+
+
+class CatalogETagTests(StoreAPITestCase):
+    """The menu ETag changes with stock and pizza options, however they are updated."""
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(user=self.customer)
+
+    def assertETagChanges(self, change):
+        etag = self.api.get('/api/store/items/')['ETag']
+        self.assertEqual(self.api.get('/api/store/items/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        response = self.api.get('/api/store/items/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_stock_change_via_save(self):
+        self.assertETagChanges(lambda: self.rice.reduce_portions(3))
+
+    def test_stock_change_via_update(self):
+        self.assertETagChanges(lambda: FoodItem.objects.filter(pk=self.rice.pk).update(portions=5))
+
+    def test_pizza_option_change(self):
+        option = PizzaOption.objects.create(food_item=self.rice, size='S', price=Decimal('2000'))
+        self.assertETagChanges(lambda: PizzaOption.objects.filter(pk=option.pk).update(price=Decimal('2500')))
+        self.assertETagChanges(option.delete)
+
+
+
+class CatalogChangeFeedTests(TestCase):
+    """get_catalog_changes: sync tokens, tombstones, full resets and the overlap window."""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Food')
+        self.rice = FoodItem.objects.create(name='Jollof Rice', price=Decimal('1500'), category=self.category)
+        self.beans = FoodItem.objects.create(name='Beans', price=Decimal('800'), category=self.category)
+
+    def set_updated_at(self, item, moment):
+        FoodItem.objects.filter(pk=item.pk).update(updated_at=moment)
+
+    def test_token_round_trip(self):
+        moment = timezone.now()
+        self.assertEqual(decode_change_token(encode_change_token(moment)), moment)
+        self.assertIsNone(decode_change_token('not-a-token'))
+
+    def test_next_token_covers_latest_change(self):
+        changes = get_catalog_changes()
+        self.assertTrue(changes['reset'])
+        latest = FoodItem.objects.order_by('-updated_at').first().updated_at
+        self.assertEqual(decode_change_token(changes['token']), latest)
+
+    def test_only_changes_since_token(self):
+        since = timezone.now() - timedelta(minutes=10)
+        self.set_updated_at(self.rice, since - timedelta(minutes=5))
+        changes = get_catalog_changes(since)
+        self.assertFalse(changes['reset'])
+        self.assertEqual([item.pk for item in changes['items']], [self.beans.pk])
+
+    def test_token_older_than_retention_resets(self):
+        since = timezone.now() - TOMBSTONE_RETENTION - timedelta(days=1)
+        self.set_updated_at(self.rice, since - timedelta(days=1))
+        changes = get_catalog_changes(since)
+        self.assertTrue(changes['reset'])
+        self.assertEqual(changes['deleted'], [])
+        self.assertCountEqual([item.pk for item in changes['items']], [self.rice.pk, self.beans.pk])
+
+    def test_deletes_reported_as_tombstones(self):
+        since = decode_change_token(get_catalog_changes()['token'])
+        beans_id = self.beans.pk
+        self.beans.delete()
+        changes = get_catalog_changes(since)
+        self.assertEqual(changes['deleted'], [beans_id])
+        self.assertNotIn(beans_id, [item.pk for item in changes['items']])
+        self.assertGreaterEqual(decode_change_token(changes['token']), since)
+
+    def test_overlap_keeps_edits_from_the_same_second(self):
+        since = decode_change_token(get_catalog_changes()['token'])
+        # Committed after the token was issued but stamped just before it
+        self.set_updated_at(self.rice, since - timedelta(seconds=1))
+        self.set_updated_at(self.beans, since - CHANGE_FEED_OVERLAP - timedelta(seconds=1))
+        changes = get_catalog_changes(since)
+        self.assertEqual([item.pk for item in changes['items']], [self.rice.pk])
+
+
+class StatsServiceTests(StoreAPITestCase):
+    """Cached stats match the per-metric queries they replaced and are dropped on relevant writes."""
+
+    def setUp(self):
+        super().setUp()
+        self.create_orders(2)
+        now = timezone.now()
+        bola = User.objects.create_user(phone_number='08010000003', first_name='Bola', last_name='Ade')
+        chidi = User.objects.create_user(phone_number='08010000004', first_name='Chidi', last_name='Eze')
+        old = Payment.objects.create(user=bola, reference='OLD-1', amount=Decimal('900'), status='success')
+        Payment.objects.filter(pk=old.pk).update(created_at=now - timedelta(days=40))
+        Payment.objects.create(user=bola, reference='FAILED-1', amount=Decimal('500'), status='failed')
+        recent = Payment.objects.create(user=chidi, reference='PENDING-1', amount=Decimal('700'))
+        Payment.objects.filter(pk=recent.pk).update(created_at=now - timedelta(days=10))
+        Payment.objects.create(user=self.admin, reference='ADMIN-1', amount=Decimal('100'), status='success')
+
+    def legacy_customer_stats(self):
+        """The per-metric queries the stats view and admin index used to run."""
+        now = timezone.now()
+        customers = User.objects.filter(role='customer', payments__isnull=False)
+        top = User.objects.filter(
+            role='customer', payments__isnull=False, payments__status='success'
+        ).annotate(
+            total_orders=Count('payments'), total_spent=Sum('payments__amount')
+        ).order_by('-total_orders').first()
+        return {
+            'total_customers': customers.distinct().count(),
+            'new_customers_this_month': customers.filter(
+                payments__created_at__gte=now.replace(day=1)
+            ).distinct().count(),
+            'active_customers': customers.filter(
+                payments__created_at__gte=now - timedelta(days=30)
+            ).distinct().count(),
+            'top_customer': {
+                'first_name': top.first_name,
+                'last_name': top.last_name,
+                'phone_number': top.phone_number,
+                'total_orders': top.total_orders,
+                'total_spent': top.total_spent,
+            },
+        }
+
+    def test_matches_per_metric_queries(self):
+        with self.assertNumQueries(2):
+            stats = compute_customer_stats()
+        self.assertEqual(stats, self.legacy_customer_stats())
+        self.assertEqual(stats['top_customer']['phone_number'], self.customer.phone_number)
+
+    def cached(self):
+        return cache.get(ADMIN_STATS_KEY) is not None, cache.get(CUSTOMER_STATS_KEY) is not None
+
+    def test_order_and_stock_changes_drop_admin_figures(self):
+        for change in (
+            lambda: Order.objects.first().save(),
+            lambda: self.rice.reduce_portions(1),
+            lambda: FoodItem.objects.create(name='Beans', price=Decimal('800'), category=self.rice.category).delete(),
+        ):
+            get_admin_index_stats()
+            self.assertEqual(self.cached(), (True, True))
+            change()
+            self.assertEqual(self.cached(), (False, True))
+
+    def test_successful_payment_drops_everything(self):
+        get_admin_index_stats()
+        Payment.objects.create(user=self.customer, reference='PENDING-2', amount=Decimal('300'))
+        self.assertEqual(self.cached(), (True, True))
+
+        payment = Payment.objects.get(reference='PENDING-2')
+        payment.status = 'success'
+        payment.save()
+        self.assertEqual(self.cached(), (False, False))
+
+class AdminCursorPaginationTests(StoreAPITestCase):
+    """Admin-wide listings page by (created_at, id) cursor without COUNT queries."""
+
+    def walk(self, url):
+        client = APIClient()
+        client.force_authenticate(user=self.admin)
+        ids = []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries))
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_admin_orders_cursor(self):
+        orders = self.create_orders(7)
+        ids = self.walk('/api/store/orders/?page_size=3&fields=id')
+        self.assertEqual(ids, [order.id for order in reversed(orders)])
+
+    def test_admin_notifications_cursor(self):
+        order = self.create_orders(1)[0]
+        notifications = [OrderNotification.objects.create(order=order, message=f'Update {i}') for i in range(5)]
+        ids = self.walk('/api/store/notifications/?page_size=2')
+        self.assertEqual(ids, [notification.id for notification in reversed(notifications)])
+
+    def test_customer_keeps_page_numbers(self):
+        self.create_orders(2)
+        _, response = self.count_queries(self.customer, '/api/store/orders/')
+        self.assertEqual(response.data['count'], 2)
+
+
+class QueryPlanTests(TestCase):
+    """Hot dashboard, history and OTP queries are served by indexes."""
+
+    def test_no_full_scans(self):
+        call_command('verify_query_plans', stdout=io.StringIO())
+
+
+class SharedStoreIsolationTests(TestCase):
+    """Tests never read or clear the live SQLite stores next to the project."""
+
+    def test_stores_use_temporary_files(self):
+        for path in (cache.path, rate_limiter.path, metrics_store.path):
+            self.assertFalse(os.path.abspath(path).startswith(str(settings.BASE_DIR)), path)
+
+
+
+class WriteLaneTests(TestCase):
+    """write_transaction refuses to queue for the lane while holding SQLite's write lock."""
+
+    def test_nested_write_transactions(self):
+        with write_transaction():
+            with write_transaction():
+                Category.objects.create(name='Soups')
+        self.assertTrue(Category.objects.filter(name='Soups').exists())
+
+    def test_inside_plain_atomic_refused(self):
+        with transaction.atomic():
+            with self.assertRaises(TransactionManagementError):
+                with write_transaction():
+                    pass
+
+class SQLInstrumentationTests(StoreAPITestCase):
+    """Server-Timing and the SQL page are for staff only; reports from concurrent workers are all kept."""
+
+    def test_server_timing_for_staff_only(self):
+        self.assertFalse(self.client.get('/api/store/items/').has_header('Server-Timing'))
+        self.client.force_login(self.customer)
+        self.assertFalse(self.client.get('/api/store/items/').has_header('Server-Timing'))
+        self.customer.is_staff = True
+        self.customer.save()
+        self.assertIn('queries', self.client.get('/api/store/items/')['Server-Timing'])
+
+    def test_sql_page_for_staff_only(self):
+        self.assertEqual(self.client.get('/dashboard/diagnostics/sql/').status_code, 302)
+        for user in (self.customer, self.admin):
+            self.client.force_login(user)
+            self.assertEqual(self.client.get('/dashboard/diagnostics/sql/').status_code, 403)
+        self.admin.is_staff = True
+        self.admin.save()
+        self.assertEqual(self.client.get('/dashboard/diagnostics/sql/').status_code, 200)
+
+    @override_settings(DEBUG=True)
+    def test_server_timing_in_debug(self):
+        self.assertTrue(self.client.get('/api/store/items/').has_header('Server-Timing'))
+
+    def test_concurrent_reports_kept(self):
+        threads = [threading.Thread(target=save_report, args=({'path': f'/{i}/'},)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(report['path'] for report in get_recent_reports()), sorted(f'/{i}/' for i in range(20)))
+
+    def test_reports_newest_first_and_capped(self):
+        for i in range(MAX_REPORTS + 5):
+            save_report({'path': f'/{i}/'})
+        reports = get_recent_reports()
+        self.assertEqual(len(reports), MAX_REPORTS)
+        self.assertEqual(reports[0]['path'], f'/{MAX_REPORTS + 4}/')
+        clear_reports()
+        self.assertEqual(get_recent_reports(), [])
+
+
+class CompressionBREACHTests(TestCase):
+    """Padded gzip for responses that may hold secrets; brotli only for credential-free ones."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.body = 'x' * 5000
+
+    def compress(self, request, response=None):
+        response = response or HttpResponse(self.body, content_type='text/html')
+        fake_brotli = mock.Mock(compress=lambda content, quality: content[:100])
+        with mock.patch('food_ordering.compression_middleware.brotli', fake_brotli):
+            return CompressionMiddleware(lambda r: response).process_response(request, response)
+
+    def test_gzip_length_varies(self):
+        lengths = {
+            len(self.compress(self.factory.post('/', HTTP_ACCEPT_ENCODING='gzip')).content)
+            for _ in range(20)
+        }
+        self.assertGreater(len(lengths), 1)
+
+    def test_brotli_for_anonymous_get(self):
+        response = self.compress(self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip, br'))
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_gzip_when_response_may_hold_secret(self):
+        requests = {
+            'post': self.factory.post('/', HTTP_ACCEPT_ENCODING='gzip, br'),
+            'bearer': self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip, br', HTTP_AUTHORIZATION='Bearer x'),
+            'session': self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip, br'),
+            'csrf': self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip, br'),
+        }
+        requests['session'].COOKIES[settings.SESSION_COOKIE_NAME] = 'abc'
+        get_token(requests['csrf'])
+        for name, request in requests.items():
+            with self.subTest(name):
+                self.assertEqual(self.compress(request)['Content-Encoding'], 'gzip')
+
+        response = HttpResponse(self.body, content_type='text/html')
+        response.set_cookie('sessionid', 'abc')
+        response = self.compress(self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip, br'), response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+class StartupImportTests(TestCase):
+    """Worker boot leaves the payment, SMS and monitoring clients unloaded."""
+
+    def test_lazy_dependencies_not_imported(self):
+        call_command('benchmark_startup', scenario=['worker'], repeat=1, stdout=io.StringIO())
+
+
+class AsyncPaymentViewTests(StoreAPITestCase):
+    """Payment endpoints await Paystack instead of blocking a worker thread."""
+
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_orders(1)[0]
+        self.order.status = 'Incomplete'
+        self.order.save()
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.customer).access_token}'}
+
+    async def fake_paystack(self, method, path, payload=None):
+        await asyncio.sleep(0.2)
+        return {'status': True, 'data': {'status': 'success', 'authorization_url': 'https://checkout'}}
+
+    async def test_verify_payment(self):
+        with mock.patch('store.views.paystack_request', self.fake_paystack):
+            response = await self.async_client.get(
+                f'/api/store/payments/verify/REF-{self.order.id}/', headers=self.headers
+            )
+        self.assertEqual(response.status_code, 200)
+        order = await Order.objects.aget(pk=self.order.pk)
+        self.assertEqual(order.status, 'Pending')
+        self.assertTrue(await OrderNotification.objects.filter(order=order).aexists())
+
+    async def test_gateway_waits_overlap(self):
+        with mock.patch('store.views.paystack_request', self.fake_paystack):
+            responses = await asyncio.wait_for(asyncio.gather(*[
+                self.async_client.get(f'/api/store/payments/verify/REF-{self.order.id}/', headers=self.headers)
+                for _ in range(3)
+            ]), timeout=0.5)
+        self.assertEqual([response.status_code for response in responses], [200, 200, 200])
+
+    async def test_verify_gateway_errors(self):
+        url = f'/api/store/payments/verify/REF-{self.order.id}/'
+        await Payment.objects.filter(reference=f'REF-{self.order.id}').aupdate(status='pending')
+        for error, status_code in (
+            (PaymentGatewayUnavailable('connection refused'), 503),
+            (asyncio.TimeoutError(), 504),
+            (PaymentGatewayError('HTTP 500'), 502),
+        ):
+            with self.subTest(error=error):
+                with mock.patch('store.views.paystack_request', side_effect=error):
+                    response = await self.async_client.get(url, headers=self.headers)
+                self.assertEqual(response.status_code, status_code)
+        payment = await Payment.objects.aget(reference=f'REF-{self.order.id}')
+        self.assertEqual(payment.status, 'pending')
+        self.assertEqual((await Order.objects.aget(pk=self.order.pk)).status, 'Incomplete')
+
+    async def test_unauthenticated(self):
+        response = await self.async_client.post('/api/store/payments/initialize/', {'total_amount': '4000'})
+        self.assertEqual(response.status_code, 401)
+
+
+class OrderStatusFeedTests(StoreAPITestCase):
+    """The tracking page long-poll waits on a timer between polls, and only for the order's owner."""
+
+    def setUp(self):
+        super().setUp()
+        self.order = self.create_orders(1)[0]
+        self.url = f'/orders/{self.order.id}/status/'
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.customer).access_token}'}
+        self.other_headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.admin).access_token}'}
+
+    async def poll(self, **params):
+        response = await self.async_client.get(self.url, params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    @mock.patch('store.order_status.POLL_INTERVAL', 0.05)
+    async def test_waits_overlap(self):
+        version = (await self.poll())['version']
+        results = await asyncio.wait_for(asyncio.gather(*[
+            self.poll(since=version, timeout=0.5) for _ in range(5)
+        ]), timeout=1.5)
+        self.assertEqual([result['changed'] for result in results], [False] * 5)
+
+    @mock.patch('store.order_status.POLL_INTERVAL', 0.05)
+    async def test_status_change_ends_wait(self):
+        version = (await self.poll())['version']
+        self.order.status = 'On the Way'
+        waiter = asyncio.ensure_future(self.poll(since=version, timeout=5))
+        await asyncio.sleep(0.1)
+        await sync_to_async(publish_order_status)(self.order)
+
+        result = await asyncio.wait_for(waiter, timeout=1)
+        self.assertTrue(result['changed'])
+        self.assertEqual(result['status'], 'On the Way')
+
+    async def test_other_users_order_refused_before_waiting(self):
+        version = (await self.poll())['version']
+        response = await asyncio.wait_for(
+            self.async_client.get(self.url, {'since': version, 'timeout': 5}, headers=self.other_headers), timeout=1
+        )
+        self.assertEqual(response.status_code, 404)
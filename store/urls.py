@@ -4,13 +4,13 @@ from .views import (
     CategoryListCreateView, CategoryRetrieveUpdateDeleteView,
 
     # Food Items
-    FoodItemListCreateView, FoodItemRetrieveUpdateDeleteView,
+    FoodItemListCreateView, FoodItemRetrieveUpdateDeleteView, FoodItemChangesView,
 
     # Bags
     BagListCreateView, BagRetrieveUpdateDeleteView,
 
     # Bag Items
-    BagItemListCreateView, BagItemRetrieveUpdateDeleteView,
+    BagItemListCreateView, BagItemRetrieveUpdateDeleteView, BagItemBulkCreateView,
 
     # Orders
     OrderListCreateView, OrderRetrieveUpdateDeleteView,
@@ -52,6 +52,7 @@ urlpatterns = [
     # Food Items
     # -----------------
     path("items/", FoodItemListCreateView.as_view(), name="fooditem-list-create"),
+    path("items/changes/", FoodItemChangesView.as_view(), name="fooditem-changes"),
     path("items/<int:id>/", FoodItemRetrieveUpdateDeleteView.as_view(), name="fooditem-rud"),
 
     # -----------------
@@ -65,6 +66,7 @@ urlpatterns = [
     # -----------------
     path("bag-items/", BagItemListCreateView.as_view(), name="bagitem-list-create"),
     path("bag-items/<int:id>/", BagItemRetrieveUpdateDeleteView.as_view(), name="bagitem-rud"),
+    path("bag-items/bulk/", BagItemBulkCreateView.as_view(), name="bagitem-bulk-create"),
 
     # -----------------
     # Orders
@@ -5,7 +5,15 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django_filters.rest_framework import DjangoFilterBackend
 from django.conf import settings
-import requests
+from django.utils.decorators import method_decorator
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+
+from food_ordering.async_api import AsyncAPIViewMixin
+from food_ordering.db import write_transaction
+from food_ordering.outbound import PaymentGatewayError, PaymentGatewayUnavailable, paystack_request
 
 from .models import (
     Category, FoodItem, Bag, BagItem, Plate,
@@ -15,15 +23,23 @@ from .serializers import (
     CategorySerializer, FoodItemSerializer,
     BagSerializer, BagItemSerializer, PlateSerializer,
     OrderSerializer, OrderCreateSerializer, OrderStatusUpdateSerializer, NotificationSerializer,
-    InventoryItemSerializer
+    InventoryItemSerializer, get_sparse_params
 )
 from .permissions import IsAdminOrOwnerOrReadOnly
+from .catalog import catalog_condition, decode_change_token, get_catalog_changes
 from .order_utils import create_order_with_bags, validate_order_integrity
+from .querysets import bags_queryset, order_graph_queryset
+from .bag_service import add_items_to_bag, get_bag_total
+from .pagination import AdminCursorPaginationMixin
+from .stats_service import get_customer_stats
+
+logger = logging.getLogger(__name__)
 
 
 # ------------------------
 # CATEGORY
 # ------------------------
+@method_decorator(catalog_condition(), name='get')
 class CategoryListCreateView(generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -40,6 +56,7 @@ class CategoryRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
 # ------------------------
 # FOOD ITEM
 # ------------------------
+@method_decorator(catalog_condition(), name='get')
 class FoodItemListCreateView(generics.ListCreateAPIView):
     serializer_class = FoodItemSerializer
     permission_classes = [IsAuthenticated, IsAdminOrOwnerOrReadOnly]
@@ -49,6 +66,36 @@ class FoodItemListCreateView(generics.ListCreateAPIView):
     search_fields = ['name']
 
 
+class FoodItemChangesView(generics.GenericAPIView):
+    """
+    Incremental catalog sync for POS and mobile clients.
+
+    GET ?since=<token> returns the food items created or updated and the ids
+    deleted since the token, plus the token to use next time. Without a token
+    (or with one older than the tombstone retention) the full catalog is sent
+    with reset=true.
+    """
+    serializer_class = FoodItemSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        since = None
+        token = request.query_params.get('since')
+        if token:
+            since = decode_change_token(token)
+            if since is None:
+                return Response({"error": "Invalid sync token."}, status=status.HTTP_400_BAD_REQUEST)
+
+        changes = get_catalog_changes(since)
+        serializer = self.get_serializer(changes['items'], many=True)
+        return Response({
+            "items": serializer.data,
+            "deleted": changes['deleted'],
+            "next": changes['token'],
+            "reset": changes['reset'],
+        })
+
+
 class FoodItemRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     queryset = FoodItem.objects.all()
     serializer_class = FoodItemSerializer
@@ -64,7 +111,7 @@ class BagListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated, IsAdminOrOwnerOrReadOnly]
 
     def get_queryset(self):
-        return Bag.objects.filter(owner=self.request.user)
+        return bags_queryset().filter(owner=self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -81,7 +128,7 @@ class BagRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     lookup_field = 'id'
 
     def get_queryset(self):
-        return Bag.objects.filter(owner=self.request.user)
+        return bags_queryset().filter(owner=self.request.user)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -158,10 +205,39 @@ class BagItemRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
         serializer.save()
 
 
+class BagItemBulkCreateView(generics.GenericAPIView):
+    """
+    Add many items to one bag in a single request.
+
+    Expects: bag_id, items (list of {food_item_id, portions, plates}) and an
+    optional partial flag. Without partial, nothing is created if any line fails.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        bag_id = request.data.get('bag_id')
+        try:
+            bag = Bag.objects.get(id=bag_id, owner=request.user)
+        except (Bag.DoesNotExist, ValueError, TypeError):
+            return Response({"error": "Bag not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        # Form and query data arrive as strings, so bool('false') would be True
+        partial = str(request.data.get('partial', False)).lower() in ('1', 'true')
+        created, errors = add_items_to_bag(bag, request.data.get('items'), partial=partial)
+        if not created:
+            return Response({"created": [], "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "created": [item.id for item in created],
+            "errors": errors,
+            "bag_total": get_bag_total(bag),
+        }, status=status.HTTP_201_CREATED)
+
+
 # ------------------------
 # ORDER
 # ------------------------
-class OrderListCreateView(generics.ListCreateAPIView):
+class OrderListCreateView(AdminCursorPaginationMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_serializer_class(self):
@@ -171,9 +247,11 @@ class OrderListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         user = self.request.user
+        # Prefetch only what the requested ?fields= / ?expand= will render
+        fields, expand = get_sparse_params(self.request)
         if getattr(user, "role", None) == 'admin':
-            return Order.objects.all()
-        return Order.objects.filter(user=user)
+            return order_graph_queryset(fields=fields, expand=expand)
+        return order_graph_queryset(Order.objects.filter(user=user), fields=fields, expand=expand)
 
     def perform_create(self, serializer):
         """Create order with proper validation and bag linking using utility function."""
@@ -208,9 +286,11 @@ class OrderRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         user = self.request.user
+        # Prefetch only what the requested ?fields= / ?expand= will render
+        fields, expand = get_sparse_params(self.request)
         if getattr(user, "role", None) == 'admin':
-            return Order.objects.all()
-        return Order.objects.filter(user=user)
+            return order_graph_queryset(fields=fields, expand=expand)
+        return order_graph_queryset(Order.objects.filter(user=user), fields=fields, expand=expand)
 
     def perform_destroy(self, instance):
         # Only unpaid orders can be deleted by customers (based on payment status)
@@ -245,16 +325,16 @@ class OrderStatusUpdateView(generics.UpdateAPIView):
 # ------------------------
 # NOTIFICATIONS
 # ------------------------
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(AdminCursorPaginationMixin, generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
         if getattr(user, "role", None) == "admin":
-            # Admin sees all notifications, fetch order and order.user
+            # Admin sees all notifications, fetch order and order.user (paged by cursor)
             return OrderNotification.objects.select_related('order', 'order__user').all()
-        return OrderNotification.objects.filter(order__user=user)
+        return OrderNotification.objects.select_related('order', 'order__user').filter(order__user=user).order_by('-created_at', '-id')
 
 
 class NotificationMarkSeenView(generics.UpdateAPIView):
@@ -274,11 +354,11 @@ class NotificationMarkSeenView(generics.UpdateAPIView):
 # ------------------------
 # PAYMENT INITIALIZATION
 # ------------------------
-class InitializePaymentView(generics.GenericAPIView):
+class InitializePaymentView(AsyncAPIViewMixin, generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
 
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         """
         Initialize a Paystack transaction.
         Expects: total_amount in request.data
@@ -290,20 +370,14 @@ class InitializePaymentView(generics.GenericAPIView):
         amount_kobo = int(float(total_amount) * 100)  # ✅ Paystack expects amount in kobo
         
         # Debug logging
-        print(f'=== PAYMENT INITIALIZATION ===')
-        print(f'Total amount received: {total_amount}')
-        print(f'Amount in kobo: {amount_kobo}')
-        print(f'Amount in NGN: ₦{amount_kobo / 100:,.2f}')
-        print(f'=== END PAYMENT INITIALIZATION ===')
+        logger.debug("Total amount received: %s", total_amount)
+        logger.debug("Amount in kobo: %s", amount_kobo)
+        logger.debug("Amount in NGN: ₦%.2f", amount_kobo / 100)
 
         # Make reference unique by appending timestamp
         import time
         reference = f"PAY-{request.user.id}-{int(time.time())}"
 
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-            "Content-Type": "application/json",
-        }
         data = {
             "email": request.user.email,
             "amount": amount_kobo,
@@ -312,19 +386,18 @@ class InitializePaymentView(generics.GenericAPIView):
         }
 
         try:
-            response = requests.post("https://api.paystack.co/transaction/initialize", json=data, headers=headers, timeout=30)
-            res_data = response.json()
-        except requests.exceptions.ConnectionError as e:
+            res_data = await paystack_request("POST", "/transaction/initialize", data)
+        except PaymentGatewayUnavailable as e:
             return Response({
                 "error": "Unable to connect to payment service. Please check your internet connection and try again.",
                 "details": str(e)
             }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-        except requests.exceptions.Timeout as e:
+        except asyncio.TimeoutError as e:
             return Response({
                 "error": "Payment service request timed out. Please try again.",
                 "details": str(e)
             }, status=status.HTTP_504_GATEWAY_TIMEOUT)
-        except requests.exceptions.RequestException as e:
+        except PaymentGatewayError as e:
             return Response({
                 "error": "Payment service error. Please try again later.",
                 "details": str(e)
@@ -355,7 +428,7 @@ class InitializePaymentView(generics.GenericAPIView):
                         payment_type = "qr"
             
             # Save Payment record (no order yet - will be created after successful payment)
-            Payment.objects.create(
+            await Payment.objects.acreate(
                 user=request.user,
                 order=None,  # No order yet
                 reference=reference,
@@ -371,26 +444,46 @@ class InitializePaymentView(generics.GenericAPIView):
 # ------------------------
 # PAYMENT VERIFICATION
 # ------------------------
-class VerifyPaymentView(generics.GenericAPIView):
+class VerifyPaymentView(AsyncAPIViewMixin, generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, reference, *args, **kwargs):
+    async def get(self, request, reference, *args, **kwargs):
         """
         Verify a Paystack transaction.
         Example: GET /api/store/payments/verify/<reference>/
         """
-        headers = {
-            "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-        }
-        url = f"https://api.paystack.co/transaction/verify/{reference}"
-        response = requests.get(url, headers=headers)
-        res_data = response.json()
-
         try:
-            payment = Payment.objects.get(reference=reference, user=request.user)
+            payment = await Payment.objects.select_related('order', 'user').aget(reference=reference, user=request.user)
         except Payment.DoesNotExist:
             return Response({"error": "Payment not found"}, status=status.HTTP_404_NOT_FOUND)
 
+        # The payment stays pending if Paystack cannot be asked, so verification can be retried
+        try:
+            res_data = await paystack_request("GET", f"/transaction/verify/{reference}")
+        except PaymentGatewayUnavailable as e:
+            return Response({
+                "error": "Unable to connect to payment service. Please check your internet connection and try again.",
+                "details": str(e)
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except asyncio.TimeoutError as e:
+            return Response({
+                "error": "Payment service request timed out. Please try again.",
+                "details": str(e)
+            }, status=status.HTTP_504_GATEWAY_TIMEOUT)
+        except PaymentGatewayError as e:
+            return Response({
+                "error": "Payment service error. Please try again later.",
+                "details": str(e)
+            }, status=status.HTTP_502_BAD_GATEWAY)
+        except Exception as e:
+            return Response({
+                "error": "Unexpected error occurred while verifying payment.",
+                "details": str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return await sync_to_async(self._apply_verification)(payment, res_data)
+
+    def _apply_verification(self, payment, res_data):
+        """Record Paystack's verdict on the payment and its order."""
         if res_data.get("data", {}).get("status") == "success":
             payment.status = "success"
             
@@ -437,9 +530,7 @@ class VerifyPaymentView(generics.GenericAPIView):
     
     def _reduce_order_quantities(self, order):
         """Reduce portions for all food items in the order after successful payment."""
-        from django.db import transaction
-        
-        with transaction.atomic():
+        with write_transaction():
             for bag in order.bags.all():
                 for bag_item in bag.items.all():
                     if bag_item.food_item:  # Only reduce if food_item still exists
@@ -449,7 +540,7 @@ class VerifyPaymentView(generics.GenericAPIView):
                                 
                         except ValueError as e:
                             # Log the error but don't fail the payment
-                            print(f"Warning: Could not reduce portions for {bag_item.food_item.name}: {e}")
+                            logger.warning("Could not reduce portions for %s: %s", bag_item.food_item.name, e)
 
 
 # ------------------------
@@ -535,10 +626,10 @@ class PaystackWebhookView(generics.GenericAPIView):
                             message=f"New Payment Received: A payment of ₦ {payment.amount} has been received for order #{payment.order.id} from {customer_name}."
                         )
                         
-                        print(f"✅ Payment verified via webhook: {reference} for order #{payment.order.id}")
+                        logger.info("Payment verified via webhook: %s for order #%s", reference, payment.order.id)
                         
                     except Payment.DoesNotExist:
-                        print(f"⚠️ Payment not found for reference: {reference}")
+                        logger.warning("Payment not found for reference: %s", reference)
                         return Response({"error": "Payment not found"}, status=status.HTTP_404_NOT_FOUND)
                 
             elif event_type == 'charge.failed':
@@ -551,21 +642,19 @@ class PaystackWebhookView(generics.GenericAPIView):
                         payment = Payment.objects.get(reference=reference)
                         payment.status = 'failed'
                         payment.save()
-                        print(f"❌ Payment failed via webhook: {reference}")
+                        logger.info("Payment failed via webhook: %s", reference)
                     except Payment.DoesNotExist:
-                        print(f"⚠️ Payment not found for failed reference: {reference}")
+                        logger.warning("Payment not found for failed reference: %s", reference)
             
             return Response({"status": "success"}, status=status.HTTP_200_OK)
             
         except Exception as e:
-            print(f"❌ Webhook error: {str(e)}")
+            logger.exception("Webhook error: %s", e)
             return Response({"error": "Webhook processing failed"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     def _reduce_order_quantities(self, order):
         """Reduce portions for all food items in the order after successful payment."""
-        from django.db import transaction
-        
-        with transaction.atomic():
+        with write_transaction():
             for bag in order.bags.all():
                 for bag_item in bag.items.all():
                     if bag_item.food_item:  # Only reduce if food_item still exists
@@ -573,7 +662,7 @@ class PaystackWebhookView(generics.GenericAPIView):
                             bag_item.food_item.reduce_portions(bag_item.portions)
                         except ValueError as e:
                             # Log the error but don't fail the payment
-                            print(f"Warning: Could not reduce portions for {bag_item.food_item.name}: {e}")
+                            logger.warning("Could not reduce portions for %s: %s", bag_item.food_item.name, e)
 
 
 # ------------------------
@@ -583,55 +672,18 @@ class CustomerStatsView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        """Get customer statistics."""
-        from django.contrib.auth import get_user_model
-        from django.db.models import Count, Sum
-        from django.utils import timezone
-        
-        User = get_user_model()
-        
-        # Get total customers (only those who have made payments)
-        total_customers = User.objects.filter(
-            role='customer',
-            payments__isnull=False
-        ).distinct().count()
-        
-        # Get new customers this month (using id as proxy for creation order)
-        # Since we don't have date_joined, we'll use a different approach
-        # Get customers who made their first payment this month
-        this_month = timezone.now().replace(day=1)
-        new_customers_this_month = User.objects.filter(
-            role='customer',
-            payments__isnull=False,
-            payments__created_at__gte=this_month
-        ).distinct().count()
-        
-        # Get active customers (customers with orders in the last 30 days)
-        thirty_days_ago = timezone.now() - timezone.timedelta(days=30)
-        active_customers = User.objects.filter(
-            role='customer',
-            payments__isnull=False,
-            payments__created_at__gte=thirty_days_ago
-        ).distinct().count()
-        
-        # Get customer with most orders
-        top_customer = User.objects.filter(
-            role='customer',
-            payments__isnull=False,
-            payments__status='success'  # Only count successful payments
-        ).annotate(
-            total_orders=Count('payments'),
-            total_spent=Sum('payments__amount')
-        ).order_by('-total_orders').first()
+        """Get customer statistics (cached; refreshed when a payment succeeds)."""
+        customer_stats = get_customer_stats()
+        top_customer = customer_stats['top_customer']
         
         stats = {
-            'total_customers': total_customers,
-            'new_customers_this_month': new_customers_this_month,
-            'active_customers': active_customers,
+            'total_customers': customer_stats['total_customers'],
+            'new_customers_this_month': customer_stats['new_customers_this_month'],
+            'active_customers': customer_stats['active_customers'],
             'top_customer': {
-                'name': f"{top_customer.first_name} {top_customer.last_name}".strip() or top_customer.phone_number,
-                'total_orders': top_customer.total_orders if top_customer else 0,
-                'total_spent': float(top_customer.total_spent) if top_customer and top_customer.total_spent else 0
+                'name': f"{top_customer['first_name']} {top_customer['last_name']}".strip() or top_customer['phone_number'],
+                'total_orders': top_customer['total_orders'],
+                'total_spent': float(top_customer['total_spent']) if top_customer['total_spent'] else 0
             } if top_customer else None
         }
         